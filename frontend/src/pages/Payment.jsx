@@ -100,6 +100,71 @@ function Payment() {
     }
   }
 
+  // Show a verification result; returns true while confirmations are still pending
+  function applyPaymentResult(data) {
+    if (data.success) {
+      setPaymentStatus({ type: "success", message: "Payment confirmed! You can now download." });
+      setDownloadToken(data.download_token);
+      setIsProcessing(false);
+      return false;
+    }
+    if (data.status === "processing") {
+      setPaymentStatus({ 
+        type: "info", 
+        message: `Waiting for confirmations (${data.confirmations}/${data.required_confirmations})...` 
+      });
+      return true;
+    }
+    setPaymentStatus({ type: "error", message: data.error || "Verification failed" });
+    setIsProcessing(false);
+    return false;
+  }
+
+  // Long-poll the status stream: the server holds each request until the
+  // status or confirmations differ from the last ones seen
+  async function pollPaymentStatus(txHash, latest) {
+    const params = new URLSearchParams({
+      status: latest.status,
+      confirmations: latest.confirmations,
+    });
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/payment/status/${txHash}/stream/?${params}`);
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || `HTTP ${response.status}`);
+      }
+      if (applyPaymentResult(data)) {
+        pollPaymentStatus(txHash, data);
+      }
+    } catch (error) {
+      console.error("Status long-poll error:", error);
+      setTimeout(() => pollPaymentStatus(txHash, latest), 5000);
+    }
+  }
+
+  // Follow confirmations via the server-push status stream, long-polling when
+  // EventSource is unavailable or the stream is refused (WSGI deployments answer 406)
+  function watchPaymentStream(txHash, latest) {
+    if (!window.EventSource) {
+      pollPaymentStatus(txHash, latest);
+      return;
+    }
+
+    const source = new EventSource(`${API_BASE_URL}/api/payment/status/${txHash}/stream/`);
+    source.addEventListener("status", (event) => {
+      latest = JSON.parse(event.data);
+      if (!applyPaymentResult(latest)) {
+        source.close();
+      }
+    });
+    source.onerror = () => {
+      // The browser reconnects on its own unless the stream was refused
+      if (source.readyState === EventSource.CLOSED) {
+        pollPaymentStatus(txHash, latest);
+      }
+    };
+  }
+
   async function verifyPayment(txHash) {
     try {
       setPaymentStatus({ type: "info", message: "Verifying payment..." });
@@ -117,19 +182,8 @@ function Payment() {
 
       const data = await response.json();
 
-      if (data.success) {
-        setPaymentStatus({ type: "success", message: "Payment confirmed! You can now download." });
-        setDownloadToken(data.download_token);
-        setIsProcessing(false);
-      } else if (data.status === "processing") {
-        setPaymentStatus({ 
-          type: "info", 
-          message: `Waiting for confirmations (${data.confirmations}/${data.required_confirmations})...` 
-        });
-        setTimeout(() => verifyPayment(txHash), 5000);
-      } else {
-        setPaymentStatus({ type: "error", message: data.error || "Verification failed" });
-        setIsProcessing(false);
+      if (applyPaymentResult(data)) {
+        watchPaymentStream(txHash, data);
       }
     } catch (error) {
       console.error("Verification error:", error);
@@ -173,7 +227,10 @@ function Payment() {
   }
 
   function handleDownload() {
-    if (window.businessCard3D) {
+    if (downloadToken) {
+      // High-res PNG rendered (and cached) by the server
+      window.location.href = `${API_BASE_URL}/api/download/${downloadToken}/?format=png`;
+    } else if (window.businessCard3D) {
       window.businessCard3D.downloadImage();
     } else {
       alert("3D card not initialized");
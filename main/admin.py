@@ -1,5 +1,29 @@
 from django.contrib import admin
-from .models import Project, ProjectImage, Partner, Payment
+from django.db.models import Func, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from .models import MediaJob, Project, ProjectImage, Partner, Payment, Technology
+
+
+def project_media_jobs(project_id, image_project_id=None):
+    """
+    MediaJobs for a project and its gallery images
+
+    In a subquery pass OuterRef('pk') and OuterRef(OuterRef('pk')), since the
+    image lookup is nested one level deeper.
+    """
+    image_ids = ProjectImage.objects.filter(project=image_project_id or project_id).values('id')
+    return MediaJob.objects.filter(
+        Q(model='main.Project', object_id=project_id) | Q(model='main.ProjectImage', object_id__in=image_ids)
+    )
+
+
+def media_job_count(statuses):
+    """Subquery counting a project row's media jobs in the given statuses"""
+    jobs = project_media_jobs(OuterRef('pk'), OuterRef(OuterRef('pk'))).filter(status__in=statuses)
+    return Subquery(
+        jobs.order_by().annotate(count=Func('id', function='COUNT')).values('count')[:1]
+    )
 
 
 class ProjectImageInline(admin.TabularInline):
@@ -9,10 +33,12 @@ class ProjectImageInline(admin.TabularInline):
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ['title', 'classification', 'project_type', 'created_date', 'is_active']
+    list_display = ['title', 'classification', 'project_type', 'created_date', 'media_status', 'is_active']
     list_filter = ['classification', 'project_type', 'is_active', 'created_date']
-    search_fields = ['title', 'description', 'technologies']
+    search_fields = ['title', 'description', 'technologies__name']
     list_editable = ['is_active']
+    filter_horizontal = ['technologies']
+    readonly_fields = ['media_jobs']
     inlines = [ProjectImageInline]
     fieldsets = (
         ('Basic Information', {
@@ -22,7 +48,7 @@ class ProjectAdmin(admin.ModelAdmin):
             'fields': ('technologies', 'github_url', 'live_url')
         }),
         ('Media', {
-            'fields': ('featured_image',)
+            'fields': ('featured_image', 'media_jobs')
         }),
         ('Documentation', {
             'fields': ('white_paper', 'specifications')
@@ -31,6 +57,65 @@ class ProjectAdmin(admin.ModelAdmin):
             'fields': ('is_active',)
         }),
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            unfinished_media_jobs=media_job_count(['queued', 'running']),
+            failed_media_jobs=media_job_count(['failed']),
+        )
+    
+    def media_status(self, obj):
+        if obj.failed_media_jobs:
+            return f"{obj.failed_media_jobs} failed"
+        if obj.unfinished_media_jobs:
+            return f"{obj.unfinished_media_jobs} processing"
+        return "Ready"
+    media_status.short_description = 'Media'
+    
+    def media_jobs(self, obj):
+        if not obj.pk:
+            return "-"
+        jobs = project_media_jobs(obj.pk)[:10]
+        if not jobs:
+            return "No media processing yet"
+        return format_html(
+            '<ul>{}</ul>',
+            format_html_join('', '<li>{} ({} #{}): <strong>{}</strong> {}</li>', (
+                (job.get_task_display(), job.model, job.object_id, job.get_status_display(), job.error)
+                for job in jobs
+            )),
+        )
+    media_jobs.short_description = 'Background processing'
+
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'model', 'object_id', 'field_name', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'task', 'model']
+    readonly_fields = ['task', 'model', 'object_id', 'field_name', 'status', 'attempts', 'error',
+                      'available_at', 'created_at', 'started_at', 'finished_at']
+    actions = ['retry_jobs']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status='failed'):
+            if not MediaJob.objects.filter(
+                task=job.task, model=job.model, object_id=job.object_id, field_name=job.field_name, status='queued'
+            ).exists():
+                MediaJob.objects.filter(pk=job.pk).update(status='queued', attempts=0, available_at=timezone.now())
+                retried += 1
+        self.message_user(request, f"Queued {retried} jobs for retry")
+
+
+@admin.register(Technology)
+class TechnologyAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+    exclude = ['key']
 
 
 @admin.register(ProjectImage)
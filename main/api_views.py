@@ -1,20 +1,255 @@
 """
 API views for Web3 payment verification
 """
+import json
 import secrets
 import logging
 from decimal import Decimal
 from datetime import timedelta
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
+from django.core.cache import cache
+from .business_card import CARD_FORMATS, card_file
+from .file_serving import serve_file
 from .models import Payment
-from .web3_utils import verify_transaction, wei_to_eth
+from .payment_stream import payment_status_data, wait_for_change
+from .payment_tracker import is_tracker_running
+from .singleflight import SingleFlight, lease
+from .web3_utils import get_cached_block_number, verify_transaction
 
 logger = logging.getLogger(__name__)
 
+# Concurrent verify_payment calls for the same transaction share one verification
+verifications = SingleFlight()
+
+
+def normalize_transaction_hash(transaction_hash):
+    """Ensure a transaction hash starts with 0x"""
+    if not transaction_hash.startswith('0x'):
+        transaction_hash = '0x' + transaction_hash
+    return transaction_hash
+
+
+def parse_verify_request(request):
+    """
+    Validate and normalize a verify_payment request body
+    
+    Returns:
+        (transaction_hash, from_address, error_response) where error_response
+        is a JsonResponse to send back as-is if the request is invalid
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return None, None, JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    
+    transaction_hash = data.get('transaction_hash', '').strip()
+    from_address = data.get('from_address', '').strip()
+    
+    if not transaction_hash:
+        return None, None, JsonResponse({
+            'success': False,
+            'error': 'Transaction hash is required'
+        }, status=400)
+    
+    if not from_address:
+        return None, None, JsonResponse({
+            'success': False,
+            'error': 'From address is required'
+        }, status=400)
+    
+    transaction_hash = normalize_transaction_hash(transaction_hash)
+    
+    # Normalize addresses (lowercase for consistency)
+    from_address = from_address.lower() if from_address.startswith('0x') else from_address
+    return transaction_hash, from_address, None
+
+
+def normalized_wallet_address():
+    """The configured receiving wallet, lowercased like stored payment addresses"""
+    return settings.WALLET_ADDRESS.lower() if settings.WALLET_ADDRESS.startswith('0x') else settings.WALLET_ADDRESS
+
+
+def new_payment_defaults(from_address, wallet_address):
+    """Field values for a Payment row created on first verification"""
+    return {
+        'from_address': from_address,
+        'to_address': wallet_address,
+        'status': 'pending',
+        'amount_wei': 0,
+        'amount_eth': settings.PAYMENT_AMOUNT_ETH,
+    }
+
+
+def payment_info_response():
+    """Build the get_payment_info JSON response"""
+    return JsonResponse({
+        'success': True,
+        'wallet_address': settings.WALLET_ADDRESS,
+        'amount_eth': settings.PAYMENT_AMOUNT_ETH,
+        'chain_id': settings.CHAIN_ID,
+        'network': 'Ethereum Mainnet' if settings.CHAIN_ID == 1 else f'Chain ID {settings.CHAIN_ID}'
+    })
+
+
+def download_error_response(payment, card_format=None):
+    """JsonResponse refusing a download_business_card request, or None if it may go ahead"""
+    # Verify payment is valid and download is still valid
+    if not payment.is_download_valid():
+        return JsonResponse({
+            'success': False,
+            'error': 'Download link expired or payment not verified'
+        }, status=403)
+    
+    if card_format is not None and card_format not in CARD_FORMATS:
+        return JsonResponse({
+            'success': False,
+            'error': f"Format must be one of: {', '.join(CARD_FORMATS)}"
+        }, status=400)
+    return None
+
+
+def download_response(request, payment):
+    """Build the download_business_card JSON response for a payment looked up by token"""
+    error = download_error_response(payment)
+    if error is not None:
+        return error
+    
+    return JsonResponse({
+        'success': True,
+        'message': 'Payment verified. You can now download your business card.',
+        'download_available': True,
+        'downloads': {
+            card_format: request.build_absolute_uri(f'?format={card_format}')
+            for card_format in CARD_FORMATS
+        },
+    })
+
+
+def card_download_response(request, card_format, storage, name, key):
+    """Stream a rendered card (see business_card.card_file) as an attachment"""
+    content_type, extension = CARD_FORMATS[card_format]
+    return serve_file(
+        request,
+        storage,
+        name,
+        etag=key,
+        filename=f'jcorp-business-card.{extension}',
+        as_attachment=True,
+        content_type=content_type,
+        # The token gates access and expires, so shared caches must not keep it
+        cache_control={'private': True, 'no_cache': True},
+        sendfile_prefix=settings.BUSINESS_CARD_SENDFILE_PREFIX,
+    )
+
+
+def payment_status_response(payment, error=None):
+    """Build the verify_payment JSON response from a payment's stored state"""
+    return JsonResponse(payment_status_data(payment, error=error))
+
+
+def wants_event_stream(request):
+    """EventSource clients ask for text/event-stream; anything else gets long-poll JSON"""
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def event_stream_response(events):
+    """Wrap an SSE event iterator in an unbuffered streaming response"""
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+def verification_lease_key(transaction_hash):
+    """Lease key that stops worker processes verifying the same payment at once"""
+    return f'payment:verify:{transaction_hash}'
+
+
+def verified_head_key(transaction_hash):
+    """Cache key holding the chain head a payment was last verified at"""
+    return f'payment:verified-head:{transaction_hash}'
+
+
+def verified_at_head(transaction_hash):
+    """
+    Whether the payment was already verified at the current cached chain head
+    
+    A transaction's receipt and confirmations only change with a new block,
+    so until one arrives another verification would learn nothing: workers
+    answer from the stored row without taking the lease or sending RPCs.
+    """
+    head = get_cached_block_number()
+    return head is not None and cache.get(verified_head_key(transaction_hash)) == head
+
+
+def mark_verified(transaction_hash, head, result):
+    """Record the chain head a verification saw, unless the RPC failed and nothing was learned"""
+    if head is None:
+        head = get_cached_block_number()
+    if head is not None and not result.get('rpc_error'):
+        cache.set(verified_head_key(transaction_hash), head, timeout=settings.BLOCK_TIME_SECONDS)
+
+
+def refresh_payment(transaction_hash, from_address, wallet_address):
+    """
+    Get or create a payment and bring it up to date with the blockchain
+    
+    verify_payment runs this at most once per transaction hash at a time, so
+    concurrent requests share one set of RPCs and one write to the row.
+    
+    Returns:
+        (payment, error) where error is the verification error, if any
+    """
+    payment, created = Payment.objects.get_or_create(
+        transaction_hash=transaction_hash,
+        defaults=new_payment_defaults(from_address, wallet_address)
+    )
+    
+    # Confirmed, failed and expired payments are final, and the track_payments
+    # worker keeps the others up to date, so only hit the blockchain when
+    # neither applies and the chain has moved since the last verification
+    if not Payment.TRANSITIONS[payment.status] or (
+        not created and (is_tracker_running() or verified_at_head(transaction_hash))
+    ):
+        return payment, None
+    
+    with lease(verification_lease_key(transaction_hash), settings.RPC_TIMEOUT * 2) as acquired:
+        if not acquired:
+            # Another worker process has just verified it; use what it stored
+            payment.refresh_from_db()
+            return payment, None
+        
+        # Verify transaction on blockchain
+        head = get_cached_block_number()
+        verification_result = verify_transaction(
+            transaction_hash=transaction_hash,
+            expected_to_address=wallet_address,
+            expected_amount_eth=settings.PAYMENT_AMOUNT_ETH
+        )
+        mark_verified(transaction_hash, head, verification_result)
+        
+        # Update payment record (skipped when nothing changed)
+        payment.apply_verification(verification_result)
+    
+    if payment.status == 'confirmed':
+        logger.info(f"Payment verified: {transaction_hash} from {from_address}")
+    
+    return payment, verification_result.get('error')
+
+
+def payment_not_found_response():
+    return JsonResponse({
+        'success': False,
+        'error': 'Payment not found. Submit it to /api/payment/verify/ first.'
+    }, status=404)
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -29,99 +264,15 @@ def verify_payment(request):
     }
     """
     try:
-        import json
-        data = json.loads(request.body)
-        transaction_hash = data.get('transaction_hash', '').strip()
-        from_address = data.get('from_address', '').strip()
-        
-        if not transaction_hash:
-            return JsonResponse({
-                'success': False,
-                'error': 'Transaction hash is required'
-            }, status=400)
-        
-        if not from_address:
-            return JsonResponse({
-                'success': False,
-                'error': 'From address is required'
-            }, status=400)
-        
-        # Normalize transaction hash (ensure it starts with 0x)
-        if not transaction_hash.startswith('0x'):
-            transaction_hash = '0x' + transaction_hash
-        
-        # Normalize addresses (lowercase for consistency)
-        from_address = from_address.lower() if from_address.startswith('0x') else from_address
-        wallet_address = settings.WALLET_ADDRESS.lower() if settings.WALLET_ADDRESS.startswith('0x') else settings.WALLET_ADDRESS
+        transaction_hash, from_address, error_response = parse_verify_request(request)
+        if error_response:
+            return error_response
         
-        # Check if payment already exists
-        payment, created = Payment.objects.get_or_create(
-            transaction_hash=transaction_hash,
-            defaults={
-                'from_address': from_address,
-                'to_address': wallet_address,
-                'status': 'pending',
-                'amount_eth': settings.PAYMENT_AMOUNT_ETH,
-            }
+        payment, error = verifications.do(
+            transaction_hash, refresh_payment, transaction_hash, from_address, normalized_wallet_address()
         )
-        
-        # Verify transaction on blockchain
-        verification_result = verify_transaction(
-            transaction_hash=transaction_hash,
-            expected_to_address=wallet_address,
-            expected_amount_eth=settings.PAYMENT_AMOUNT_ETH
-        )
-        
-        # Update payment record
-        payment.from_address = from_address
-        payment.amount_wei = verification_result.get('amount_wei', 0)
-        payment.amount_eth = Decimal(str(verification_result.get('amount_eth', 0)))
-        payment.confirmations = verification_result.get('confirmations', 0)
-        
-        if verification_result['valid']:
-            payment.status = 'confirmed'
-            payment.verified_at = timezone.now()
-            
-            # Generate download token if not exists
-            if not payment.download_token:
-                payment.download_token = secrets.token_urlsafe(32)
-                payment.download_expires_at = timezone.now() + timedelta(hours=settings.PAYMENT_EXPIRY_HOURS)
+        return payment_status_response(payment, error=error)
             
-            payment.save()
-            
-            logger.info(f"Payment verified: {transaction_hash} from {from_address}")
-            
-            return JsonResponse({
-                'success': True,
-                'status': 'confirmed',
-                'confirmations': payment.confirmations,
-                'download_token': payment.download_token,
-                'download_url': f'/api/download/{payment.download_token}/',
-                'message': 'Payment verified successfully'
-            })
-        else:
-            # Update status based on confirmations
-            if payment.confirmations > 0:
-                payment.status = 'processing'
-            else:
-                payment.status = 'pending'
-            
-            payment.save()
-            
-            return JsonResponse({
-                'success': False,
-                'status': payment.status,
-                'confirmations': payment.confirmations,
-                'required_confirmations': payment.required_confirmations,
-                'error': verification_result.get('error', 'Transaction verification failed'),
-                'message': f'Transaction found but waiting for confirmations ({payment.confirmations}/{payment.required_confirmations})'
-            })
-            
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'success': False,
-            'error': 'Invalid JSON data'
-        }, status=400)
     except Exception as e:
         logger.error(f"Error verifying payment: {str(e)}")
         return JsonResponse({
@@ -130,42 +281,62 @@ def verify_payment(request):
         }, status=500)
 
 
+@require_http_methods(["GET"])
+def payment_status_stream(request, tx_hash):
+    """
+    Long-poll payment status changes instead of having clients poll verify_payment
+    
+    Pass the ?status=&confirmations= you already have and the response is
+    held until either changes (or PAYMENT_LONG_POLL_SECONDS pass).
+    EventSource clients (Accept: text/event-stream) are refused with 406 so
+    they fall back to polling: a stream lasts minutes and would tie up a
+    WSGI worker thread. Server-Sent Events come from the async view
+    (ASYNC_PAYMENT_VIEWS), where waiting subscribers hold no thread.
+    """
+    transaction_hash = normalize_transaction_hash(tx_hash)
+    payment = Payment.objects.filter(transaction_hash=transaction_hash).first()
+    if payment is None:
+        return payment_not_found_response()
+    
+    if wants_event_stream(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'Event streams need ASYNC_PAYMENT_VIEWS; long-poll this URL instead'
+        }, status=406)
+    
+    data = payment_status_data(payment)
+    return JsonResponse(wait_for_change(
+        transaction_hash, data, request.GET.get('status'), request.GET.get('confirmations')
+    ))
+
+
 @require_http_methods(["GET"])
 def get_payment_info(request):
     """
     Get payment information (wallet address, amount, etc.)
     """
-    return JsonResponse({
-        'success': True,
-        'wallet_address': settings.WALLET_ADDRESS,
-        'amount_eth': settings.PAYMENT_AMOUNT_ETH,
-        'chain_id': settings.CHAIN_ID,
-        'network': 'Ethereum Mainnet' if settings.CHAIN_ID == 1 else f'Chain ID {settings.CHAIN_ID}'
-    })
+    return payment_info_response()
 
 
 @require_http_methods(["GET"])
 def download_business_card(request, token):
     """
     Download business card after payment verification
+    
+    Without ?format= the response is JSON listing the download URLs;
+    ?format=png or ?format=pdf streams the rendered card.
     """
     try:
         payment = Payment.objects.get(download_token=token)
+        card_format = request.GET.get('format')
+        if card_format is None:
+            return download_response(request, payment)
         
-        # Verify payment is valid and download is still valid
-        if not payment.is_download_valid():
-            return JsonResponse({
-                'success': False,
-                'error': 'Download link expired or payment not verified'
-            }, status=403)
-        
-        # For now, trigger the download from the 3D card
-        # In production, you might want to generate a PDF or high-res image
-        return JsonResponse({
-            'success': True,
-            'message': 'Payment verified. You can now download your business card.',
-            'download_available': True
-        })
+        error = download_error_response(payment, card_format)
+        if error is not None:
+            return error
+        storage, name, key = card_file(card_format)
+        return card_download_response(request, card_format, storage, name, key)
         
     except Payment.DoesNotExist:
         return JsonResponse({
@@ -199,8 +370,6 @@ def process_fiat_payment(request):
     TODO: Integrate with payment gateway (Stripe, PayPal, etc.)
     """
     try:
-        import json
-        
         data = json.loads(request.body)
         amount = Decimal(str(data.get('amount', 0)))
         currency = data.get('currency', 'USD')
@@ -0,0 +1,179 @@
+"""
+Async API views for Web3 payment verification
+
+Drop-in replacements for the views in api_views, enabled with
+ASYNC_PAYMENT_VIEWS when serving mysite.asgi under an ASGI server such as
+uvicorn. RPCs go through AsyncWeb3 and the ORM through its async API, so a
+single worker can keep many verifications in flight at once.
+"""
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from .api_views import (
+    card_download_response,
+    download_error_response,
+    download_response,
+    event_stream_response,
+    mark_verified,
+    new_payment_defaults,
+    normalize_transaction_hash,
+    normalized_wallet_address,
+    parse_verify_request,
+    payment_info_response,
+    payment_not_found_response,
+    payment_status_response,
+    verification_lease_key,
+    verified_at_head,
+    wants_event_stream,
+)
+from .async_web3_utils import async_verify_transaction
+from .business_card import card_file
+from .models import Payment
+from .payment_stream import async_status_events, async_wait_for_change, payment_status_data
+from .payment_tracker import is_tracker_running
+from .singleflight import AsyncSingleFlight, async_lease
+from .web3_utils import get_cached_block_number
+
+logger = logging.getLogger(__name__)
+
+# Concurrent verify_payment calls for the same transaction share one verification
+verifications = AsyncSingleFlight()
+
+
+async def refresh_payment(transaction_hash, from_address, wallet_address):
+    """Async counterpart of api_views.refresh_payment()"""
+    payment, created = await Payment.objects.aget_or_create(
+        transaction_hash=transaction_hash,
+        defaults=new_payment_defaults(from_address, wallet_address)
+    )
+    
+    # Confirmed, failed and expired payments are final, and the track_payments
+    # worker keeps the others up to date, so only hit the blockchain when
+    # neither applies and the chain has moved since the last verification
+    if not Payment.TRANSITIONS[payment.status] or (
+        not created and (
+            await sync_to_async(is_tracker_running)() or await sync_to_async(verified_at_head)(transaction_hash)
+        )
+    ):
+        return payment, None
+    
+    async with async_lease(verification_lease_key(transaction_hash), settings.RPC_TIMEOUT * 2) as acquired:
+        if not acquired:
+            # Another worker process has just verified it; use what it stored
+            await payment.arefresh_from_db()
+            return payment, None
+        
+        # Verify transaction on blockchain
+        head = await sync_to_async(get_cached_block_number)()
+        verification_result = await async_verify_transaction(
+            transaction_hash=transaction_hash,
+            expected_to_address=wallet_address,
+            expected_amount_eth=settings.PAYMENT_AMOUNT_ETH
+        )
+        await sync_to_async(mark_verified)(transaction_hash, head, verification_result)
+        
+        # Update payment record (skipped when nothing changed)
+        await sync_to_async(payment.apply_verification)(verification_result)
+    
+    if payment.status == 'confirmed':
+        logger.info(f"Payment verified: {transaction_hash} from {from_address}")
+    
+    return payment, verification_result.get('error')
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def verify_payment(request):
+    """
+    Verify a blockchain payment transaction
+    
+    Expected POST data:
+    {
+        "transaction_hash": "0x...",
+        "from_address": "0x..."
+    }
+    """
+    try:
+        transaction_hash, from_address, error_response = parse_verify_request(request)
+        if error_response:
+            return error_response
+        
+        payment, error = await verifications.do(
+            transaction_hash, refresh_payment, transaction_hash, from_address, normalized_wallet_address()
+        )
+        return payment_status_response(payment, error=error)
+            
+    except Exception as e:
+        logger.error(f"Error verifying payment: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+async def payment_status_stream(request, tx_hash):
+    """
+    Push payment status changes as Server-Sent Events, or long-poll for the next one
+    
+    EventSource clients (Accept: text/event-stream) get events until the
+    payment reaches a final status; see api_views.payment_status_stream for
+    long-polling. Waiting subscribers hold no thread.
+    """
+    transaction_hash = normalize_transaction_hash(tx_hash)
+    payment = await Payment.objects.filter(transaction_hash=transaction_hash).afirst()
+    if payment is None:
+        return payment_not_found_response()
+    
+    data = payment_status_data(payment)
+    if wants_event_stream(request):
+        return event_stream_response(async_status_events(transaction_hash, data))
+    
+    return JsonResponse(await async_wait_for_change(
+        transaction_hash, data, request.GET.get('status'), request.GET.get('confirmations')
+    ))
+
+
+@require_http_methods(["GET"])
+async def get_payment_info(request):
+    """
+    Get payment information (wallet address, amount, etc.)
+    """
+    return payment_info_response()
+
+
+@require_http_methods(["GET"])
+async def download_business_card(request, token):
+    """
+    Download business card after payment verification
+    
+    Without ?format= the response is JSON listing the download URLs;
+    ?format=png or ?format=pdf streams the rendered card.
+    """
+    try:
+        payment = await Payment.objects.aget(download_token=token)
+        card_format = request.GET.get('format')
+        if card_format is None:
+            return download_response(request, payment)
+        
+        error = download_error_response(payment, card_format)
+        if error is not None:
+            return error
+        # Waiting on the render pool (and storage) happens off the event loop
+        storage, name, key = await sync_to_async(card_file, thread_sensitive=False)(card_format)
+        return card_download_response(request, card_format, storage, name, key)
+        
+    except Payment.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid download token'
+        }, status=404)
+    except Exception as e:
+        logger.error(f"Error downloading business card: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Server error'
+        }, status=500)
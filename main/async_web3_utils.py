@@ -0,0 +1,227 @@
+"""
+Async Web3 utilities for blockchain transaction verification on the ASGI stack
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from web3 import AsyncWeb3
+from web3.providers.async_rpc import AsyncHTTPProvider
+from .web3_utils import (
+    ChunkVerification,
+    batch_payload,
+    failed_result,
+    get_rpc_pool,
+    order_batch_responses,
+    verification_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+# aiohttp sessions are bound to an event loop, so clients are kept per loop:
+# loop -> {rpc_url: AsyncWeb3Client}
+_async_clients = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that sends every request through one shared aiohttp session"""
+
+    def __init__(self, endpoint_uri, session):
+        super().__init__(endpoint_uri)
+        self.session = session
+        self.last_success = 0.0
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        async with self.session.post(self.endpoint_uri, data=request_data, headers=self.get_request_headers()) as response:
+            response.raise_for_status()
+            raw_response = await response.read()
+        self.last_success = time.monotonic()
+        return self.decode_rpc_response(raw_response)
+
+
+class AsyncWeb3Client:
+    """AsyncWeb3 instance bound to one RPC endpoint, shared by every coroutine on a loop"""
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.RPC_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=settings.RPC_TIMEOUT),
+        )
+        self.provider = PooledAsyncHTTPProvider(rpc_url, self.session)
+        self.w3 = AsyncWeb3(self.provider)
+
+    async def is_healthy(self):
+        """Check connectivity, skipping the round trip if a request succeeded recently"""
+        if time.monotonic() - self.provider.last_success < settings.RPC_HEALTH_CHECK_INTERVAL:
+            return True
+        return await self.w3.is_connected()
+
+    async def batch_request(self, calls):
+        """Send several JSON-RPC calls in one HTTP request (see Web3Client.batch_request)"""
+        payload = batch_payload(calls)
+        async with self.session.post(self.rpc_url, json=payload) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+        if not isinstance(body, list):
+            # Some providers reject batches outright; fall back to concurrent single calls
+            logger.warning(f"RPC endpoint {self.rpc_url} does not accept batch requests")
+            body = await asyncio.gather(*(self._post(item) for item in payload))
+        self.provider.last_success = time.monotonic()
+        return order_batch_responses(body, len(calls))
+
+    async def _post(self, item):
+        async with self.session.post(self.rpc_url, json=item) as response:
+            return await response.json(content_type=None)
+
+    async def close(self):
+        await self.session.close()
+
+
+def get_async_web3_client(rpc_url=None):
+    """Get (or lazily create) the pooled async client for an RPC endpoint on the running loop"""
+    rpc_url = rpc_url or settings.RPC_URL
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(rpc_url)
+        if client is None:
+            client = AsyncWeb3Client(rpc_url)
+            clients[rpc_url] = client
+    return client
+
+
+async def reset_async_web3_connection(rpc_url=None):
+    """Drop the running loop's pooled async client so the next call reconnects"""
+    rpc_url = rpc_url or settings.RPC_URL
+    with _async_clients_lock:
+        client = _async_clients.get(asyncio.get_running_loop(), {}).pop(rpc_url, None)
+    if client:
+        await client.close()
+
+
+async def async_send(endpoint, calls):
+    """Send a batch to one endpoint, recording its latency or failure in the shared RPCPool stats"""
+    started = time.monotonic()
+    try:
+        responses = await get_async_web3_client(endpoint.rpc_url).batch_request(calls)
+    except Exception as e:
+        endpoint.record_failure()
+        if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError)):
+            await reset_async_web3_connection(endpoint.rpc_url)
+        raise
+    endpoint.record_success(time.monotonic() - started)
+    return responses
+
+
+async def async_rpc_batch(calls, rpc_url=None):
+    """Send (method, params) calls as one batched JSON-RPC request, routed like web3_utils.rpc_batch()"""
+    if rpc_url:
+        return await get_async_web3_client(rpc_url).batch_request(calls)
+    
+    endpoints = get_rpc_pool().ranked()
+    if settings.RPC_HEDGE_REQUESTS and len(endpoints) > 1:
+        return await _async_hedged_batch(endpoints, calls)
+    
+    error = None
+    for endpoint in endpoints:
+        try:
+            return await async_send(endpoint, calls)
+        except Exception as e:
+            logger.warning(f"RPC endpoint {endpoint.rpc_url} failed: {str(e)}")
+            error = e
+    raise error
+
+
+async def _async_hedged_batch(endpoints, calls):
+    """Async counterpart of RPCPool._hedged_request(); losing requests are cancelled"""
+    remaining = list(endpoints)
+    in_flight = {}
+    error = None
+
+    def launch():
+        endpoint = remaining.pop(0)
+        in_flight[asyncio.ensure_future(async_send(endpoint, calls))] = endpoint
+        return endpoint.percentile(0.95)
+
+    hedge_after = launch()
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(
+                in_flight, timeout=hedge_after if remaining else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                hedge_after = launch()
+                continue
+            for task in done:
+                endpoint = in_flight.pop(task)
+                try:
+                    return task.result()
+                except Exception as e:
+                    logger.warning(f"RPC endpoint {endpoint.rpc_url} failed: {str(e)}")
+                    error = e
+            if remaining:
+                hedge_after = launch()
+        raise error
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def get_async_web3_connection():
+    """Get pooled AsyncWeb3 connection to the best healthy RPC endpoint"""
+    for endpoint in get_rpc_pool().ranked():
+        try:
+            client = get_async_web3_client(endpoint.rpc_url)
+            if await client.is_healthy():
+                return client.w3
+            logger.error(f"Failed to connect to RPC: {endpoint.rpc_url}")
+        except Exception as e:
+            logger.error(f"Error connecting to Web3: {str(e)}")
+        endpoint.record_failure()
+        await reset_async_web3_connection(endpoint.rpc_url)
+    return None
+
+
+async def async_verify_transactions(transaction_hashes, expected_to_address, expected_amount_eth):
+    """
+    Verify many blockchain transactions without blocking the event loop
+
+    Same batching and caching as web3_utils.verify_transactions(); cache and
+    database lookups run in a worker thread, RPCs on the loop.
+    """
+    results = {}
+    chunks = verification_chunks(transaction_hashes)
+    if not chunks:
+        return results
+
+    w3 = await get_async_web3_connection()
+    if not w3:
+        return {
+            tx_hash: failed_result('Failed to connect to blockchain', rpc_error=True)
+            for chunk in chunks for tx_hash in chunk
+        }
+
+    for chunk in chunks:
+        batch = await sync_to_async(ChunkVerification)(chunk, expected_to_address, expected_amount_eth)
+        try:
+            responses = await async_rpc_batch(batch.calls) if batch.calls else []
+        except Exception as e:
+            # Every endpoint failed; async_send() has already reset their clients
+            results.update(batch.failed(e))
+            continue
+        results.update(await sync_to_async(batch.complete)(responses))
+
+    return results
+
+
+async def async_verify_transaction(transaction_hash, expected_to_address, expected_amount_eth):
+    """Verify a blockchain transaction in a single batched round trip"""
+    results = await async_verify_transactions([transaction_hash], expected_to_address, expected_amount_eth)
+    return results[transaction_hash]
@@ -0,0 +1,199 @@
+"""
+Server-side rendering of the paid business card deliverable
+
+The card is drawn with Pillow as a high-resolution PNG (front only) or a
+print-size two-page PDF (front and back) in a process pool, so the CPU work
+stays out of web workers. Output is cached in a private storage at
+BUSINESS_CARD_ROOT (outside MEDIA_ROOT, so no public URL reaches it), named
+after a SHA-256 of the template version and every input that affects the
+drawing: repeat downloads stream the stored file, and a change to the card
+text, resolution or CARD_TEMPLATE_VERSION produces a new name instead of
+serving a stale render.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, ImageDraw, ImageFont
+from .singleflight import SingleFlight, lease
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the drawing code changes so cached renders are not reused
+CARD_TEMPLATE_VERSION = 1
+
+CARD_FORMATS = {
+    # name: (MIME type, file extension)
+    'png': ('image/png', 'png'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+
+# Physical card size in inches (US business card, as in business-card-3d.js)
+CARD_WIDTH_INCHES = 3.5
+CARD_HEIGHT_INCHES = 2.0
+
+# Colours of the 3D card's materials
+BACKGROUND = (13, 13, 13)
+BACK_BACKGROUND = (26, 26, 26)
+NAME_COLOR = (0, 255, 136)
+TAGLINE_COLOR = (255, 255, 255)
+CONTACT_COLOR = (74, 144, 226)
+
+RENDER_TIMEOUT_SECONDS = 60
+
+# Concurrent downloads of a card that isn't rendered yet share one render
+renders = SingleFlight()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def card_inputs():
+    """Everything the drawing depends on besides the template itself"""
+    return {
+        'name': settings.BUSINESS_CARD_NAME,
+        'tagline': settings.BUSINESS_CARD_TAGLINE,
+        'contact': settings.BUSINESS_CARD_CONTACT,
+        'dpi': settings.BUSINESS_CARD_DPI,
+    }
+
+
+def card_key(inputs, card_format):
+    """Content hash of (template version, format, inputs)"""
+    payload = json.dumps(
+        {'template': CARD_TEMPLATE_VERSION, 'format': card_format, 'inputs': inputs},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def card_storage():
+    """Private storage for rendered cards; only card downloads read from it"""
+    return FileSystemStorage(location=settings.BUSINESS_CARD_ROOT, base_url=None)
+
+
+def card_name(key, card_format):
+    return f'{key}.{CARD_FORMATS[card_format][1]}'
+
+
+def draw_face(size, dpi, background, lines):
+    """
+    One side of the card: a background with an inset border and centred text
+
+    lines are (text, colour, cap height in inches, vertical centre as a
+    fraction of the card height).
+    """
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    inset = round(0.08 * dpi)
+    draw.rectangle(
+        (inset, inset, width - inset - 1, height - inset - 1),
+        outline=NAME_COLOR,
+        width=max(1, round(0.01 * dpi)),
+    )
+    for text, color, text_height, position in lines:
+        if not text:
+            continue
+        font = ImageFont.load_default(size=round(text_height * dpi))
+        # Shrink text that would run into the border
+        max_width = width - 4 * inset
+        text_width = draw.textlength(text, font=font)
+        if text_width > max_width:
+            font = ImageFont.load_default(size=max(1, int(font.size * max_width / text_width)))
+        draw.text((width / 2, height * position), text, fill=color, font=font, anchor='mm')
+    return image
+
+
+def render_card(inputs, card_format):
+    """
+    The card's bytes in a CARD_FORMATS format
+
+    A plain function of its arguments (no settings or database access) so it
+    can run in a spawned worker process.
+    """
+    dpi = inputs['dpi']
+    size = (round(CARD_WIDTH_INCHES * dpi), round(CARD_HEIGHT_INCHES * dpi))
+    front = draw_face(size, dpi, BACKGROUND, [
+        (inputs['name'], NAME_COLOR, 0.32, 0.3),
+        (inputs['tagline'], TAGLINE_COLOR, 0.14, 0.52),
+        (inputs['contact'], CONTACT_COLOR, 0.12, 0.75),
+    ])
+    buffer = BytesIO()
+    if card_format == 'pdf':
+        back = draw_face(size, dpi, BACK_BACKGROUND, [(inputs['name'], NAME_COLOR, 0.22, 0.5)])
+        # resolution makes the page the physical card size
+        front.save(buffer, 'PDF', resolution=dpi, save_all=True, append_images=[back])
+    else:
+        front.save(buffer, 'PNG', optimize=True, dpi=(dpi, dpi))
+    return buffer.getvalue()
+
+
+def get_executor():
+    """The shared render pool, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork: forking a threaded server process can deadlock the child
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.BUSINESS_CARD_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def reset_executor():
+    """Drop a broken pool (a worker died) so the next render starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def render_in_pool(inputs, card_format):
+    """render_card() in the process pool, or inline with BUSINESS_CARD_WORKERS=0"""
+    if settings.BUSINESS_CARD_WORKERS <= 0:
+        return render_card(inputs, card_format)
+    try:
+        return get_executor().submit(render_card, inputs, card_format).result(timeout=RENDER_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        reset_executor()
+        raise
+
+
+def store_card(storage, inputs, card_format, name):
+    """Render a card into storage unless another process gets there first"""
+    with lease(f'business-card:{name}', RENDER_TIMEOUT_SECONDS):
+        # Holder or not, the file may exist by now
+        if storage.exists(name):
+            return
+        data = render_in_pool(inputs, card_format)
+        saved = storage.save(name, ContentFile(data))
+        if saved != name:
+            # Lost a race with another process; its copy is identical
+            storage.delete(saved)
+        logger.info(f"Rendered business card {name} ({len(data)} bytes)")
+
+
+def card_file(card_format):
+    """
+    The current card in card_storage(), rendering it if needed
+
+    Returns:
+        (storage, name, key) where key doubles as the file's ETag
+    """
+    inputs = card_inputs()
+    key = card_key(inputs, card_format)
+    name = card_name(key, card_format)
+    storage = card_storage()
+    if not storage.exists(name):
+        renders.do(name, store_card, storage, inputs, card_format, name)
+    return storage, name, key
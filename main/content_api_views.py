@@ -0,0 +1,257 @@
+"""
+API views for portfolio content
+"""
+import base64
+import binascii
+import json
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.text import Truncator
+from django.views.decorators.http import require_http_methods
+from .content_cache import cache_content_page, conditional_content_page
+from .models import Partner, Project, ProjectImage
+from .search import SearchResults
+from .views import get_project_document
+
+SEARCH_PAGE_SIZE = 10
+MAX_SEARCH_PAGE_SIZE = 50
+LIST_PAGE_SIZE = 20
+MAX_LIST_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 50  # Rows fetched (and prefetched for) per database round trip while streaming
+
+
+def file_url(field):
+    return field.url if field else None
+
+
+# Serializable fields: name -> (columns to load, value getter). Fields without
+# columns of their own are filled from prefetches (see *_PREFETCHES).
+PROJECT_FIELDS = {
+    'id': (('id',), lambda project: project.id),
+    'title': (('title',), lambda project: project.title),
+    'classification': (('classification',), lambda project: project.classification),
+    'project_type': (('project_type',), lambda project: project.project_type),
+    'description': (('description',), lambda project: project.description),
+    'specifications': (('specifications',), lambda project: project.specifications),
+    'technologies': ((), lambda project: project.get_technologies_list()),
+    'github_url': (('github_url',), lambda project: project.github_url),
+    'live_url': (('live_url',), lambda project: project.live_url),
+    'featured_image': (('featured_image',), lambda project: file_url(project.featured_image)),
+    'white_paper': (('white_paper',), lambda project: file_url(project.white_paper)),
+    'images': ((), lambda project: [
+        {'url': image.image.url, 'caption': image.caption} for image in project.images.all()
+    ]),
+    'url': ((), lambda project: project.get_absolute_url()),
+    'updated_date': (('updated_date',), lambda project: project.updated_date),
+}
+PROJECT_PREFETCHES = {
+    'technologies': 'technologies',
+    'images': Prefetch('images', queryset=ProjectImage.objects.only('id', 'project_id', 'image', 'caption', 'order')),
+}
+
+AGENT_FIELDS = {
+    'id': (('id',), lambda agent: agent.id),
+    'name': (('name',), lambda agent: agent.name),
+    'description': (('description',), lambda agent: agent.description),
+    'profile_picture': (('profile_picture',), lambda agent: file_url(agent.profile_picture)),
+    'order': (('order',), lambda agent: agent.order),
+    'url': ((), lambda agent: agent.get_absolute_url()),
+    'updated_date': (('updated_date',), lambda agent: agent.updated_date),
+}
+
+
+def parse_page_size(value, default, maximum):
+    """Clamp a ?page_size= value to 1..maximum, falling back to the default"""
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+@require_http_methods(["GET"])
+def search_projects(request):
+    """
+    Ranked full-text search over active projects
+
+    Query params: q, page, page_size (max 50)
+    """
+    query = request.GET.get('q', '').strip()
+    page_size = parse_page_size(request.GET.get('page_size'), SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE)
+    paginator = Paginator(SearchResults(query), page_size)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except PageNotAnInteger:
+        page = paginator.page(1)
+    except EmptyPage:
+        return JsonResponse({
+            'success': False,
+            'error': 'Page out of range'
+        }, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'page': page.number,
+        'page_size': page_size,
+        'total': paginator.count,
+        'num_pages': paginator.num_pages,
+        'results': [
+            {
+                'id': project.id,
+                'title': project.title,
+                'classification': project.classification,
+                'project_type': project.project_type,
+                'technologies': project.get_technologies_list(),
+                'url': reverse('main:project_detail', args=[project.id]),
+                'excerpt': Truncator(project.description).words(30),
+            }
+            for project in page.object_list
+        ],
+    })
+
+
+@require_http_methods(["GET"])
+@cache_content_page
+def project_fragment(request, pk):
+    """
+    Rendered dossier document for one project, loaded when a portfolio tab is clicked
+    """
+    project = get_project_document(pk)
+    if project is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Project not found'
+        }, status=404)
+
+    html = render_to_string('main/partials/project_document.html', {
+        'selected_project': project,
+        'selected_tech': request.GET.get('tech', '').strip(),
+    }, request=request)
+    return JsonResponse({
+        'success': True,
+        'id': project.id,
+        'title': project.title,
+        'html': html,
+    })
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Key values from an opaque ?cursor=, or ValueError if it isn't one of ours"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def after_key(key_fields, values):
+    """Rows strictly after `values` in (key_fields) order, as an index-friendly Q"""
+    condition = Q()
+    for i, field in enumerate(key_fields):
+        condition |= Q(**dict(zip(key_fields[:i], values[:i])), **{f'{field}__gt': values[i]})
+    return condition
+
+
+def parse_fields(value, available):
+    """Requested ?fields= names (default: all), or ValueError naming the unknown ones"""
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def keyset_list_response(request, queryset, available, key_fields, prefetches=None):
+    """
+    Stream one keyset-paginated page of `queryset` as JSON
+
+    Pages are ordered by key_fields and continue after the ?cursor= of the
+    previous page, so a page costs the same however deep the client has
+    paged. Only the columns and prefetches needed for ?fields= are loaded.
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'), available)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            queryset = queryset.filter(after_key(key_fields, decode_cursor(cursor, len(key_fields))))
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    limit = parse_page_size(request.GET.get('limit'), LIST_PAGE_SIZE, MAX_LIST_PAGE_SIZE)
+
+    columns = set(key_fields)
+    for name in fields:
+        columns.update(available[name][0])
+    queryset = queryset.only(*columns).order_by(*key_fields)
+    for name in fields:
+        if prefetches and name in prefetches:
+            queryset = queryset.prefetch_related(prefetches[name])
+    rows = queryset[:limit + 1].iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+    def next_url(obj):
+        params = {key: value for key, value in request.GET.items() if key != 'cursor'}
+        params['cursor'] = encode_cursor([getattr(obj, field) for field in key_fields])
+        return f'{request.path}?{urlencode(params)}'
+
+    def stream():
+        yield '{"success": true, "results": ['
+        last = None
+        next_page = None
+        for i, obj in enumerate(rows):
+            if i == limit:
+                next_page = next_url(last)
+                break
+            item = {name: available[name][1](obj) for name in fields}
+            yield (',' if i else '') + json.dumps(item, cls=DjangoJSONEncoder)
+            last = obj
+        yield '], "next": ' + json.dumps(next_page) + '}'
+
+    return StreamingHttpResponse(stream(), content_type='application/json')
+
+
+@require_http_methods(["GET"])
+@conditional_content_page
+def project_list(request):
+    """
+    Active projects in id order
+
+    Query params: fields (comma-separated), limit (max 100), cursor (from the previous page's "next")
+    """
+    return keyset_list_response(
+        request,
+        Project.objects.filter(is_active=True),
+        PROJECT_FIELDS,
+        ('id',),
+        PROJECT_PREFETCHES,
+    )
+
+
+@require_http_methods(["GET"])
+@conditional_content_page
+def agent_list(request):
+    """
+    Active agents in display order
+
+    Query params: fields (comma-separated), limit (max 100), cursor (from the previous page's "next")
+    """
+    return keyset_list_response(
+        request,
+        Partner.objects.filter(is_active=True),
+        AGENT_FIELDS,
+        ('order', 'id'),
+    )
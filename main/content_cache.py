@@ -0,0 +1,177 @@
+"""
+Cache of rendered content pages, invalidated when the content behind them changes
+
+Pages are stored under the current content version. The version is a digest
+of cheap aggregates (latest updated_date and row counts) over the models the
+pages render. Saves and deletes of those models replace the version (see
+main.signals), so stale entries are never read again and simply expire.
+
+The same version doubles as the pages' ETag, so browsers revalidating an
+unchanged page get a 304 without the page being rendered or read from cache.
+"""
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .models import Partner, Project, ProjectImage
+from .routers import primary_reads
+
+CONTENT_VERSION_KEY = 'content:state'
+PAGE_KEY_PREFIX = 'content:page'
+
+# Query parameters the cached pages vary on. Any others (tracking tags,
+# cache busters) share the page's entry instead of each adding a new one.
+PAGE_KEY_PARAMS = ('project', 'tech')
+
+
+def content_aggregates(using=None):
+    """Latest change and row count per content model, from one aggregate query each"""
+    projects = Project.objects.using(using or router.db_for_read(Project)).aggregate(
+        updated=Max('updated_date'), count=Count('id')
+    )
+    partners = Partner.objects.using(using or router.db_for_read(Partner)).aggregate(
+        updated=Max('updated_date'), count=Count('id')
+    )
+    # ProjectImage has no timestamp; ids are never reused, so the newest id stands in
+    images = ProjectImage.objects.using(using or router.db_for_read(ProjectImage)).aggregate(
+        updated=Max('id'), count=Count('id')
+    )
+    return projects, partners, images
+
+
+def compute_content_state(using=None, nonce='', last_modified=None):
+    """
+    (version, last_modified, data) for the content as it is now
+
+    data digests the aggregates alone, without the nonce, so a replica can be
+    checked against it. last_modified defaults to the newest updated_date,
+    which misses deletions; refresh_content_version() passes the time of the
+    change instead.
+    """
+    aggregates = content_aggregates(using)
+    data = hashlib.md5(str(aggregates).encode()).hexdigest()[:16]
+    version = hashlib.md5(f'{aggregates}{nonce}'.encode()).hexdigest()[:16]
+    if last_modified is None:
+        projects, partners, _ = aggregates
+        timestamps = [value for value in (projects['updated'], partners['updated']) if value]
+        last_modified = max(timestamps) if timestamps else None
+    return version, last_modified, data
+
+
+def content_state():
+    """Current (version, last_modified, data), computed and shared through the cache on first use"""
+    state = cache.get(CONTENT_VERSION_KEY)
+    if state is None:
+        # From the primary, like refresh_content_version(): a lagging replica
+        # would publish an old version that stays until the next change
+        state = compute_content_state(DEFAULT_DB_ALIAS)
+        # add() so a concurrent refresh_content_version() isn't overwritten
+        if not cache.add(CONTENT_VERSION_KEY, state, None):
+            state = cache.get(CONTENT_VERSION_KEY, state)
+    return state
+
+
+def content_version():
+    return content_state()[0]
+
+
+def content_last_modified():
+    return content_state()[1]
+
+
+def refresh_content_version(using=None):
+    """
+    Start a new content version once the current transaction commits
+
+    Aggregates are read from the primary so a lagging replica can't bring the
+    old version back. The nonce covers changes the aggregates don't see, such
+    as re-tagging a project.
+    """
+    using = using or router.db_for_write(Project)
+
+    def refresh():
+        state = compute_content_state(using, nonce=time.time_ns(), last_modified=timezone.now())
+        cache.set(CONTENT_VERSION_KEY, state, None)
+
+    transaction.on_commit(refresh, using=using)
+
+
+def replica_caught_up(state):
+    """Whether content reads (the replica, unless pinned) see at least the content of state"""
+    using = router.db_for_read(Project)
+    if using == DEFAULT_DB_ALIAS:
+        return True
+    return compute_content_state(using)[2] == state[2]
+
+
+def page_cache_key(request, version):
+    params = urlencode(sorted(
+        (name, value) for name in PAGE_KEY_PARAMS for value in request.GET.getlist(name)
+    ))
+    path = hashlib.md5(f'{request.path}?{params}'.encode()).hexdigest()
+    return f'{PAGE_KEY_PREFIX}:{version}:{path}'
+
+
+def cache_content_page(view_func):
+    """
+    Serve GET/HEAD responses of a content view from the cache while the content version is unchanged
+
+    Only successful responses that set no cookies are stored. A hit costs two
+    cache reads and no database queries. Misses render from the replica once
+    it has caught up with the version, and from the primary until then: a page
+    rendered from a lagging replica just after a change would be cached under
+    the new version and served stale until it expires. Query parameters
+    outside PAGE_KEY_PARAMS are left out of the key.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.CONTENT_CACHE_SECONDS
+        if not timeout or request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+
+        state = content_state()
+        key = page_cache_key(request, state[0])
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        with nullcontext() if replica_caught_up(state) else primary_reads():
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, (response.content, response['Content-Type']), timeout)
+        return response
+
+    return wrapper
+
+
+def conditional_content_page(view_func):
+    """
+    Answer conditional GETs of a content view with 304 Not Modified while the content version is unchanged
+
+    Responses carry the version as ETag plus Last-Modified, and must be
+    revalidated before reuse so edits are picked up on the next visit.
+    """
+    conditional_view = condition(
+        etag_func=lambda request, *args, **kwargs: content_version(),
+        last_modified_func=lambda request, *args, **kwargs: content_last_modified(),
+    )(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    return wrapper
@@ -0,0 +1,208 @@
+"""
+Local stand-in for an Ethereum JSON-RPC provider, for load testing without a real one
+
+FakeChain holds scriptable blocks, transactions and receipts; FakeRPCServer
+serves it over HTTP (single and batched requests) with optional latency and
+error injection, and counts every call it answers.
+"""
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _hex(value):
+    return hex(value)
+
+
+class FakeChain:
+    """In-memory chain state: a head block number plus transactions and their receipts"""
+
+    def __init__(self, block_number=1000000):
+        self.block_number = block_number
+        self.transactions = {}  # tx hash -> transaction object
+        self.receipts = {}  # tx hash -> receipt object (absent while pending)
+        self._lock = threading.Lock()
+
+    def mine(self, blocks=1):
+        """Advance the chain head"""
+        with self._lock:
+            self.block_number += blocks
+            return self.block_number
+
+    def add_transaction(self, to_address, value_wei, from_address=None, status=1, confirmations=0, mined=True):
+        """
+        Add a transaction, mined `confirmations` blocks below the head (or left pending)
+
+        Returns:
+            the new transaction hash
+        """
+        tx_hash = '0x' + secrets.token_hex(32)
+        from_address = from_address or '0x' + secrets.token_hex(20)
+        with self._lock:
+            block_number = self.block_number - confirmations
+            self.transactions[tx_hash] = {
+                'hash': tx_hash,
+                'from': from_address,
+                'to': to_address,
+                'value': _hex(value_wei),
+                'blockNumber': _hex(block_number) if mined else None,
+            }
+            if mined:
+                self.receipts[tx_hash] = {
+                    'transactionHash': tx_hash,
+                    'blockNumber': _hex(block_number),
+                    'status': _hex(status),
+                    'from': from_address,
+                    'to': to_address,
+                }
+        return tx_hash
+
+    def mine_transaction(self, tx_hash, status=1):
+        """Include a pending transaction in the current head block"""
+        with self._lock:
+            tx = self.transactions[tx_hash]
+            tx['blockNumber'] = _hex(self.block_number)
+            self.receipts[tx_hash] = {
+                'transactionHash': tx_hash,
+                'blockNumber': _hex(self.block_number),
+                'status': _hex(status),
+                'from': tx['from'],
+                'to': tx['to'],
+            }
+
+    def call(self, method, params):
+        """Answer one JSON-RPC method; raises KeyError for unsupported methods"""
+        with self._lock:
+            if method == 'eth_blockNumber':
+                return _hex(self.block_number)
+            if method == 'eth_getTransactionReceipt':
+                return self.receipts.get(params[0].lower())
+            if method == 'eth_getTransactionByHash':
+                return self.transactions.get(params[0].lower())
+            if method == 'eth_chainId':
+                return _hex(1)
+            if method == 'net_version':
+                return '1'
+            if method == 'web3_clientVersion':
+                return 'FakeChain/1.0'
+        raise KeyError(method)
+
+
+class FakeRPCServer:
+    """
+    Serve a FakeChain over HTTP JSON-RPC on a background thread
+
+    Args:
+        chain: the FakeChain to serve
+        latency: seconds added to every HTTP request
+        jitter: extra random latency, up to this many seconds
+        error_rate: fraction of HTTP requests answered with 429 Too Many Requests
+        block_time: if set, mine a block every this many seconds
+    """
+
+    def __init__(self, chain=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, block_time=None):
+        self.chain = chain or FakeChain()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.block_time = block_time
+        self.http_requests = 0
+        self.rpc_calls = 0
+        self.calls_by_method = {}
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._threads.append(threading.Thread(target=self._httpd.serve_forever, name='fake-rpc', daemon=True))
+        if self.block_time:
+            self._threads.append(threading.Thread(target=self._mine_blocks, name='fake-rpc-miner', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Run in the foreground until interrupted"""
+        self.start()
+        try:
+            while not self._stopped.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.http_requests = 0
+            self.rpc_calls = 0
+            self.calls_by_method = {}
+
+    def _mine_blocks(self):
+        while not self._stopped.wait(self.block_time):
+            self.chain.mine()
+
+    def _record(self, items):
+        with self._stats_lock:
+            self.http_requests += 1
+            self.rpc_calls += len(items)
+            for item in items:
+                method = item.get('method')
+                self.calls_by_method[method] = self.calls_by_method.get(method, 0) + 1
+
+    def _answer(self, item):
+        response = {'jsonrpc': '2.0', 'id': item.get('id')}
+        try:
+            response['result'] = self.chain.call(item.get('method'), item.get('params') or [])
+        except KeyError:
+            response['error'] = {'code': -32601, 'message': f"Method not found: {item.get('method')}"}
+        return response
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like real providers
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+                items = body if isinstance(body, list) else [body]
+                server._record(items)
+
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+
+                if server.error_rate and random.random() < server.error_rate:
+                    self._send(429, b'{"error": "rate limited"}')
+                    return
+
+                answers = [server._answer(item) for item in items]
+                self._send(200, json.dumps(answers if isinstance(body, list) else answers[0]).encode())
+
+            def _send(self, status, data):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
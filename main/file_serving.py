@@ -0,0 +1,177 @@
+"""
+Serving stored files with validators, byte ranges and optional proxy offload
+
+serve_file() answers conditional requests (If-None-Match / If-Modified-Since)
+with 304 and single byte ranges with 206. With FILE_SENDFILE_BACKEND set, the
+body is left to the front proxy via X-Sendfile or X-Accel-Redirect, which
+also handles ranges. Otherwise full files go out through FileResponse, which
+uses the server's zero-copy wsgi.file_wrapper where available.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single-range Range header, inclusive
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range), and raises ValueError when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """Whether a Range request's If-Range precondition (if any) still holds"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return not if_range.startswith('W/') and if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) == date
+
+
+def file_chunks(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def sendfile_response(name, path, prefix):
+    """
+    Empty response telling the front proxy which file to send, or None if offload is off
+
+    X-Accel-Redirect needs `prefix`, an internal nginx location aliased to the
+    root of the storage holding `name`; without one the file isn't offloaded.
+    """
+    backend = settings.FILE_SENDFILE_BACKEND
+    if backend == 'x-accel-redirect':
+        if not prefix:
+            return None
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    return None
+
+
+def serve_file(request, storage, name, etag=None, filename=None, as_attachment=False, content_type=None,
+               content_encoding=None, cache_control=None, sendfile_prefix=None):
+    """
+    Response for a file in `storage`
+
+    Args:
+        etag: strong validator for the file's bytes (e.g. its SHA-256); defaults
+            to one derived from size and modification time
+        filename: name offered to the browser in Content-Disposition (with
+            as_attachment and no filename, the file's base name)
+        as_attachment: download instead of displaying inline
+        content_type: defaults to a guess from the name
+        content_encoding: set when `name` is a precompressed variant (e.g. 'br')
+        cache_control: patch_cache_control() arguments (default: public, no-cache)
+        sendfile_prefix: X-Accel-Redirect location aliased to the storage's root
+            (default: FILE_SENDFILE_PREFIX, which maps MEDIA_ROOT)
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage: let the storage backend serve it
+        return HttpResponseRedirect(storage.url(name))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404('File not found')
+    if not os.path.isfile(path):
+        raise Http404('File not found')
+
+    size = stat.st_size
+    last_modified = stat.st_mtime
+    etag = quote_etag(etag or f'{size:x}-{stat.st_mtime_ns:x}')
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        patch_cache_control(response, **(cache_control or {'public': True, 'no_cache': True}))
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return finish(not_modified)
+
+    disposition = None
+    if filename or as_attachment:
+        disposition = content_disposition(filename or os.path.basename(name), as_attachment)
+    if sendfile_prefix is None:
+        sendfile_prefix = settings.FILE_SENDFILE_PREFIX
+    offloaded = sendfile_response(name, path, sendfile_prefix)
+    if offloaded is not None:
+        offloaded['Content-Type'] = content_type
+        if disposition:
+            offloaded['Content-Disposition'] = disposition
+        return finish(offloaded)
+
+    byte_range = None
+    if request.method == 'GET' and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return finish(response)
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(file_chunks(path, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return finish(response)
@@ -0,0 +1,128 @@
+"""
+Views that serve uploaded files (see main.file_serving)
+"""
+import mimetypes
+import posixpath
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+from .file_serving import serve_file
+from .models import Project
+from .storage import COMPRESSIBLE_EXTENSIONS
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Media directories only served through views that check access (white papers
+# of inactive projects must stay hidden), never straight from /media/
+PRIVATE_MEDIA_DIRS = (Project._meta.get_field('white_paper').upload_to,)
+# Content-Encoding token -> suffix of the precompressed variant, best first
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@require_http_methods(["GET", "HEAD"])
+def white_paper(request, pk):
+    """
+    A project's white paper, inline or with ?download=1 as an attachment
+
+    The ETag is the file's SHA-256 once the media worker has recorded it.
+    """
+    project = get_object_or_404(
+        Project.objects.only('id', 'title', 'white_paper', 'white_paper_info'), pk=pk, is_active=True
+    )
+    if not project.white_paper:
+        raise Http404('No white paper')
+    info = project.white_paper_info or {}
+    etag = info.get('sha256') if info.get('source') == project.white_paper.name else None
+    return serve_file(
+        request,
+        project.white_paper.storage,
+        project.white_paper.name,
+        etag=etag,
+        filename=posixpath.basename(project.white_paper.name),
+        as_attachment=bool(request.GET.get('download')),
+    )
+
+
+def clean_path(path):
+    """Storage-relative form of a URL path, refusing anything outside the storage root"""
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or not path or path == '.':
+        raise Http404('File not found')
+    return path
+
+
+@require_http_methods(["GET", "HEAD"])
+def media_file(request, path):
+    """Any public file under MEDIA_ROOT, such as the home page background video"""
+    path = clean_path(path)
+    if path.startswith(PRIVATE_MEDIA_DIRS):
+        raise Http404('File not found')
+    return serve_file(request, default_storage, path)
+
+
+@lru_cache(maxsize=1)
+def hashed_static_names():
+    """Content-hashed names from the collectstatic manifest (empty without a manifest storage)"""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return frozenset(hashed for name, hashed in hashed_files.items() if hashed != name)
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+@require_http_methods(["GET", "HEAD"])
+def static_file(request, path):
+    """
+    A collected static file, precompressed if the client accepts it
+
+    Content-hashed names from the manifest never change, so they are cached
+    for a year as immutable; anything else must be revalidated.
+    """
+    path = clean_path(path)
+    if path.endswith(tuple(suffix for _, suffix in STATIC_ENCODINGS)):
+        raise Http404('File not found')
+
+    if path in hashed_static_names():
+        cache_control = {'public': True, 'max_age': IMMUTABLE_MAX_AGE, 'immutable': True}
+    else:
+        cache_control = {'public': True, 'no_cache': True}
+
+    compressible = posixpath.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+    name, encoding = path, None
+    if compressible:
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for coding, suffix in STATIC_ENCODINGS:
+            if coding in accepted and staticfiles_storage.exists(path + suffix):
+                name, encoding = path + suffix, coding
+                break
+
+    response = serve_file(
+        request,
+        staticfiles_storage,
+        name,
+        content_type=mimetypes.guess_type(path)[0],
+        content_encoding=encoding,
+        cache_control=cache_control,
+        sendfile_prefix=settings.FILE_SENDFILE_STATIC_PREFIX,
+    )
+    if compressible:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,151 @@
+"""
+Responsive image variants: resized AVIF/WebP/JPEG renditions of uploaded images
+
+Each image field listed in VARIANT_FIELDS has a sibling JSONField named
+<field>_variants holding a manifest of its renditions. Renditions are stored
+next to the original, named after a digest of the source, and regenerated
+only when the field points at a different file. Templates read the manifest
+(see main.templatetags.image_variants), so rendering a srcset costs no
+storage access.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# (app_label.ModelName, image field) pairs that get variants
+VARIANT_FIELDS = (
+    ('main.Project', 'featured_image'),
+    ('main.ProjectImage', 'image'),
+    ('main.Partner', 'profile_picture'),
+)
+
+FORMATS = {
+    # name: (Pillow format, MIME type, file extension, Pillow feature that must be available)
+    'avif': ('AVIF', 'image/avif', 'avif', 'avif'),
+    'webp': ('WEBP', 'image/webp', 'webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', None),
+}
+
+
+def manifest_field(field_name):
+    return f'{field_name}_variants'
+
+
+def available_formats():
+    """Configured variant formats this Pillow build can encode, best first"""
+    formats = []
+    for name in settings.IMAGE_VARIANT_FORMATS:
+        if name not in FORMATS:
+            continue
+        feature = FORMATS[name][3]
+        if feature is None or features.check(feature):
+            formats.append(name)
+    return formats
+
+
+def variant_widths(width):
+    """Configured widths below the source width, plus the source width capped at the largest"""
+    widths = sorted(w for w in settings.IMAGE_VARIANT_WIDTHS if w < width)
+    largest = min(width, max(settings.IMAGE_VARIANT_WIDTHS))
+    if largest not in widths:
+        widths.append(largest)
+    return widths
+
+
+def variant_name(source_name, digest, width, extension):
+    root, _ = os.path.splitext(source_name)
+    return f'{root}.{digest}.{width}w.{extension}'
+
+
+def encode(image, pillow_format):
+    buffer = BytesIO()
+    options = {'quality': settings.IMAGE_VARIANT_QUALITY}
+    if pillow_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(fieldfile):
+    """
+    Write every variant of an image file to its storage
+
+    Returns:
+        the manifest: {'source', 'digest', 'width', 'height', 'variants': {format: [[width, name], ...]}}
+    """
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    manifest = {
+        'source': fieldfile.name,
+        'digest': digest,
+        'width': image.width,
+        'height': image.height,
+        'variants': {},
+    }
+    for width in variant_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for name in available_formats():
+            pillow_format, _, extension, _ = FORMATS[name]
+            if name == 'jpeg' and has_alpha:
+                continue  # JPEG would lose transparency; the original stays the fallback
+            target = variant_name(fieldfile.name, digest, width, extension)
+            if not storage.exists(target):
+                # Record the name actually written: storage picks another if
+                # target was taken since exists(), e.g. by a concurrent job
+                target = storage.save(target, ContentFile(encode(resized, pillow_format)))
+            manifest['variants'].setdefault(name, []).append([width, target])
+    return manifest
+
+
+def variant_names(manifest):
+    return {name for renditions in (manifest or {}).get('variants', {}).values() for _, name in renditions}
+
+
+def variants_stale(instance, field_name):
+    """Whether the field's manifest describes a different file than the one it holds now"""
+    fieldfile = getattr(instance, field_name)
+    manifest = getattr(instance, manifest_field(field_name)) or {}
+    return manifest.get('source') != (fieldfile.name or None)
+
+
+def update_variants(instance, field_name, force=False):
+    """
+    Bring one image field's variants in line with its current file
+
+    Saves the manifest with a queryset update(), so no save signals fire and
+    updated_date is untouched. Unreadable or corrupt sources raise OSError.
+
+    Returns:
+        True if the manifest changed
+    """
+    if not force and not variants_stale(instance, field_name):
+        return False
+    fieldfile = getattr(instance, field_name)
+    old_manifest = getattr(instance, manifest_field(field_name)) or {}
+
+    manifest = generate_variants(fieldfile) if fieldfile else {}
+
+    # Drop renditions of the previous file that the new manifest doesn't reuse
+    for name in variant_names(old_manifest) - variant_names(manifest):
+        try:
+            fieldfile.storage.delete(name)
+        except OSError as e:
+            logger.warning(f"Could not delete image variant {name}: {str(e)}")
+
+    type(instance).objects.filter(pk=instance.pk).update(**{manifest_field(field_name): manifest})
+    setattr(instance, manifest_field(field_name), manifest)
+    return True
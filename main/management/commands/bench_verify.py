@@ -0,0 +1,190 @@
+"""
+Management command that load-tests payment verification against a fake chain
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from main.fake_rpc import FakeChain, FakeRPCServer
+from main.web3_utils import eth_to_wei, reset_web3_state
+
+BENCH_WALLET_ADDRESS = '0x000000000000000000000000000000000000bE4C'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class WriteCounter:
+    """execute_wrapper that counts data-modifying SQL statements across threads"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            with self._lock:
+                self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    requires_system_checks = []
+    help = (
+        'Drives /api/payment/verify/ at a given concurrency against a local fake chain and '
+        'reports latency percentiles, throughput, RPC calls and DB writes per verification'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Total verify requests to send')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument(
+            '--payments',
+            type=int,
+            default=50,
+            help='Distinct transactions; requests cycle over them, so repeats are included',
+        )
+        parser.add_argument(
+            '--confirmations',
+            type=int,
+            default=1,
+            help='Blocks deep the transactions are mined (below 3 they stay processing)',
+        )
+        parser.add_argument('--latency-ms', type=float, default=50, help='Fake RPC latency per HTTP request')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random fake RPC latency')
+        parser.add_argument('--error-rate', type=float, default=0, help='Fraction of RPC requests answered with 429')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        # Run against a throwaway test database, never the real one. SQLite's
+        # default in-memory test database locks whole tables under concurrent
+        # writers, so use a temporary file like a real deployment would.
+        temp_dir = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(temp_dir.name, 'bench.sqlite3')
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+
+        chain = FakeChain()
+        amount_wei = eth_to_wei(Decimal(str(settings.PAYMENT_AMOUNT_ETH)))
+        transaction_hashes = [
+            chain.add_transaction(BENCH_WALLET_ADDRESS, amount_wei, confirmations=options['confirmations'])
+            for _ in range(options['payments'])
+        ]
+        server = FakeRPCServer(
+            chain,
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            error_rate=options['error_rate'],
+        ).start()
+
+        try:
+            with override_settings(
+                RPC_URL=server.url,
+                RPC_URLS=[server.url],
+                WALLET_ADDRESS=BENCH_WALLET_ADDRESS,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ):
+                reset_web3_state()
+                report = self.run_benchmark(server, transaction_hashes, options)
+        finally:
+            reset_web3_state()
+            server.stop()
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+            temp_dir.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def run_benchmark(self, server, transaction_hashes, options):
+        writes = WriteCounter()
+        local = threading.local()
+        total = options['requests']
+
+        def verify(i):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            body = json.dumps({
+                'transaction_hash': transaction_hashes[i % len(transaction_hashes)],
+                'from_address': '0x' + '11' * 20,
+            })
+            started = time.perf_counter()
+            with connection.execute_wrapper(writes):
+                response = client.post('/api/payment/verify/', body, content_type='application/json')
+            return time.perf_counter() - started, response.status_code
+
+        # Each worker thread closes its own (persistent) connection at the end,
+        # or PostgreSQL refuses to drop the test database while they are open
+        closed = threading.Barrier(options['concurrency'])
+
+        def close_connection(_):
+            connection.close()
+            closed.wait()
+
+        server.reset_stats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(verify, range(total)))
+            elapsed = time.perf_counter() - started
+            list(executor.map(close_connection, range(options['concurrency'])))
+
+        latencies = sorted(latency for latency, _ in results)
+        return {
+            'database': f"{settings.DATABASE_ENGINE} ({connection.vendor})",
+            'requests': total,
+            'concurrency': options['concurrency'],
+            'payments': len(transaction_hashes),
+            'errors': sum(1 for _, status in results if status != 200),
+            'seconds': round(elapsed, 3),
+            'throughput_rps': round(total / elapsed, 1),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 1),
+                'p95': round(percentile(latencies, 0.95) * 1000, 1),
+                'p99': round(percentile(latencies, 0.99) * 1000, 1),
+                'max': round(latencies[-1] * 1000, 1),
+            },
+            'rpc_calls_per_verification': round(server.rpc_calls / total, 3),
+            'rpc_http_requests_per_verification': round(server.http_requests / total, 3),
+            'rpc_calls_by_method': dict(sorted(server.calls_by_method.items())),
+            'db_writes_per_verification': round(writes.count / total, 3),
+        }
+
+    def print_report(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['requests']} verifications of {report['payments']} payments "
+            f"at concurrency {report['concurrency']} in {report['seconds']}s"
+        ))
+        self.stdout.write(f"  Database:              {report['database']}")
+        self.stdout.write(f"  Throughput:            {report['throughput_rps']} req/s")
+        self.stdout.write(
+            f"  Latency:               p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+            f"p99 {latency['p99']} ms, max {latency['max']} ms"
+        )
+        self.stdout.write(
+            f"  RPC per verification:  {report['rpc_calls_per_verification']} calls in "
+            f"{report['rpc_http_requests_per_verification']} HTTP requests"
+        )
+        for method, count in report['rpc_calls_by_method'].items():
+            self.stdout.write(f"    {method}: {count}")
+        self.stdout.write(f"  DB writes per verification: {report['db_writes_per_verification']}")
+        if report['errors']:
+            self.stdout.write(self.style.ERROR(f"  Non-200 responses: {report['errors']}"))
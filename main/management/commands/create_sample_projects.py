@@ -66,6 +66,7 @@ class Command(BaseCommand):
         
         created_count = 0
         for i, project_data in enumerate(projects_data, 1):
+            technologies = project_data.pop('technologies')
             project, created = Project.objects.get_or_create(
                 title=project_data['title'],
                 defaults={
@@ -74,6 +75,7 @@ class Command(BaseCommand):
                 }
             )
             if created:
+                project.set_technologies(technologies.split(','))
                 created_count += 1
                 self.stdout.write(
                     self.style.SUCCESS(f'✓ Created project: {project.title}')
@@ -0,0 +1,42 @@
+"""
+Management command that reports and checks the active database profile
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout')
+
+
+class Command(BaseCommand):
+    help = 'Shows the database profile in use and checks it is reachable and fully migrated'
+
+    def handle(self, *args, **options):
+        db = settings.DATABASES['default']
+        pool = db.get('OPTIONS', {}).get('pool')
+        self.stdout.write(f"Profile:     {settings.DATABASE_ENGINE} ({db['ENGINE']})")
+        self.stdout.write(f"Database:    {db['NAME']}" + (f" on {db.get('HOST')}:{db.get('PORT')}" if db.get('HOST') else ''))
+        if pool:
+            self.stdout.write(f"Connections: pooled ({pool['min_size']}-{pool['max_size']})")
+        else:
+            self.stdout.write(f"Connections: persistent for {db.get('CONN_MAX_AGE', 0)}s")
+
+        try:
+            connection.ensure_connection()
+        except Exception as e:
+            raise CommandError(f'Cannot connect to the database: {str(e)}')
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                for pragma in SQLITE_PRAGMAS:
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.stdout.write(f'  {pragma}: {cursor.fetchone()[0]}')
+
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            pending = ', '.join(f'{migration.app_label}.{migration.name}' for migration, _ in plan)
+            raise CommandError(f'{len(plan)} unapplied migrations ({pending}); run "python manage.py migrate"')
+
+        self.stdout.write(self.style.SUCCESS('Database reachable and fully migrated'))
@@ -0,0 +1,61 @@
+"""
+Management command that runs a local fake Ethereum JSON-RPC endpoint
+"""
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from main.fake_rpc import FakeChain, FakeRPCServer
+from main.web3_utils import eth_to_wei
+
+
+class Command(BaseCommand):
+    help = 'Serves a scriptable fake JSON-RPC chain for local testing and load benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+        parser.add_argument('--port', type=int, default=8545, help='Port to listen on')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Latency added to every HTTP request')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random latency, up to this much')
+        parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 429')
+        parser.add_argument(
+            '--block-time',
+            type=float,
+            default=settings.BLOCK_TIME_SECONDS,
+            help='Seconds between mined blocks (0 to keep the head still)',
+        )
+        parser.add_argument(
+            '--payments',
+            type=int,
+            default=0,
+            help='Seed this many valid payments to WALLET_ADDRESS and print their hashes',
+        )
+        parser.add_argument(
+            '--confirmations',
+            type=int,
+            default=3,
+            help='How many blocks deep seeded payments are mined',
+        )
+
+    def handle(self, *args, **options):
+        chain = FakeChain()
+        amount_wei = eth_to_wei(Decimal(str(settings.PAYMENT_AMOUNT_ETH)))
+        for _ in range(options['payments']):
+            tx_hash = chain.add_transaction(
+                settings.WALLET_ADDRESS, amount_wei, confirmations=options['confirmations']
+            )
+            self.stdout.write(tx_hash)
+
+        server = FakeRPCServer(
+            chain,
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency_ms'] / 1000,
+            jitter=options['jitter_ms'] / 1000,
+            error_rate=options['error_rate'],
+            block_time=options['block_time'] or None,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Fake JSON-RPC chain at {server.url} (head block {chain.block_number})')
+        )
+        self.stdout.write(f'Point the site at it with RPC_URL={server.url}')
+        server.serve_forever()
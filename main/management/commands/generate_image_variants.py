@@ -0,0 +1,33 @@
+"""
+Management command that generates responsive variants for existing images
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from main.content_cache import refresh_content_version
+from main.images import VARIANT_FIELDS, update_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates missing or outdated AVIF/WebP/JPEG renditions for project, gallery and agent images. '
+        'New uploads get theirs on save; run this once for images uploaded before, or after changing '
+        'IMAGE_VARIANT_* settings (with --force)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate even if the variants are current')
+
+    def handle(self, *args, **options):
+        updated = 0
+        for label, field_name in VARIANT_FIELDS:
+            model = apps.get_model(label)
+            for instance in model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).iterator():
+                try:
+                    if update_variants(instance, field_name, force=options['force']):
+                        updated += 1
+                        self.stdout.write(f'{label} #{instance.pk}: {getattr(instance, field_name).name}')
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'{label} #{instance.pk}: {str(e)}'))
+        if updated:
+            refresh_content_version()
+        self.stdout.write(self.style.SUCCESS(f'Updated variants for {updated} images'))
@@ -0,0 +1,23 @@
+"""
+Management command that rebuilds the project full-text search index
+"""
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from main.models import Project
+from main.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the project search index from scratch. Saves and deletes keep it current; '
+        'run this after bulk changes that skip signals (queryset.update(), raw SQL, loaddata)'
+    )
+
+    def handle(self, *args, **options):
+        using = router.db_for_write(Project)
+        backend = get_search_backend(using)
+        with transaction.atomic(using=using):
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {type(backend).__name__} index for {Project.objects.using(using).count()} projects'
+        ))
@@ -0,0 +1,49 @@
+"""
+Management command that works through the background media job queue
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from main.media_jobs import claim_job, requeue_stalled_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Runs queued media jobs (image variants, file checksums, PDF previews) outside the request cycle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every job that is currently runnable and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.MEDIA_JOB_POLL_SECONDS,
+            help='Seconds between checks for new jobs while the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        self.stdout.write(self.style.SUCCESS(f'Running media jobs (checking for new jobs every {interval}s)'))
+
+        while True:
+            try:
+                requeued = requeue_stalled_jobs()
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f'Requeued {requeued} stalled jobs'))
+
+                job = claim_job()
+                while job is not None:
+                    started = time.monotonic()
+                    if run_job(job):
+                        self.stdout.write(f'{job} in {time.monotonic() - started:.2f}s')
+                    else:
+                        self.stdout.write(self.style.ERROR(f'{job}: {job.error}'))
+                    job = claim_job()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error running media jobs: {str(e)}'))
+
+            if options['once']:
+                break
+            time.sleep(interval)
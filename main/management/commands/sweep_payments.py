@@ -0,0 +1,47 @@
+"""
+Management command that expires stale payments and download tokens
+"""
+from django.core.management.base import BaseCommand
+from main.payment_tracker import (
+    expire_stale_payments,
+    expired_download_tokens,
+    revoke_expired_download_tokens,
+    stale_pending_payments,
+)
+
+
+class Command(BaseCommand):
+    help = 'Re-verifies and expires stale pending payments and revokes past-expiry download tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows verified or updated per batch',
+        )
+        parser.add_argument(
+            '--pause-ms',
+            type=int,
+            default=50,
+            help='Pause between batches so other writers are not starved',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be updated',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'Stale pending payments: {stale_pending_payments().count()}')
+            self.stdout.write(f'Expired download tokens: {expired_download_tokens().count()}')
+            return
+
+        batch_size = options['batch_size']
+        pause = options['pause_ms'] / 1000
+        expired = expire_stale_payments(batch_size, pause)
+        revoked = revoke_expired_download_tokens(batch_size, pause)
+        self.stdout.write(
+            self.style.SUCCESS(f'Expired {expired} pending payments, revoked {revoked} download tokens')
+        )
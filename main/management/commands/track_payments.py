@@ -0,0 +1,56 @@
+"""
+Management command that keeps pending payment confirmations up to date
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from main.payment_tracker import record_heartbeat, refresh_pending_payments
+from main.web3_utils import get_web3_connection, set_cached_block_number
+
+
+class Command(BaseCommand):
+    help = 'Refreshes confirmations for pending payments on every new block'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single refresh pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.PAYMENT_TRACKER_POLL_SECONDS,
+            help='Seconds between checks for a new block',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        last_block = None
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Tracking pending payments (checking for new blocks every {interval}s)')
+        )
+
+        while True:
+            try:
+                w3 = get_web3_connection()
+                if w3:
+                    block_number = w3.eth.block_number
+                    # Keep the shared block cache warm for web workers
+                    set_cached_block_number(block_number)
+                    if block_number != last_block:
+                        counts = refresh_pending_payments()
+                        last_block = block_number
+                        if counts:
+                            summary = ', '.join(f'{status}: {count}' for status, count in sorted(counts.items()))
+                            self.stdout.write(f'Block {block_number} - {summary}')
+                    record_heartbeat(block_number)
+                else:
+                    self.stdout.write(self.style.WARNING('RPC unavailable, retrying'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Error tracking payments: {str(e)}'))
+
+            if options['once']:
+                break
+            time.sleep(interval)
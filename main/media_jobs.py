@@ -0,0 +1,228 @@
+"""
+Database-backed queue for media processing that shouldn't run inside a request
+
+Saving a project, gallery image or agent queues a MediaJob per file field
+whose derived data is out of date; the run_media_jobs worker claims jobs with
+a conditional UPDATE (so several workers can run side by side), runs them and
+records the outcome, retrying failures with backoff.
+
+Tasks:
+    image_variants: responsive renditions of an image (main.images)
+    file_info: SHA-256 checksum and size of a file, plus a first-page PNG
+        preview for PDFs when pypdfium2 is installed
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .content_cache import refresh_content_version
+from .images import update_variants, variants_stale
+from .models import MediaJob
+
+try:
+    import pypdfium2
+except ImportError:  # PDF previews are optional
+    pypdfium2 = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_WIDTH = 800
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# Fields processed per model: app_label.ModelName -> [(task, field name), ...]
+MEDIA_FIELDS = {
+    'main.Project': [('image_variants', 'featured_image'), ('file_info', 'white_paper')],
+    'main.ProjectImage': [('image_variants', 'image')],
+    'main.Partner': [('image_variants', 'profile_picture')],
+}
+
+
+def info_field(field_name):
+    return f'{field_name}_info'
+
+
+def file_info_stale(instance, field_name):
+    """Whether the field's stored info describes a different file than the one it holds now"""
+    info = getattr(instance, info_field(field_name)) or {}
+    return info.get('source') != (getattr(instance, field_name).name or None)
+
+
+STALE_CHECKS = {
+    'image_variants': variants_stale,
+    'file_info': file_info_stale,
+}
+
+
+def render_pdf_preview(data):
+    """PNG of a PDF's first page, PREVIEW_WIDTH wide, or None without pypdfium2"""
+    if pypdfium2 is None:
+        return None
+    document = pypdfium2.PdfDocument(data)
+    try:
+        page = document[0]
+        image = page.render(scale=PREVIEW_WIDTH / page.get_width()).to_pil()
+    finally:
+        document.close()
+    buffer = BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def update_file_info(instance, field_name):
+    """
+    Record checksum, size and (for PDFs) a preview of a file field's current file
+
+    The old preview is deleted, and the info saved with a queryset update() so
+    no save signals fire.
+    """
+    fieldfile = getattr(instance, field_name)
+    old_info = getattr(instance, info_field(field_name)) or {}
+    info = {}
+    if fieldfile:
+        sha256 = hashlib.sha256()
+        size = 0
+        with fieldfile.storage.open(fieldfile.name, 'rb') as source:
+            for chunk in iter(lambda: source.read(CHECKSUM_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+                size += len(chunk)
+        info = {'source': fieldfile.name, 'sha256': sha256.hexdigest(), 'size': size, 'preview': None}
+
+        if fieldfile.name.lower().endswith('.pdf'):
+            with fieldfile.storage.open(fieldfile.name, 'rb') as source:
+                preview = render_pdf_preview(source.read())
+            if preview:
+                root, _ = os.path.splitext(fieldfile.name)
+                name = f"{root}.{info['sha256'][:12]}.preview.png"
+                if not fieldfile.storage.exists(name):
+                    name = fieldfile.storage.save(name, ContentFile(preview))
+                info['preview'] = name
+
+    old_preview = old_info.get('preview')
+    if old_preview and old_preview != info.get('preview'):
+        fieldfile.storage.delete(old_preview)
+
+    type(instance).objects.filter(pk=instance.pk).update(**{info_field(field_name): info})
+    setattr(instance, info_field(field_name), info)
+
+
+def run_image_variants(instance, field_name):
+    if update_variants(instance, field_name):
+        refresh_content_version()
+
+
+def run_file_info(instance, field_name):
+    update_file_info(instance, field_name)
+    refresh_content_version()
+
+
+TASKS = {
+    'image_variants': run_image_variants,
+    'file_info': run_file_info,
+}
+
+
+def enqueue(task, instance, field_name):
+    """Queue a task for one field once the current transaction commits (no-op if already queued)"""
+    label = instance._meta.label
+
+    def create():
+        try:
+            with transaction.atomic():
+                MediaJob.objects.create(task=task, model=label, object_id=instance.pk, field_name=field_name)
+        except IntegrityError:
+            pass  # Already queued; the worker will read the latest file when it runs
+        if settings.MEDIA_JOBS_INLINE:
+            run_pending_jobs()
+
+    transaction.on_commit(create)
+
+
+def enqueue_stale_media(instance):
+    """Queue work for every file field of this object whose derived data is out of date"""
+    for task, field_name in MEDIA_FIELDS.get(instance._meta.label, []):
+        if STALE_CHECKS[task](instance, field_name):
+            enqueue(task, instance, field_name)
+
+
+def claim_job():
+    """Mark the oldest runnable job running and return it, or None if there is none"""
+    now = timezone.now()
+    candidates = (
+        MediaJob.objects.filter(status='queued', available_at__lte=now)
+        .order_by('available_at', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        # Conditional UPDATE: only one worker moves a given job out of queued
+        claimed = MediaJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return MediaJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome; failures are retried with backoff up to MEDIA_JOB_MAX_ATTEMPTS"""
+    try:
+        model = apps.get_model(job.model)
+        instance = model.objects.filter(pk=job.object_id).first()
+        if instance is not None:
+            TASKS[job.task](instance, job.field_name)
+    except Exception as e:
+        logger.error(f"Error running {job}: {str(e)}")
+        job.error = str(e)
+        if job.attempts < settings.MEDIA_JOB_MAX_ATTEMPTS:
+            job.status = 'queued'
+            job.available_at = timezone.now() + timedelta(seconds=settings.MEDIA_JOB_RETRY_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['status', 'error', 'available_at', 'finished_at'])
+        except IntegrityError:
+            # The object was saved again meanwhile and a fresh job is queued; let that one run
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at'])
+        return False
+
+    job.status = 'done'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return True
+
+
+def requeue_stalled_jobs():
+    """Put jobs whose worker died mid-run back in the queue"""
+    cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_JOB_TIMEOUT_SECONDS)
+    stalled = MediaJob.objects.filter(status='running', started_at__lt=cutoff)
+    count = 0
+    for job in stalled:
+        try:
+            with transaction.atomic():
+                count += MediaJob.objects.filter(pk=job.pk, status='running').update(status='queued')
+        except IntegrityError:
+            MediaJob.objects.filter(pk=job.pk, status='running').update(status='failed', error='Superseded while stalled')
+    return count
+
+
+def run_pending_jobs(limit=None):
+    """Claim and run jobs until the queue has nothing runnable (or `limit` jobs ran)"""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
@@ -0,0 +1,39 @@
+"""
+Request middleware for the main app
+"""
+from django.conf import settings
+from .routers import begin_request, end_request, replica_configured, wrote_replica_models
+
+PRIMARY_PIN_COOKIE = 'db_primary'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for ReplicaRouter
+
+    A client that changed replicated content gets a short-lived cookie, and
+    while it lasts (DATABASE_REPLICA_STICKY_SECONDS) its requests read from
+    the primary instead of a replica that may not have the change yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        token = begin_request(pinned=PRIMARY_PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if wrote_replica_models():
+                response.set_cookie(
+                    PRIMARY_PIN_COOKIE,
+                    '1',
+                    max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            end_request(token)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_project_specifications_project_white_paper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_hash', models.CharField(db_index=True, max_length=66, unique=True)),
+                ('from_address', models.CharField(max_length=42)),
+                ('to_address', models.CharField(max_length=42)),
+                ('amount_wei', models.DecimalField(decimal_places=0, help_text='Amount in Wei', max_digits=30)),
+                ('amount_eth', models.DecimalField(decimal_places=8, help_text='Amount in ETH', max_digits=18)),
+                ('network', models.CharField(default='ethereum', help_text='Blockchain network', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('confirmed', 'Confirmed'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('confirmations', models.IntegerField(default=0)),
+                ('required_confirmations', models.IntegerField(default=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('download_token', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('download_expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Payment',
+                'verbose_name_plural': 'Payments',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
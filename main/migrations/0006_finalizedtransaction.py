@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_payment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinalizedTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_hash', models.CharField(max_length=66, unique=True)),
+                ('block_number', models.BigIntegerField()),
+                ('receipt', models.JSONField()),
+                ('transaction', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+def split_technologies(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def csv_to_technologies(apps, schema_editor):
+    """Create Technology rows from each project's comma-separated list and link them"""
+    Project = apps.get_model('main', 'Project')
+    Technology = apps.get_model('main', 'Technology')
+    
+    # The oldest project's spelling wins, as in Technology.get_or_create_many()
+    names = {}
+    for project in Project.objects.exclude(technologies_csv='').order_by('pk'):
+        for name in split_technologies(project.technologies_csv):
+            names.setdefault(name.lower(), name)
+    Technology.objects.bulk_create(
+        [Technology(name=name, key=key) for key, name in names.items()], ignore_conflicts=True
+    )
+    
+    by_key = {tech.key: tech.pk for tech in Technology.objects.all()}
+    Through = Project.technologies.through
+    links = {
+        (project.pk, by_key[name.lower()])
+        for project in Project.objects.exclude(technologies_csv='')
+        for name in split_technologies(project.technologies_csv)
+    }
+    Through.objects.bulk_create(
+        [Through(project_id=project_id, technology_id=technology_id) for project_id, technology_id in links],
+        ignore_conflicts=True,
+    )
+
+
+def technologies_to_csv(apps, schema_editor):
+    Project = apps.get_model('main', 'Project')
+    for project in Project.objects.prefetch_related('technologies'):
+        project.technologies_csv = ', '.join(tech.name for tech in project.technologies.all())
+        project.save(update_fields=['technologies_csv'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_payment_lifecycle_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Technology',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(help_text='Lowercased name used for lookups', max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Technologies',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RenameField(
+            model_name='project',
+            old_name='technologies',
+            new_name='technologies_csv',
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='technologies',
+            field=models.ManyToManyField(blank=True, related_name='projects', to='main.technology'),
+        ),
+        migrations.RunPython(csv_to_technologies, technologies_to_csv),
+        migrations.RemoveField(
+            model_name='project',
+            name='technologies_csv',
+        ),
+    ]
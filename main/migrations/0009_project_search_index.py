@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:20
+
+from django.db import migrations
+
+SQLITE_CREATE = """
+    CREATE VIRTUAL TABLE main_project_fts USING fts5(
+        title, description, specifications, technologies,
+        tokenize = 'porter unicode61'
+    )
+"""
+
+SQLITE_POPULATE = """
+    INSERT INTO main_project_fts (rowid, title, description, specifications, technologies)
+    SELECT p.id, p.title, p.description, p.specifications,
+           COALESCE((SELECT group_concat(t.name, ' ')
+                     FROM main_project_technologies pt
+                     JOIN main_technology t ON t.id = pt.technology_id
+                     WHERE pt.project_id = p.id), '')
+    FROM main_project p
+"""
+
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE main_project_search (
+        project_id bigint PRIMARY KEY REFERENCES main_project (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX main_project_search_document_idx ON main_project_search USING gin (document)',
+]
+
+POSTGRES_POPULATE = """
+    INSERT INTO main_project_search (project_id, document)
+    SELECT p.id,
+           setweight(to_tsvector('english', p.title), 'A') ||
+           setweight(to_tsvector('english', COALESCE((
+               SELECT string_agg(t.name, ' ')
+               FROM main_project_technologies pt
+               JOIN main_technology t ON t.id = pt.technology_id
+               WHERE pt.project_id = p.id), '')), 'A') ||
+           setweight(to_tsvector('english', p.specifications), 'B') ||
+           setweight(to_tsvector('english', p.description), 'C')
+    FROM main_project p
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """Create and fill the full-text index for the database in use (see main.search)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_POPULATE)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        schema_editor.execute(POSTGRES_POPULATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS main_project_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS main_project_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_technology'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
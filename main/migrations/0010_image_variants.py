@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_project_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partner',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized renditions of profile_picture (see main.images)'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized renditions of featured_image (see main.images)'),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized renditions of image (see main.images)'),
+        ),
+    ]
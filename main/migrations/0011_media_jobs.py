@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='white_paper_info',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Checksum, size and preview of white_paper (see main.media_jobs)'),
+        ),
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(choices=[('image_variants', 'Image variants'), ('file_info', 'Checksum and preview')], max_length=30)),
+                ('model', models.CharField(help_text='app_label.ModelName of the object', max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('field_name', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not started before this time (retry backoff)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='mediajob_status_available_idx'), models.Index(fields=['model', 'object_id'], name='mediajob_object_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('task', 'model', 'object_id', 'field_name'), name='mediajob_unique_queued')],
+            },
+        ),
+    ]
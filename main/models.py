@@ -1,19 +1,61 @@
+import secrets
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 
 
+class Technology(models.Model):
+    """Technology tag for projects"""
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True, help_text='Lowercased name used for lookups')
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'Technologies'
+    
+    def __str__(self):
+        return self.name
+    
+    def save(self, *args, **kwargs):
+        self.key = self.normalize(self.name)
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def normalize(name):
+        """Lookup key for a technology name, so 'solidity' finds 'Solidity'"""
+        return name.strip().lower()
+    
+    @classmethod
+    def get_or_create_many(cls, names):
+        """Get Technology rows for the given names, creating any that are missing"""
+        by_key = {}
+        for name in names:
+            if name.strip():
+                by_key.setdefault(cls.normalize(name), name.strip())
+        existing = {tech.key: tech for tech in cls.objects.filter(key__in=list(by_key))}
+        missing = [cls(name=name, key=key) for key, name in by_key.items() if key not in existing]
+        cls.objects.bulk_create(missing, ignore_conflicts=True)
+        if missing:
+            existing = {tech.key: tech for tech in cls.objects.filter(key__in=list(by_key))}
+        return [existing[key] for key in by_key]
+
+
 class Project(models.Model):
     """Project model for portfolio dossier"""
     title = models.CharField(max_length=200)
     classification = models.CharField(max_length=50, default='CLASSIFIED', help_text='e.g., CLASSIFIED, CONFIDENTIAL')
     description = models.TextField()
     project_type = models.CharField(max_length=100, blank=True)
-    technologies = models.CharField(max_length=500, blank=True, help_text='Comma-separated list')
+    technologies = models.ManyToManyField(Technology, related_name='projects', blank=True)
     github_url = models.URLField(blank=True)
     live_url = models.URLField(blank=True)
     featured_image = models.ImageField(upload_to='projects/', blank=True, null=True)
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized renditions of featured_image (see main.images)')
     white_paper = models.FileField(upload_to='projects/whitepapers/', blank=True, null=True, help_text='PDF, DOCX, or other document file')
+    white_paper_info = models.JSONField(default=dict, blank=True, editable=False, help_text='Checksum, size and preview of white_paper (see main.media_jobs)')
     specifications = models.TextField(blank=True, help_text='Project specifications or technical details')
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
@@ -26,10 +68,12 @@ class Project(models.Model):
         return self.title
     
     def get_technologies_list(self):
-        """Return technologies as a list"""
-        if self.technologies:
-            return [tech.strip() for tech in self.technologies.split(',') if tech.strip()]
-        return []
+        """Return technology names as a list (uses prefetch_related('technologies') if present)"""
+        return [tech.name for tech in self.technologies.all()]
+    
+    def set_technologies(self, names):
+        """Replace the project's technologies with the given names"""
+        self.technologies.set(Technology.get_or_create_many(names))
     
     def get_absolute_url(self):
         return reverse('main:project_detail', kwargs={'pk': self.pk})
@@ -39,6 +83,7 @@ class ProjectImage(models.Model):
     """Additional images for projects"""
     project = models.ForeignKey(Project, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='projects/images/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized renditions of image (see main.images)')
     caption = models.CharField(max_length=200, blank=True)
     order = models.IntegerField(default=0)
     
@@ -54,6 +99,7 @@ class Partner(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
     profile_picture = models.ImageField(upload_to='agents/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized renditions of profile_picture (see main.images)')
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
@@ -100,6 +146,17 @@ class Payment(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
+        indexes = [
+            # Lifecycle scans: tracker/sweeper queries and the admin status filter
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='payment_status_updated_idx'),
+            # Only rows still holding a download token are ever swept for expiry
+            models.Index(
+                fields=['download_expires_at'],
+                condition=models.Q(download_token__isnull=False),
+                name='payment_download_expiry_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Payment {self.transaction_hash[:10]}... - {self.status}"
@@ -113,3 +170,158 @@ class Payment(models.Model):
         if self.download_expires_at and self.download_expires_at < timezone.now():
             return False
         return True
+    
+    # Allowed status changes; confirmed, failed and expired are final.
+    # processing -> pending is a reorg dropping the mined transaction.
+    TRANSITIONS = {
+        'pending': ('processing', 'confirmed', 'failed', 'expired'),
+        'processing': ('pending', 'confirmed', 'failed'),
+        'confirmed': (),
+        'failed': (),
+        'expired': (),
+    }
+    
+    def transition(self, status, confirmations=None, **fields):
+        """
+        Move the payment to status with a conditional UPDATE
+        
+        Nothing is written unless the status changes (along an allowed
+        transition) or confirmations increase. The UPDATE only matches while the
+        row still has this instance's status (and, without a status change, fewer
+        confirmations), so concurrent workers can't apply a step twice or make a
+        move TRANSITIONS doesn't allow. A status change may lower confirmations:
+        a reorg back to pending, or a final failure such as a revert, reports
+        none. If another worker got there first, the instance is refreshed
+        instead.
+        
+        Args:
+            status: the new status
+            confirmations: the new confirmation count (default: unchanged)
+            **fields: other fields to write along with the change
+            
+        Returns:
+            True if the row was updated
+        """
+        if confirmations is None:
+            confirmations = self.confirmations
+        
+        if status == self.status:
+            if confirmations <= self.confirmations:
+                return False
+            current = Payment.objects.filter(pk=self.pk, status=self.status, confirmations__lt=confirmations)
+        elif status in self.TRANSITIONS[self.status]:
+            current = Payment.objects.filter(pk=self.pk, status=self.status)
+        else:
+            return False
+        
+        values = dict(fields, status=status, confirmations=confirmations, updated_at=timezone.now())
+        if not current.update(**values):
+            self.refresh_from_db()
+            return False
+        
+        for name, value in values.items():
+            setattr(self, name, value)
+        return True
+    
+    def apply_verification(self, result):
+        """
+        Advance the payment from a verify_transaction() result
+        
+        Results with rpc_error are ignored: nothing was learned about the
+        transaction, and treating them as unmined would undo progress.
+        
+        Returns:
+            True if the row was updated (see transition())
+        """
+        if result.get('rpc_error'):
+            return False
+        
+        confirmations = result.get('confirmations', 0)
+        fields = {}
+        if 'amount_wei' in result:
+            fields['amount_wei'] = result['amount_wei']
+            fields['amount_eth'] = Decimal(str(result['amount_eth']))
+        
+        if result['valid']:
+            status = 'confirmed'
+            if self.status != 'confirmed':
+                fields['verified_at'] = timezone.now()
+            
+            # Generate download token if not exists
+            if not self.download_token:
+                fields['download_token'] = secrets.token_urlsafe(32)
+                fields['download_expires_at'] = timezone.now() + timedelta(hours=settings.PAYMENT_EXPIRY_HOURS)
+        elif result.get('failed'):
+            status = 'failed'
+        elif confirmations > 0:
+            status = 'processing'
+        else:
+            status = 'pending'
+        
+        return self.transition(status, confirmations, **fields)
+
+
+class FinalizedTransaction(models.Model):
+    """Receipt and body of a transaction past the finality depth, as raw JSON-RPC objects"""
+    transaction_hash = models.CharField(max_length=66, unique=True)
+    block_number = models.BigIntegerField()
+    receipt = models.JSONField()
+    transaction = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.transaction_hash[:10]}... @ {self.block_number}"
+
+
+class Lease(models.Model):
+    """Cross-process lock held by one worker until released or expired (see main.singleflight)"""
+    key = models.CharField(max_length=200, unique=True)
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.key} until {self.expires_at}"
+
+
+class MediaJob(models.Model):
+    """Background processing of one file field of one object, run by the run_media_jobs worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    TASK_CHOICES = [
+        ('image_variants', 'Image variants'),
+        ('file_info', 'Checksum and preview'),
+    ]
+    
+    task = models.CharField(max_length=30, choices=TASK_CHOICES)
+    model = models.CharField(max_length=100, help_text='app_label.ModelName of the object')
+    object_id = models.BigIntegerField()
+    field_name = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text='Not started before this time (retry backoff)')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest runnable job
+            models.Index(fields=['status', 'available_at'], name='mediajob_status_available_idx'),
+            models.Index(fields=['model', 'object_id'], name='mediajob_object_idx'),
+        ]
+        constraints = [
+            # Saving an object twice before a worker gets to it queues its work once
+            models.UniqueConstraint(
+                fields=['task', 'model', 'object_id', 'field_name'],
+                condition=models.Q(status='queued'),
+                name='mediajob_unique_queued',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_task_display()} for {self.model} #{self.object_id} - {self.status}"
@@ -0,0 +1,233 @@
+"""
+Server-push payment status updates (Server-Sent Events and long-poll)
+
+Every subscriber in a process shares one watcher thread. On each new block
+it refreshes all watched payments together and pushes any change in status
+or confirmations to their subscribers, so upstream load scales with blocks
+rather than with connected clients.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from .models import Payment
+from .payment_tracker import is_tracker_running, refresh_pending_payments
+from .web3_utils import get_block_number
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ('confirmed', 'failed', 'expired')
+SSE_KEEPALIVE = ': keep-alive\n\n'
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def payment_status_data(payment, error=None):
+    """Status snapshot of a payment, as returned by verify_payment and the status stream"""
+    if payment.status == 'confirmed':
+        return {
+            'success': True,
+            'status': 'confirmed',
+            'confirmations': payment.confirmations,
+            'download_token': payment.download_token,
+            'download_url': f'/api/download/{payment.download_token}/',
+            'message': 'Payment verified successfully'
+        }
+
+    if error is None:
+        if payment.status == 'failed':
+            error = 'Transaction failed verification'
+        elif payment.status == 'expired':
+            error = 'Payment expired before the transaction was mined'
+        else:
+            error = f'Waiting for confirmations ({payment.confirmations}/{payment.required_confirmations})'
+
+    return {
+        'success': False,
+        'status': payment.status,
+        'confirmations': payment.confirmations,
+        'required_confirmations': payment.required_confirmations,
+        'error': error,
+        'message': f'Transaction found but waiting for confirmations ({payment.confirmations}/{payment.required_confirmations})'
+    }
+
+
+def sse_event(data):
+    """Format a status snapshot as a Server-Sent Event"""
+    return f'event: status\ndata: {json.dumps(data)}\n\n'
+
+
+class PaymentStatusHub:
+    """Process-wide fan-out of payment status changes to subscriber callbacks"""
+
+    def __init__(self):
+        self._subscribers = {}  # tx hash -> set of callbacks
+        self._latest = {}  # tx hash -> last published snapshot
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, transaction_hash, callback):
+        """Call callback(snapshot) from the watcher thread whenever the payment changes"""
+        with self._lock:
+            self._subscribers.setdefault(transaction_hash, set()).add(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='payment-status-hub', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, transaction_hash, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(transaction_hash)
+            if callbacks:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._subscribers[transaction_hash]
+                    self._latest.pop(transaction_hash, None)
+
+    def _run(self):
+        last_block = None
+        while True:
+            with self._lock:
+                transaction_hashes = list(self._subscribers)
+                if not transaction_hashes:
+                    # Nobody is listening; a new subscriber starts a new thread
+                    self._thread = None
+                    return
+
+            try:
+                block_number = get_block_number()
+                if block_number != last_block:
+                    self._refresh(transaction_hashes)
+                    last_block = block_number
+            except Exception as e:
+                logger.error(f"Error refreshing watched payments: {str(e)}")
+            finally:
+                close_old_connections()
+
+            time.sleep(settings.PAYMENT_TRACKER_POLL_SECONDS)
+
+    def _refresh(self, transaction_hashes):
+        # The track_payments worker already keeps rows current; otherwise
+        # verify every watched payment in a single batch ourselves
+        if not is_tracker_running():
+            refresh_pending_payments(transaction_hashes)
+
+        for payment in Payment.objects.filter(transaction_hash__in=transaction_hashes):
+            data = payment_status_data(payment)
+            with self._lock:
+                if self._latest.get(payment.transaction_hash) == data:
+                    continue
+                self._latest[payment.transaction_hash] = data
+                callbacks = list(self._subscribers.get(payment.transaction_hash, ()))
+            for callback in callbacks:
+                callback(data)
+
+
+hub = PaymentStatusHub()
+
+
+def _is_final(data):
+    return data['status'] in FINAL_STATUSES
+
+
+def _matches(data, status, confirmations):
+    return data['status'] == status and str(data['confirmations']) == str(confirmations)
+
+
+async def async_status_events(transaction_hash, data):
+    """
+    Yield Server-Sent Events for a payment until it reaches a final status
+
+    Starts with the current snapshot, then one event per change, with
+    keep-alive comments in between. Gives up after PAYMENT_STREAM_TIMEOUT_SECONDS;
+    EventSource clients reconnect automatically. Async only: each open
+    stream would otherwise hold a WSGI worker thread for its whole life.
+    """
+    yield 'retry: 5000\n\n' + sse_event(data)
+    if _is_final(data):
+        return
+    last_sent = data
+
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue()
+
+    def callback(snapshot):
+        loop.call_soon_threadsafe(updates.put_nowait, snapshot)
+
+    hub.subscribe(transaction_hash, callback)
+    deadline = time.monotonic() + settings.PAYMENT_STREAM_TIMEOUT_SECONDS
+    try:
+        while time.monotonic() < deadline:
+            try:
+                data = await asyncio.wait_for(updates.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield SSE_KEEPALIVE
+                continue
+            if data == last_sent:
+                continue
+            yield sse_event(data)
+            last_sent = data
+            if _is_final(data):
+                break
+    finally:
+        hub.unsubscribe(transaction_hash, callback)
+
+
+def wait_for_change(transaction_hash, data, status, confirmations):
+    """
+    Long-poll: block until the payment differs from the client's status/confirmations
+
+    Returns the current snapshot immediately if it already differs or is final,
+    otherwise the first differing update, or the unchanged snapshot after
+    PAYMENT_LONG_POLL_SECONDS.
+    """
+    if _is_final(data) or not _matches(data, status, confirmations):
+        return data
+
+    updates = queue.Queue()
+    callback = updates.put
+    hub.subscribe(transaction_hash, callback)
+    deadline = time.monotonic() + settings.PAYMENT_LONG_POLL_SECONDS
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return data
+            try:
+                data = updates.get(timeout=remaining)
+            except queue.Empty:
+                return data
+            if not _matches(data, status, confirmations):
+                return data
+    finally:
+        hub.unsubscribe(transaction_hash, callback)
+
+
+async def async_wait_for_change(transaction_hash, data, status, confirmations):
+    """Async counterpart of wait_for_change()"""
+    if _is_final(data) or not _matches(data, status, confirmations):
+        return data
+
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue()
+
+    def callback(snapshot):
+        loop.call_soon_threadsafe(updates.put_nowait, snapshot)
+
+    hub.subscribe(transaction_hash, callback)
+    deadline = time.monotonic() + settings.PAYMENT_LONG_POLL_SECONDS
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return data
+            try:
+                data = await asyncio.wait_for(updates.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return data
+            if not _matches(data, status, confirmations):
+                return data
+    finally:
+        hub.unsubscribe(transaction_hash, callback)
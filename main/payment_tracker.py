@@ -0,0 +1,178 @@
+"""
+Background confirmation tracking for pending payments
+"""
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Payment
+from .web3_utils import verify_transactions
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_CACHE_KEY = 'payment_tracker:heartbeat'
+TRACKED_STATUSES = ('pending', 'processing')
+
+
+def record_heartbeat(block_number):
+    """Tell web workers the tracker is alive and which block it last processed"""
+    cache.set(HEARTBEAT_CACHE_KEY, block_number, timeout=settings.PAYMENT_TRACKER_POLL_SECONDS * 3 + 30)
+
+
+def is_tracker_running():
+    """Check whether a track_payments worker has reported in recently"""
+    return cache.get(HEARTBEAT_CACHE_KEY) is not None
+
+
+def refresh_pending_payments(transaction_hashes=None):
+    """
+    Re-verify pending/processing payments in bulk and advance their status
+
+    Payments that are still unmined after PAYMENT_PENDING_TIMEOUT_HOURS are
+    marked expired.
+
+    Args:
+        transaction_hashes: only refresh these payments (default: all tracked)
+
+    Returns:
+        dict of status -> number of payments left in that status
+    """
+    queryset = Payment.objects.filter(status__in=TRACKED_STATUSES).exclude(transaction_hash__startswith='fiat_')
+    if transaction_hashes is not None:
+        queryset = queryset.filter(transaction_hash__in=transaction_hashes)
+    payments = list(queryset)
+    counts = {}
+    if not payments:
+        return counts
+
+    results = verify_payments(payments)
+    expire_before = timezone.now() - timedelta(hours=settings.PAYMENT_PENDING_TIMEOUT_HOURS)
+    for payment in payments:
+        result = results[payment.transaction_hash]
+        if result.get('rpc_error'):
+            # Leave the row alone; it will be retried on the next block
+            continue
+        payment.apply_verification(result)
+        if payment.status == 'pending' and payment.created_at < expire_before:
+            if payment.transition('expired'):
+                logger.info(f"Payment expired: {payment.transaction_hash}")
+        elif payment.status == 'confirmed':
+            logger.info(f"Payment verified: {payment.transaction_hash} from {payment.from_address}")
+        counts[payment.status] = counts.get(payment.status, 0) + 1
+
+    return counts
+
+
+def verify_payments(payments):
+    """
+    verify_transactions() for Payment rows
+
+    Returns:
+        dict mapping each payment's transaction hash to its result
+    """
+    # Payments are normally all to the configured wallet, but group by
+    # recipient in case the wallet changed while some were in flight
+    by_recipient = {}
+    for payment in payments:
+        by_recipient.setdefault(payment.to_address, []).append(payment.transaction_hash)
+
+    results = {}
+    for to_address, transaction_hashes in by_recipient.items():
+        results.update(verify_transactions(
+            transaction_hashes,
+            expected_to_address=to_address,
+            expected_amount_eth=settings.PAYMENT_AMOUNT_ETH
+        ))
+    return results
+
+
+def is_unmined(result):
+    """Whether a verify_transactions() result says the transaction isn't on chain (yet)"""
+    return not (result['valid'] or result.get('failed') or result.get('rpc_error') or result.get('confirmations', 0) > 0)
+
+
+def update_in_chunks(queryset, batch_size=1000, pause=0, **values):
+    """
+    Apply a set-based UPDATE to the rows matching queryset, one chunk at a time
+
+    Each chunk is a separate short statement, so the table is never locked for
+    long however many rows match. The update must move rows out of queryset.
+
+    Args:
+        pause: seconds to sleep between chunks, to leave room for other writers
+
+    Returns:
+        number of rows updated
+    """
+    updated = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return updated
+        # Re-apply the filter so rows changed since the SELECT are left alone
+        updated += queryset.filter(pk__in=ids).update(**values)
+        if len(ids) < batch_size:
+            return updated
+        if pause:
+            time.sleep(pause)
+
+
+def stale_pending_payments():
+    """Pending payments still unmined after PAYMENT_PENDING_TIMEOUT_HOURS"""
+    expire_before = timezone.now() - timedelta(hours=settings.PAYMENT_PENDING_TIMEOUT_HOURS)
+    return Payment.objects.filter(status='pending', created_at__lt=expire_before)
+
+
+def expired_download_tokens():
+    """Payments whose download token is past download_expires_at"""
+    return Payment.objects.filter(download_token__isnull=False, download_expires_at__lt=timezone.now())
+
+
+def expire_stale_payments(batch_size=1000, pause=0):
+    """
+    Expire stale pending payments, re-verifying each chunk on chain first
+
+    Expired is final, so each chunk is batch-verified once: a transaction
+    mined late (or while the tracker was down) is advanced instead, and
+    every one still unmined is expired with a single UPDATE. Rows the RPC
+    couldn't check are left for the next sweep, until they are
+    PAYMENT_UNVERIFIED_EXPIRY_HOURS old, so an RPC outage can't keep them
+    pending forever.
+
+    Returns:
+        number of payments expired
+    """
+    unverified_before = timezone.now() - timedelta(hours=settings.PAYMENT_UNVERIFIED_EXPIRY_HOURS)
+    expired = 0
+    last_pk = 0
+    while True:
+        chunk = list(stale_pending_payments().filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not chunk:
+            return expired
+        last_pk = chunk[-1].pk
+
+        results = verify_payments(chunk)
+        to_expire = []
+        for payment in chunk:
+            result = results[payment.transaction_hash]
+            if is_unmined(result) or (result.get('rpc_error') and payment.created_at < unverified_before):
+                to_expire.append(payment.pk)
+            elif not result.get('rpc_error'):
+                payment.apply_verification(result)
+        # status='pending' leaves alone rows the tracker advanced meanwhile
+        expired += Payment.objects.filter(pk__in=to_expire, status='pending').update(
+            status='expired', updated_at=timezone.now()
+        )
+        if len(chunk) < batch_size:
+            return expired
+        if pause:
+            time.sleep(pause)
+
+
+def revoke_expired_download_tokens(batch_size=1000, pause=0):
+    """Clear download tokens past their expiry; returns the number revoked"""
+    return update_in_chunks(
+        expired_download_tokens(), batch_size, pause, download_token=None, updated_at=timezone.now()
+    )
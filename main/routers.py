@@ -0,0 +1,92 @@
+"""
+Database routing: public page content is read from a replica, everything else from the primary
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+# Read-only public content that may lag the primary by a few seconds
+REPLICA_MODELS = {('main', 'project'), ('main', 'projectimage'), ('main', 'partner')}
+
+# Per request (or task): [pinned, wrote]. Pinned requests read replica models
+# from the primary; wrote records that replica models were written.
+_routing_state = ContextVar('replica_routing_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _uses_replica(model):
+    return (model._meta.app_label, model._meta.model_name) in REPLICA_MODELS
+
+
+def begin_request(pinned=False):
+    """Start a fresh routing scope; returns a token for end_request()"""
+    return _routing_state.set([pinned, False])
+
+
+def end_request(token):
+    _routing_state.reset(token)
+
+
+def wrote_replica_models():
+    state = _routing_state.get()
+    return bool(state and state[1])
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read replica models from the primary inside this block
+
+    For work whose result outlives the request, such as a page going into
+    the shared cache, where a lagging replica's answer would stick.
+    """
+    outer = _routing_state.get()
+    token = _routing_state.set([True, bool(outer and outer[1])])
+    try:
+        yield
+    finally:
+        wrote = _routing_state.get()[1]
+        _routing_state.reset(token)
+        if wrote and outer is not None:
+            outer[1] = True
+
+
+class ReplicaRouter:
+    """
+    Read Project/ProjectImage/Partner from the replica alias when one is configured
+
+    Payments and all other models always use the primary. Writing a replica
+    model pins the rest of the request to the primary, and
+    ReplicaPinningMiddleware keeps that client on the primary for
+    DATABASE_REPLICA_STICKY_SECONDS so it reads its own writes while the
+    replica catches up.
+    """
+
+    def db_for_read(self, model, **hints):
+        if replica_configured() and _uses_replica(model):
+            state = _routing_state.get()
+            if not (state and state[0]):
+                return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if _uses_replica(model):
+            state = _routing_state.get()
+            if state is None:
+                # Outside a request (shell, management commands): pin this context
+                state = [True, True]
+                _routing_state.set(state)
+            state[0] = state[1] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
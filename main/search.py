@@ -0,0 +1,251 @@
+"""
+Full-text project search
+
+Projects are indexed on title, description, specifications and technology
+names in a SQLite FTS5 table (main_project_fts) or, on PostgreSQL, a weighted
+tsvector table with a GIN index (main_project_search). Both are created by
+migration 0009 and kept current by the signal handlers in main.signals.
+Other backends fall back to unranked icontains matching.
+"""
+import re
+from django.db import connections, router
+from django.db.models import Q
+from .models import Project
+
+SQLITE_TABLE = 'main_project_fts'
+POSTGRES_TABLE = 'main_project_search'
+SEARCH_CONFIG = 'english'
+
+# bm25() column weights for title, description, specifications, technologies
+SQLITE_WEIGHTS = (10.0, 1.0, 2.0, 5.0)
+
+SQLITE_DOCUMENTS = """
+    SELECT p.id, p.title, p.description, p.specifications,
+           COALESCE((SELECT group_concat(t.name, ' ')
+                     FROM main_project_technologies pt
+                     JOIN main_technology t ON t.id = pt.technology_id
+                     WHERE pt.project_id = p.id), '')
+    FROM main_project p
+"""
+
+POSTGRES_DOCUMENTS = f"""
+    SELECT p.id,
+           setweight(to_tsvector('{SEARCH_CONFIG}', p.title), 'A') ||
+           setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE((
+               SELECT string_agg(t.name, ' ')
+               FROM main_project_technologies pt
+               JOIN main_technology t ON t.id = pt.technology_id
+               WHERE pt.project_id = p.id), '')), 'A') ||
+           setweight(to_tsvector('{SEARCH_CONFIG}', p.specifications), 'B') ||
+           setweight(to_tsvector('{SEARCH_CONFIG}', p.description), 'C')
+    FROM main_project p
+"""
+
+
+def sqlite_match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last one as a prefix
+
+    Quoting each word keeps FTS5 operators and punctuation in user input from
+    being interpreted (or raising syntax errors).
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SQLiteSearchBackend:
+    """FTS5 index ranked with bm25()"""
+
+    def __init__(self, using):
+        self.using = using
+
+    def index(self, project_ids):
+        with connections[self.using].cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(project_ids))
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', project_ids)
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, description, specifications, technologies) '
+                f'{SQLITE_DOCUMENTS} WHERE p.id IN ({placeholders})',
+                project_ids,
+            )
+
+    def remove(self, project_ids):
+        with connections[self.using].cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(project_ids))
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', project_ids)
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, description, specifications, technologies) '
+                f'{SQLITE_DOCUMENTS}'
+            )
+
+    def count(self, query):
+        match = sqlite_match_expression(query)
+        if match is None:
+            return 0
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {SQLITE_TABLE} JOIN main_project p ON p.id = {SQLITE_TABLE}.rowid '
+                f'WHERE {SQLITE_TABLE} MATCH %s AND p.is_active',
+                [match],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        match = sqlite_match_expression(query)
+        if match is None:
+            return []
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT {SQLITE_TABLE}.rowid FROM {SQLITE_TABLE} '
+                f'JOIN main_project p ON p.id = {SQLITE_TABLE}.rowid '
+                f'WHERE {SQLITE_TABLE} MATCH %s AND p.is_active '
+                f'ORDER BY bm25({SQLITE_TABLE}, {weights}), p.id LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector documents with a GIN index, ranked with ts_rank_cd()"""
+
+    def __init__(self, using):
+        self.using = using
+
+    def index(self, project_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (project_id, document) {POSTGRES_DOCUMENTS} '
+                f'WHERE p.id = ANY(%s) '
+                f'ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document',
+                [list(project_ids)],
+            )
+
+    def remove(self, project_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE project_id = ANY(%s)', [list(project_ids)])
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE}')
+            cursor.execute(f'INSERT INTO {POSTGRES_TABLE} (project_id, document) {POSTGRES_DOCUMENTS}')
+
+    def count(self, query):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {POSTGRES_TABLE} s JOIN main_project p ON p.id = s.project_id '
+                f"WHERE s.document @@ websearch_to_tsquery('{SEARCH_CONFIG}', %s) AND p.is_active",
+                [query],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT s.project_id FROM {POSTGRES_TABLE} s '
+                f'JOIN main_project p ON p.id = s.project_id '
+                f"CROSS JOIN websearch_to_tsquery('{SEARCH_CONFIG}', %s) q "
+                f'WHERE s.document @@ q AND p.is_active '
+                f'ORDER BY ts_rank_cd(s.document, q) DESC, p.id LIMIT %s OFFSET %s',
+                [query, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackSearchBackend:
+    """Unranked icontains matching, for databases without a full-text index"""
+
+    def __init__(self, using):
+        self.using = using
+
+    def index(self, project_ids):
+        pass
+
+    def remove(self, project_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def _queryset(self, query):
+        queryset = Project.objects.using(self.using).filter(is_active=True)
+        for word in query.split():
+            queryset = queryset.filter(
+                Q(title__icontains=word)
+                | Q(description__icontains=word)
+                | Q(specifications__icontains=word)
+                | Q(technologies__name__icontains=word)
+            )
+        return queryset.distinct()
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(self._queryset(query).order_by('id').values_list('id', flat=True)[offset:offset + limit])
+
+
+def get_search_backend(using=None):
+    """Search backend for a database alias (default: where Project reads are routed)"""
+    using = using or router.db_for_read(Project)
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend(using)
+    if vendor == 'postgresql':
+        return PostgresSearchBackend(using)
+    return FallbackSearchBackend(using)
+
+
+def index_projects(project_ids):
+    """Add or refresh index entries for these projects"""
+    project_ids = list(project_ids)
+    if project_ids:
+        get_search_backend(router.db_for_write(Project)).index(project_ids)
+
+
+def remove_projects(project_ids):
+    """Drop index entries for these projects"""
+    project_ids = list(project_ids)
+    if project_ids:
+        get_search_backend(router.db_for_write(Project)).remove(project_ids)
+
+
+class SearchResults:
+    """
+    Ranked search hits, sliceable and countable so they can go through Paginator
+
+    Only the requested slice of project ids is fetched from the index; the
+    projects themselves are loaded with their technologies prefetched.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query.strip()
+        self.backend = backend or get_search_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query) if self.query else 0
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if not self.query or stop <= start:
+            return []
+        ids = self.backend.ranked_ids(self.query, start, stop - start)
+        projects = Project.objects.using(self.backend.using).prefetch_related('technologies').in_bulk(ids)
+        return [projects[pk] for pk in ids if pk in projects]
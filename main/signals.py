@@ -0,0 +1,77 @@
+"""
+Signal handlers for the main app
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .content_cache import refresh_content_version
+from .media_jobs import enqueue_stale_media
+from .models import Partner, Project, ProjectImage, Technology
+from .search import index_projects, remove_projects
+
+
+@receiver(post_save, sender=Project)
+def index_saved_project(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_projects([instance.pk])
+
+
+@receiver(post_delete, sender=Project)
+def unindex_deleted_project(sender, instance, **kwargs):
+    remove_projects([instance.pk])
+
+
+@receiver(m2m_changed, sender=Project.technologies.through)
+def index_retagged_projects(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_projects([instance.pk])
+    elif action == 'pre_clear':
+        # technology.projects.clear() gives no pk_set; note the projects before they're unlinked
+        instance._search_project_ids = list(instance.projects.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        index_projects(getattr(instance, '_search_project_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        index_projects(pk_set)
+
+
+@receiver(post_save, sender=Technology)
+def index_renamed_technology(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_projects(instance.projects.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Technology)
+def note_untagged_projects(sender, instance, **kwargs):
+    instance._search_project_ids = list(instance.projects.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Technology)
+def index_untagged_projects(sender, instance, **kwargs):
+    index_projects(getattr(instance, '_search_project_ids', []))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_save, sender=Partner)
+def queue_media_processing(sender, instance, raw=False, **kwargs):
+    # Image variants, checksums and previews are built by the run_media_jobs worker
+    if not raw:
+        enqueue_stale_media(instance)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_save, sender=Partner)
+@receiver(post_delete, sender=Partner)
+@receiver(post_save, sender=Technology)
+@receiver(post_delete, sender=Technology)
+def invalidate_content_pages(sender, **kwargs):
+    refresh_content_version()
+
+
+@receiver(m2m_changed, sender=Project.technologies.through)
+def invalidate_retagged_content_pages(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        refresh_content_version()
@@ -0,0 +1,145 @@
+"""
+Request coalescing: concurrent callers asking for the same key share one in-flight call
+"""
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Lease
+
+LEASE_POLL_SECONDS = 0.1
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; callers arriving meanwhile get its result"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines; calls are only shared within one event loop"""
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()  # loop -> {key: task}
+
+    async def do(self, key, fn, *args, **kwargs):
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        # shield() so one cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+
+def acquire_lease(key, timeout):
+    """
+    Take the lease on key for up to timeout seconds
+
+    The unique key makes the INSERT atomic on every database, unlike
+    cache.add() on the file-based cache. A lease left behind by a worker
+    that died is cleared once it expires.
+
+    Returns:
+        the Lease's pk (pass it to release_lease()), or None if it is held
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            # Savepoint, so a conflict doesn't break a surrounding transaction
+            with transaction.atomic():
+                return Lease.objects.create(key=key, expires_at=now + timedelta(seconds=timeout)).pk
+        except IntegrityError:
+            # Held: take it over only if it has expired, i.e. its holder died
+            if not Lease.objects.filter(key=key, expires_at__lte=now).delete()[0]:
+                return None
+    return None
+
+
+def release_lease(pk):
+    """Give up a lease; a no-op if it expired and was taken by someone else"""
+    Lease.objects.filter(pk=pk).delete()
+
+
+def lease_held(key):
+    return Lease.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
+
+
+@contextmanager
+def lease(key, timeout):
+    """
+    Cross-process mutual exclusion through a row in the Lease table
+
+    Yields True if this process holds the lease. Otherwise waits (up to
+    timeout) for the holder to finish and yields False, so the caller can
+    reuse whatever the holder stored instead of repeating the work.
+    """
+    pk = acquire_lease(key, timeout)
+    if pk is not None:
+        try:
+            yield True
+        finally:
+            release_lease(pk)
+        return
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and lease_held(key):
+        time.sleep(LEASE_POLL_SECONDS)
+    yield False
+
+
+@asynccontextmanager
+async def async_lease(key, timeout):
+    """Async counterpart of lease()"""
+    pk = await sync_to_async(acquire_lease)(key, timeout)
+    if pk is not None:
+        try:
+            yield True
+        finally:
+            await sync_to_async(release_lease)(pk)
+        return
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and await sync_to_async(lease_held)(key):
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+    yield False
@@ -0,0 +1,81 @@
+"""
+Static files storage that hashes file names and precompresses text assets at collectstatic time
+"""
+import gzip
+import logging
+import os
+import brotli
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.html', '.txt', '.xml', '.ico', '.wasm'}
+MIN_COMPRESS_SIZE = 256  # Bytes; smaller files aren't worth a second request path
+
+
+def compressors():
+    """(suffix, compress function) pairs, best first"""
+    return [
+        ('.br', lambda data: brotli.compress(data, quality=11)),
+        ('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+    ]
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes .br and .gz siblings of compressible files
+
+    Variants are only kept when they are meaningfully smaller than the
+    original. main.file_views.static_file serves them by Accept-Encoding.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.missing_references = set()
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # A stylesheet referencing an optional asset that isn't there
+            # (e.g. images/header-footer-bg.jpg before it is added) keeps the
+            # plain reference instead of failing collectstatic
+            if name not in self.missing_references:
+                self.missing_references.add(name)
+                logger.warning(f"Static file {name} is referenced but missing; leaving its URL unhashed")
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.update([name, hashed_name])
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in sorted(filter(None, processed_names)):
+            for variant in self.compress(name):
+                yield name, variant, True
+
+    def compress(self, name):
+        """Write compressed siblings of one stored file; returns the names written"""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+            return []
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        written = []
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) < len(data) * 0.95:
+                target = name + suffix
+                if self.exists(target):
+                    self.delete(target)
+                with open(self.path(target), 'wb') as f:
+                    f.write(compressed)
+                written.append(target)
+        return written
@@ -0,0 +1,66 @@
+"""
+Template tags for responsive image variants (see main.images)
+
+    {% load image_variants %}
+    {% picture project.featured_image alt=project.title class="cover-photo" sizes="(max-width: 800px) 100vw, 1100px" %}
+    <img src="{{ img.image.url }}" srcset="{{ img.image|srcset:'jpeg' }}" sizes="50vw">
+"""
+from django import template
+from django.utils.html import format_html, format_html_join
+from ..images import FORMATS, manifest_field
+
+register = template.Library()
+
+
+def get_manifest(fieldfile):
+    """Variant manifest stored alongside an image field, if it matches the current file"""
+    if not fieldfile:
+        return {}
+    manifest = getattr(fieldfile.instance, manifest_field(fieldfile.field.name), None) or {}
+    return manifest if manifest.get('source') == fieldfile.name else {}
+
+
+def build_srcset(fieldfile, manifest, format_name):
+    renditions = manifest.get('variants', {}).get(format_name, [])
+    return ', '.join(f'{fieldfile.storage.url(name)} {width}w' for width, name in renditions)
+
+
+@register.filter
+def srcset(fieldfile, format_name='webp'):
+    """srcset value listing an image's renditions in one format ('' if there are none)"""
+    return build_srcset(fieldfile, get_manifest(fieldfile), format_name)
+
+
+@register.simple_tag
+def picture(fieldfile, alt='', sizes='100vw', **attrs):
+    """
+    <picture> offering every rendition of an image, with the original as <img> fallback
+
+    Extra keyword arguments (class, loading, ...) become attributes of the <img>.
+    Images without renditions yet render as a plain <img>.
+    """
+    if not fieldfile:
+        return ''
+    manifest = get_manifest(fieldfile)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    img_attrs = {'src': fieldfile.url, 'alt': alt, **attrs}
+    if manifest.get('width'):
+        img_attrs.update(width=manifest['width'], height=manifest['height'])
+
+    sources = []
+    for format_name in manifest.get('variants', {}):
+        value = build_srcset(fieldfile, manifest, format_name)
+        if format_name == 'jpeg':
+            img_attrs.update(srcset=value, sizes=sizes)
+        else:
+            sources.append((FORMATS[format_name][1], value, sizes))
+
+    img = format_html('<img {}>', format_html_join(' ', '{}="{}"', img_attrs.items()))
+    if not sources:
+        return img
+    return format_html(
+        '<picture class="responsive-image">{}{}</picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', sources),
+        img,
+    )
@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, router
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+import brotli
+from PIL import Image
+from . import async_api_views
+from .api_views import refresh_payment, verified_head_key
+from .async_web3_utils import reset_async_web3_connection
+from .business_card import card_inputs, card_key, render_card
+from .content_api_views import after_key, decode_cursor, encode_cursor, parse_fields
+from .content_cache import cache_content_page, page_cache_key, replica_caught_up
+from .fake_rpc import FakeRPCServer
+from .management.commands.bench_verify import percentile
+from .file_serving import if_range_matches, parse_range, serve_file
+from .file_views import accepted_encodings, static_file
+from .images import generate_variants, variant_name, variant_names
+from .media_jobs import claim_job, requeue_stalled_jobs, run_pending_jobs
+from .middleware import PRIMARY_PIN_COOKIE, ReplicaPinningMiddleware
+from .models import FinalizedTransaction, Lease, MediaJob, Partner, Payment, Project, Technology
+from .payment_tracker import expire_stale_payments, is_tracker_running, refresh_pending_payments
+from .routers import begin_request, end_request, primary_reads, wrote_replica_models
+from .search import SearchResults, sqlite_match_expression
+from .storage import PrecompressedManifestStaticFilesStorage
+from .singleflight import acquire_lease, lease, release_lease
+from . import web3_utils
+from .web3_utils import (
+    MIN_LATENCY_SAMPLES,
+    ChunkVerification,
+    RPCPool,
+    eth_to_wei,
+    get_block_number,
+    get_web3_client,
+    get_web3_connection,
+    reset_web3_connection,
+    reset_web3_state,
+    set_cached_block_number,
+    verify_transaction,
+)
 
-# Create your tests here.
+
+def make_payment(**fields):
+    values = {
+        'transaction_hash': '0x' + 'a' * 64,
+        'from_address': '0x' + '1' * 40,
+        'to_address': '0x' + '2' * 40,
+        'amount_wei': 0,
+        'amount_eth': '0.02',
+    }
+    values.update(fields)
+    return Payment.objects.create(**values)
+
+
+class PaymentTransitionTests(TestCase):
+    def test_allowed_transition_is_written(self):
+        payment = make_payment()
+        self.assertTrue(payment.transition('processing', 1))
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.confirmations), ('processing', 1))
+
+    def test_disallowed_transition_is_refused(self):
+        payment = make_payment(status='confirmed', confirmations=3)
+        with self.assertNumQueries(0):
+            self.assertFalse(payment.transition('pending', 0))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'confirmed')
+
+    def test_final_statuses_have_no_transitions(self):
+        for status in ('confirmed', 'failed', 'expired'):
+            payment = make_payment(transaction_hash=f'0x{status}', status=status)
+            for target in ('pending', 'processing', 'confirmed', 'failed', 'expired'):
+                self.assertFalse(payment.transition(target))
+
+    def test_unchanged_status_and_confirmations_skip_the_write(self):
+        payment = make_payment(status='processing', confirmations=2)
+        with self.assertNumQueries(0):
+            self.assertFalse(payment.transition('processing', 2))
+            self.assertFalse(payment.transition('processing', 1))
+
+    def test_more_confirmations_are_written(self):
+        payment = make_payment(status='processing', confirmations=1)
+        self.assertTrue(payment.transition('processing', 2))
+        self.assertEqual(Payment.objects.get(pk=payment.pk).confirmations, 2)
+
+    def test_status_change_may_lower_confirmations(self):
+        payment = make_payment(status='processing', confirmations=2)
+        self.assertTrue(payment.transition('failed', 0))
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.confirmations), ('failed', 0))
+
+    def test_lost_race_refreshes_the_instance(self):
+        payment = make_payment()
+        stale = Payment.objects.get(pk=payment.pk)
+        self.assertTrue(payment.transition('processing', 2))
+        self.assertFalse(stale.transition('processing', 1))
+        self.assertEqual((stale.status, stale.confirmations), ('processing', 2))
+
+    def test_fields_are_written_with_the_change(self):
+        payment = make_payment()
+        self.assertTrue(payment.transition('processing', 1, amount_wei=5))
+        self.assertEqual(Payment.objects.get(pk=payment.pk).amount_wei, 5)
+
+
+class ApplyVerificationTests(TestCase):
+    def test_unmined_stays_pending(self):
+        payment = make_payment()
+        self.assertFalse(payment.apply_verification({'valid': False, 'confirmations': 0, 'error': 'not mined'}))
+        self.assertEqual(payment.status, 'pending')
+
+    def test_mined_below_required_is_processing(self):
+        payment = make_payment()
+        self.assertTrue(payment.apply_verification({
+            'valid': False, 'confirmations': 1, 'amount_wei': 10 ** 16, 'amount_eth': 0.01, 'error': 'waiting',
+        }))
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.confirmations), ('processing', 1))
+        self.assertEqual(str(payment.amount_eth), '0.01000000')
+        self.assertIsNone(payment.download_token)
+
+    def test_valid_is_confirmed_with_a_download_token(self):
+        payment = make_payment(status='processing', confirmations=1)
+        self.assertTrue(payment.apply_verification({
+            'valid': True, 'confirmations': 3, 'amount_wei': 2 * 10 ** 16, 'amount_eth': 0.02,
+        }))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'confirmed')
+        self.assertIsNotNone(payment.verified_at)
+        self.assertTrue(payment.download_token)
+        self.assertTrue(payment.is_download_valid())
+
+    def test_existing_download_token_is_kept(self):
+        payment = make_payment(status='processing', confirmations=1, download_token='kept')
+        payment.apply_verification({'valid': True, 'confirmations': 3})
+        payment.refresh_from_db()
+        self.assertEqual(payment.download_token, 'kept')
+
+    def test_reorg_moves_processing_back_to_pending(self):
+        payment = make_payment(status='processing', confirmations=2)
+        self.assertTrue(payment.apply_verification({'valid': False, 'confirmations': 0, 'error': 'Transaction not found'}))
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.confirmations), ('pending', 0))
+
+    def test_rpc_errors_change_nothing(self):
+        payment = make_payment(status='processing', confirmations=2)
+        with self.assertNumQueries(0):
+            self.assertFalse(payment.apply_verification({
+                'valid': False, 'confirmations': 0, 'error': 'down', 'rpc_error': True,
+            }))
+        self.assertEqual(payment.status, 'processing')
+
+    def test_verified_at_is_set_only_when_confirmed(self):
+        verified_at = timezone.now() - timedelta(hours=1)
+        payment = make_payment(status='confirmed', confirmations=3, verified_at=verified_at, download_token='t')
+        self.assertTrue(payment.apply_verification({'valid': True, 'confirmations': 4}))
+        payment.refresh_from_db()
+        self.assertEqual((payment.confirmations, payment.verified_at), (4, verified_at))
+
+    def test_final_failure_after_confirmations_is_failed(self):
+        payment = make_payment(status='processing', confirmations=2)
+        self.assertTrue(payment.apply_verification({
+            'valid': False, 'confirmations': 0, 'failed': True, 'error': 'Transaction reverted',
+        }))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+        self.assertFalse(payment.is_download_valid())
+
+
+class LeaseTests(TestCase):
+    def test_only_one_holder(self):
+        pk = acquire_lease('job', 30)
+        self.assertIsNotNone(pk)
+        self.assertIsNone(acquire_lease('job', 30))
+        release_lease(pk)
+        self.assertIsNotNone(acquire_lease('job', 30))
+
+    def test_expired_lease_is_taken_over(self):
+        stale = acquire_lease('job', 30)
+        Lease.objects.filter(pk=stale).update(expires_at=timezone.now() - timedelta(seconds=1))
+        pk = acquire_lease('job', 30)
+        self.assertIsNotNone(pk)
+        # The old holder finishing late must not release the new holder's lease
+        release_lease(stale)
+        self.assertTrue(Lease.objects.filter(pk=pk).exists())
+
+    def test_context_manager_releases(self):
+        with lease('job', 30) as acquired:
+            self.assertTrue(acquired)
+        self.assertFalse(Lease.objects.filter(key='job').exists())
+
+    def test_waiter_yields_false_while_held(self):
+        acquire_lease('job', 30)
+        with lease('job', 0.2) as acquired:
+            self.assertFalse(acquired)
+
+
+class ExpireStalePaymentsTests(TestCase):
+    def stale(self, tx_hash, hours=3):
+        payment = make_payment(transaction_hash=tx_hash)
+        Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(hours=hours))
+        return payment
+
+    def sweep(self, results, **kwargs):
+        with mock.patch('main.payment_tracker.verify_transactions', return_value=results) as verify:
+            expired = expire_stale_payments(**kwargs)
+        return expired, verify
+
+    def status(self, payment):
+        return Payment.objects.get(pk=payment.pk).status
+
+    def test_only_unmined_payments_expire(self):
+        unmined = self.stale('0xunmined')
+        mined = self.stale('0xmined')
+        unchecked = self.stale('0xunchecked')
+        fresh = make_payment(transaction_hash='0xfresh')
+        expired, verify = self.sweep({
+            '0xunmined': {'valid': False, 'confirmations': 0, 'error': 'Transaction not found'},
+            '0xmined': {'valid': False, 'confirmations': 1, 'error': 'waiting'},
+            '0xunchecked': {'valid': False, 'confirmations': 0, 'error': 'down', 'rpc_error': True},
+        })
+        self.assertEqual(expired, 1)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(self.status(unmined), 'expired')
+        self.assertEqual(self.status(mined), 'processing')
+        self.assertEqual(self.status(unchecked), 'pending')
+        self.assertEqual(self.status(fresh), 'pending')
+
+    def test_unverifiable_payments_expire_eventually(self):
+        payment = self.stale('0xold', hours=48)
+        expired, _ = self.sweep({'0xold': {'valid': False, 'confirmations': 0, 'error': 'down', 'rpc_error': True}})
+        self.assertEqual(expired, 1)
+        self.assertEqual(self.status(payment), 'expired')
+
+    def test_each_chunk_is_verified_once(self):
+        for i in range(3):
+            self.stale(f'0x{i}')
+        results = {f'0x{i}': {'valid': False, 'confirmations': 0, 'error': 'Transaction not found'} for i in range(3)}
+        expired, verify = self.sweep(results, batch_size=2)
+        self.assertEqual(expired, 3)
+        self.assertEqual(verify.call_count, 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RefreshPaymentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        set_cached_block_number(100)
+        self.payment = make_payment()
+        result = {'valid': False, 'confirmations': 1, 'error': 'waiting'}
+        patcher = mock.patch('main.api_views.verify_transaction', return_value=result)
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def refresh(self):
+        return refresh_payment(self.payment.transaction_hash, self.payment.from_address, self.payment.to_address)
+
+    def test_verifies_once_per_chain_head(self):
+        self.assertEqual(self.refresh()[0].status, 'processing')
+        self.assertEqual(cache.get(verified_head_key(self.payment.transaction_hash)), 100)
+        # Same head: answered from the row, without the lease or any write
+        with self.assertNumQueries(1):
+            self.refresh()
+        self.assertEqual(self.verify.call_count, 1)
+        set_cached_block_number(101)
+        self.refresh()
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_final_payments_are_not_verified(self):
+        for status in ('confirmed', 'failed', 'expired'):
+            Payment.objects.filter(pk=self.payment.pk).update(status=status)
+            self.assertEqual(self.refresh()[0].status, status)
+        self.verify.assert_not_called()
+        self.assertFalse(Lease.objects.exists())
+
+    def test_rpc_errors_are_not_remembered(self):
+        self.verify.return_value = {'valid': False, 'confirmations': 0, 'error': 'down', 'rpc_error': True}
+        self.refresh()
+        self.refresh()
+        self.assertEqual(self.verify.call_count, 2)
+        self.assertFalse(Lease.objects.exists())
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    RPC_HEDGE_REQUESTS=False,
+    TX_CACHE_PERSIST=False,
+)
+class FakeChainTestCase(TestCase):
+    """Runs against a local FakeRPCServer configured as the only RPC endpoint"""
+    wallet = '0x' + '2' * 40
+
+    def setUp(self):
+        cache.clear()
+        self.server = FakeRPCServer().start()
+        self.addCleanup(self.server.stop)
+        self.chain = self.server.chain
+        rpc_settings = override_settings(RPC_URL=self.server.url, RPC_URLS=[self.server.url])
+        rpc_settings.enable()
+        self.addCleanup(rpc_settings.disable)
+        reset_web3_state()
+        self.addCleanup(reset_web3_state)
+
+    def add_payment_transaction(self, **kwargs):
+        return self.chain.add_transaction(self.wallet, eth_to_wei(str(settings.PAYMENT_AMOUNT_ETH)), **kwargs)
+
+    def verify(self, tx_hash):
+        return verify_transaction(tx_hash, self.wallet, settings.PAYMENT_AMOUNT_ETH)
+
+
+class Web3ClientTests(FakeChainTestCase):
+    def test_client_is_shared_until_reset(self):
+        client = get_web3_client()
+        self.assertIs(get_web3_client(self.server.url), client)
+        reset_web3_connection()
+        self.assertIsNot(get_web3_client(), client)
+
+    def test_recent_success_skips_the_health_check(self):
+        self.assertTrue(self.verify(self.add_payment_transaction(confirmations=3))['valid'])
+        self.server.reset_stats()
+        self.assertIsNotNone(get_web3_connection())
+        self.assertEqual(self.server.http_requests, 0)
+
+    @override_settings(RPC_HEALTH_CHECK_INTERVAL=0)
+    def test_stale_client_is_health_checked(self):
+        self.assertIsNotNone(get_web3_connection())
+        self.assertEqual(self.server.calls_by_method, {'web3_clientVersion': 1})
+
+
+@override_settings(PAYMENT_PENDING_TIMEOUT_HOURS=2)
+class PaymentTrackerTests(FakeChainTestCase):
+    def test_refresh_advances_tracked_payments_in_one_batch(self):
+        confirmed = make_payment(transaction_hash=self.add_payment_transaction(confirmations=3))
+        processing = make_payment(transaction_hash=self.add_payment_transaction(confirmations=1))
+        stale = make_payment(transaction_hash=self.add_payment_transaction(mined=False))
+        Payment.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=3))
+        make_payment(transaction_hash='fiat_123', status='pending')
+
+        self.assertEqual(refresh_pending_payments(), {'confirmed': 1, 'processing': 1, 'expired': 1})
+        self.assertEqual(self.server.http_requests, 2)  # Health check, then one batch
+        statuses = dict(Payment.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[payment.pk] for payment in (confirmed, processing, stale)],
+            ['confirmed', 'processing', 'expired'],
+        )
+
+    def test_track_payments_once_warms_the_shared_state(self):
+        payment = make_payment(transaction_hash=self.add_payment_transaction(confirmations=3))
+        self.assertFalse(is_tracker_running())
+        call_command('track_payments', '--once', stdout=StringIO())
+        self.assertTrue(is_tracker_running())
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'confirmed')
+
+
+class BlockNumberCacheTests(FakeChainTestCase):
+    def test_head_is_fetched_once_per_block_interval(self):
+        self.assertEqual(get_block_number(), self.chain.block_number)
+        self.chain.mine()
+        self.assertEqual(get_block_number(), self.chain.block_number - 1)
+        self.assertEqual(self.server.calls_by_method, {'eth_blockNumber': 1})
+
+    def test_head_published_by_another_process_is_used(self):
+        set_cached_block_number(42)
+        with mock.patch.object(web3_utils, '_block_number', (None, 0.0)):
+            self.assertEqual(get_block_number(), 42)
+        self.assertEqual(self.server.rpc_calls, 0)
+
+    def test_verification_reuses_the_cached_head(self):
+        get_block_number()
+        self.server.reset_stats()
+        self.assertTrue(self.verify(self.add_payment_transaction(confirmations=3))['valid'])
+        self.assertNotIn('eth_blockNumber', self.server.calls_by_method)
+
+
+@override_settings(TX_FINALITY_DEPTH=12)
+class FinalizedTransactionCacheTests(FakeChainTestCase):
+    def lookups(self, tx_hash):
+        self.server.reset_stats()
+        result = self.verify(tx_hash)
+        self.assertTrue(result['valid'])
+        return self.server.calls_by_method.get('eth_getTransactionReceipt', 0)
+
+    def test_only_finalized_transactions_are_cached(self):
+        finalized = self.add_payment_transaction(confirmations=12)
+        recent = self.add_payment_transaction(confirmations=11)
+        self.assertEqual([self.lookups(finalized), self.lookups(finalized)], [1, 0])
+        self.assertEqual([self.lookups(recent), self.lookups(recent)], [1, 1])
+
+    @override_settings(TX_CACHE_PERSIST=True)
+    def test_persisted_transactions_survive_a_restart(self):
+        tx_hash = self.add_payment_transaction(confirmations=20)
+        self.lookups(tx_hash)
+        self.assertEqual(FinalizedTransaction.objects.get().transaction_hash, tx_hash)
+        reset_web3_state()
+        self.assertEqual(self.lookups(tx_hash), 0)
+
+
+@override_settings(WALLET_ADDRESS=FakeChainTestCase.wallet)
+class AsyncVerifyPaymentTests(FakeChainTestCase):
+    async def post_verify(self, tx_hash):
+        request = AsyncRequestFactory().post(
+            '/api/payment/verify/',
+            data=json.dumps({'transaction_hash': tx_hash, 'from_address': '0x' + '1' * 40}),
+            content_type='application/json',
+        )
+        try:
+            return json.loads((await async_api_views.verify_payment(request)).content)
+        finally:
+            # aiohttp sessions belong to this test's event loop
+            await reset_async_web3_connection()
+
+    async def test_verify_creates_and_confirms_the_payment(self):
+        tx_hash = self.add_payment_transaction(confirmations=3)
+        data = await self.post_verify(tx_hash)
+        self.assertEqual(data['status'], 'confirmed')
+        payment = await Payment.objects.aget(transaction_hash=tx_hash)
+        self.assertEqual(payment.download_token, data['download_token'])
+
+    async def test_pending_payment_waits_for_confirmations(self):
+        data = await self.post_verify(self.add_payment_transaction(confirmations=1))
+        self.assertEqual((data['status'], data['confirmations']), ('processing', 1))
+
+
+class FakeChainTests(FakeChainTestCase):
+    def test_batches_are_answered_and_counted(self):
+        tx_hash = self.chain.add_transaction(self.wallet, 5, mined=False)
+        responses = get_web3_client().batch_request([
+            ('eth_getTransactionReceipt', [tx_hash]),
+            ('eth_getTransactionByHash', [tx_hash]),
+            ('eth_gasPrice', []),
+        ])
+        self.assertIsNone(responses[0]['result'])
+        self.assertEqual(responses[1]['result']['value'], '0x5')
+        self.assertEqual(responses[2]['error']['code'], -32601)
+        self.assertEqual((self.server.http_requests, self.server.rpc_calls), (1, 3))
+
+    def test_mining_includes_pending_transactions(self):
+        tx_hash = self.add_payment_transaction(mined=False)
+        self.assertEqual(self.verify(tx_hash)['error'], 'Transaction not found')
+        self.chain.mine_transaction(tx_hash)
+        self.chain.mine(3)
+        # Let the next verification see the new head
+        cache.clear()
+        reset_web3_state()
+        self.assertTrue(self.verify(tx_hash)['valid'])
+
+    def test_injected_errors_are_rpc_errors(self):
+        self.server.error_rate = 1.0
+        with self.assertLogs('main.web3_utils', 'WARNING'):
+            result = self.verify(self.add_payment_transaction(confirmations=3))
+        self.assertTrue(result['rpc_error'])
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, q) for q in (0.5, 0.95, 0.99)], [51, 96, 100])
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ChunkVerificationTests(TestCase):
+    def test_json_rpc_error_for_one_transaction_is_an_rpc_error(self):
+        set_cached_block_number(100)
+        tx_hash = '0x' + 'f' * 64
+        batch = ChunkVerification([tx_hash], '0x' + '2' * 40, 0.02)
+        responses = [{'id': i, 'error': {'code': -32005, 'message': 'rate limited'}} for i in range(len(batch.calls))]
+        with self.assertLogs('main.web3_utils', 'ERROR'):
+            result = batch.complete(responses)[tx_hash]
+        self.assertFalse(result['valid'])
+        self.assertTrue(result['rpc_error'])
+
+
+class FakeRPCClient:
+    """Stands in for a Web3 client: answers batches after a delay, or raises"""
+
+    def __init__(self, delay=0, error=None):
+        self.delay = delay
+        self.error = error
+
+    def batch_request(self, calls):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [{'id': i, 'result': hex(i)} for i in range(len(calls))]
+
+
+@override_settings(RPC_POOL_SIZE=1, RPC_ENDPOINT_COOLDOWN=30)
+class RPCPoolTests(SimpleTestCase):
+    def make_pool(self, clients):
+        pool = RPCPool(list(clients))
+        for endpoint in pool.endpoints:
+            for _ in range(MIN_LATENCY_SAMPLES):
+                endpoint.record_success(0.01)
+        patcher = mock.patch('main.web3_utils.get_web3_client', side_effect=clients.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return pool
+
+    @override_settings(RPC_HEDGE_REQUESTS=False)
+    def test_fails_over_to_the_next_endpoint(self):
+        pool = self.make_pool({'http://a': FakeRPCClient(error=ValueError('down')), 'http://b': FakeRPCClient()})
+        with self.assertLogs('main.web3_utils', 'WARNING'):
+            self.assertEqual(pool.batch_request(['call']), [{'id': 0, 'result': '0x0'}])
+        # The failing endpoint now cools down behind the healthy one
+        self.assertEqual([endpoint.rpc_url for endpoint in pool.ranked()], ['http://b', 'http://a'])
+
+    @override_settings(RPC_HEDGE_REQUESTS=True)
+    def test_hedged_request_fails_over_without_waiting_for_p95(self):
+        pool = self.make_pool({'http://a': FakeRPCClient(error=ValueError('down')), 'http://b': FakeRPCClient()})
+        with self.assertLogs('main.web3_utils', 'WARNING'):
+            self.assertEqual(pool.batch_request(['call']), [{'id': 0, 'result': '0x0'}])
+
+    @override_settings(RPC_HEDGE_REQUESTS=True)
+    def test_hedges_are_not_queued_behind_other_first_attempts(self):
+        # More concurrent callers than RPC_POOL_SIZE, all stuck on a slow
+        # first endpoint: each still gets the hedge's answer in p95 time
+        pool = self.make_pool({'http://slow': FakeRPCClient(delay=1), 'http://fast': FakeRPCClient()})
+        elapsed = []
+
+        def call():
+            started = time.monotonic()
+            pool.batch_request(['call'])
+            elapsed.append(time.monotonic() - started)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(elapsed), 3)
+        self.assertLess(max(elapsed), 0.5)
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_ignored_headers(self):
+        for header in (None, '', 'bytes=-', 'items=0-9', 'bytes=0-9,20-29'):
+            self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=20-10', 'bytes=-0'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 100)
+
+
+class IfRangeTests(SimpleTestCase):
+    def request(self, if_range=None):
+        headers = {'HTTP_IF_RANGE': if_range} if if_range else {}
+        return RequestFactory().get('/', **headers)
+
+    def test_without_if_range(self):
+        self.assertTrue(if_range_matches(self.request(), '"abc"', 1000))
+
+    def test_etag(self):
+        self.assertTrue(if_range_matches(self.request('"abc"'), '"abc"', 1000))
+        self.assertFalse(if_range_matches(self.request('"xyz"'), '"abc"', 1000))
+        # Weak validators never match
+        self.assertFalse(if_range_matches(self.request('W/"abc"'), '"abc"', 1000))
+
+    def test_date(self):
+        self.assertTrue(if_range_matches(self.request('Thu, 01 Jan 1970 00:16:40 GMT'), '"abc"', 1000.5))
+        self.assertFalse(if_range_matches(self.request('Thu, 01 Jan 1970 00:16:41 GMT'), '"abc"', 1000.5))
+
+
+@override_settings(FILE_SENDFILE_BACKEND='')
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(location=self.root)
+        self.storage.save('paper.pdf', ContentFile(bytes(range(100))))
+        self.factory = RequestFactory()
+
+    def serve(self, **headers):
+        return serve_file(self.factory.get('/', **headers), self.storage, 'paper.pdf', etag='abc')
+
+    def test_full_file(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+
+    def test_range(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_suffix_range(self):
+        response = self.serve(HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(95, 100)))
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), 100)
+
+    def test_not_modified(self):
+        response = self.serve(HTTP_IF_NONE_MATCH='"abc"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], '"abc"')
+
+    def test_attachment(self):
+        response = serve_file(
+            self.factory.get('/'), self.storage, 'paper.pdf', filename='white paper.pdf', as_attachment=True
+        )
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="white paper.pdf"')
+
+    @override_settings(FILE_SENDFILE_BACKEND='x-accel-redirect', FILE_SENDFILE_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.serve()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/paper.pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['ETag'], '"abc"')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(FILE_SENDFILE_BACKEND='x-accel-redirect')
+    def test_x_accel_redirect_needs_a_prefix(self):
+        response = serve_file(self.factory.get('/'), self.storage, 'paper.pdf', sendfile_prefix='')
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(FILE_SENDFILE_BACKEND='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.serve()
+        self.assertEqual(response['X-Sendfile'], self.storage.path('paper.pdf'))
+
+    @override_settings(FILE_SENDFILE_BACKEND='x-accel-redirect')
+    def test_conditional_request_is_answered_before_offload(self):
+        response = self.serve(HTTP_IF_NONE_MATCH='"abc"')
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+
+@override_settings(FILE_SENDFILE_BACKEND='')
+@override_settings(FILE_SENDFILE_BACKEND='')
+class PrecompressedStaticTests(SimpleTestCase):
+    css = b'body { color: #111; }\n' * 100
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.storage = PrecompressedManifestStaticFilesStorage(location=root, base_url='/static/')
+        self.storage.save('css/app.css', ContentFile(self.css))
+        self.storage.save('css/tiny.css', ContentFile(b'a{}'))
+        self.storage.compress('css/app.css')
+        for name, value in (('main.file_views.staticfiles_storage', self.storage),
+                            ('main.file_views.hashed_static_names', lambda: frozenset({'css/app.css'}))):
+            patcher = mock.patch(name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, path, accept_encoding=''):
+        request = RequestFactory().get(f'/static/{path}', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return static_file(request, path)
+
+    def test_compressed_siblings_round_trip(self):
+        with self.storage.open('css/app.css.br') as f:
+            self.assertEqual(brotli.decompress(f.read()), self.css)
+        with self.storage.open('css/app.css.gz') as f:
+            self.assertEqual(gzip.decompress(f.read()), self.css)
+        self.assertEqual(self.storage.compress('css/tiny.css'), [])
+
+    def test_best_accepted_encoding_is_served(self):
+        for accept_encoding, encoding in (('gzip, br', 'br'), ('gzip, br;q=0', 'gzip'), ('', None)):
+            response = self.get('css/app.css', accept_encoding)
+            self.assertEqual(response.get('Content-Encoding'), encoding)
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_hashed_names_are_immutable(self):
+        self.assertIn('immutable', self.get('css/app.css')['Cache-Control'])
+        self.assertEqual(self.get('css/tiny.css')['Cache-Control'], 'public, no-cache')
+
+    def test_variants_are_not_served_directly(self):
+        with self.assertRaises(Http404):
+            self.get('css/app.css.gz')
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip;q=0.5, BR, identity;q=0, x;q=bad'), {'gzip', 'br'})
+
+
+@override_settings(BUSINESS_CARD_WORKERS=0, BUSINESS_CARD_DPI=100, BUSINESS_CARD_SENDFILE_PREFIX='')
+class BusinessCardTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(BUSINESS_CARD_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.payment = make_payment(status='confirmed', confirmations=3, download_token='t' * 32)
+
+    def download(self, card_format, **headers):
+        return self.client.get(f'/api/download/{self.payment.download_token}/?format={card_format}', **headers)
+
+    def test_key_covers_every_input_and_format(self):
+        inputs = card_inputs()
+        self.assertEqual(card_key(inputs, 'png'), card_key(dict(inputs), 'png'))
+        self.assertNotEqual(card_key(inputs, 'png'), card_key(inputs, 'pdf'))
+        self.assertNotEqual(card_key(inputs, 'png'), card_key({**inputs, 'tagline': 'x'}, 'png'))
+        key = card_key(inputs, 'png')
+        with mock.patch('main.business_card.CARD_TEMPLATE_VERSION', 2):
+            self.assertNotEqual(card_key(inputs, 'png'), key)
+
+    def test_renders_at_card_size(self):
+        with Image.open(BytesIO(render_card(card_inputs(), 'png'))) as image:
+            self.assertEqual(image.size, (350, 200))
+        self.assertTrue(render_card(card_inputs(), 'pdf').startswith(b'%PDF'))
+
+    def test_repeat_downloads_reuse_the_render(self):
+        with mock.patch('main.business_card.render_card', wraps=render_card) as render:
+            first = self.download('png')
+            second = self.download('png', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertIn('attachment', first['Content-Disposition'])
+        self.assertEqual(first['ETag'], f'"{card_key(card_inputs(), "png")}"')
+        self.assertEqual(second.status_code, 304)
+
+    def test_invalid_requests_are_refused(self):
+        self.assertEqual(self.download('gif').status_code, 400)
+        Payment.objects.filter(pk=self.payment.pk).update(download_expires_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.download('png').status_code, 403)
+
+
+class MediaAccessTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(MEDIA_ROOT=root, MEDIA_JOBS_INLINE=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.project = Project.objects.create(title='Paper', description='x')
+        self.project.white_paper.save('paper.pdf', ContentFile(b'%PDF-1.4'))
+        default_storage.save('video.mp4', ContentFile(b'video'))
+
+    def test_public_media_is_served(self):
+        response = self.client.get('/media/video.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'video')
+
+    def test_white_papers_are_not_served_as_media(self):
+        response = self.client.get(f'/media/{self.project.white_paper.name}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_white_paper_needs_an_active_project(self):
+        url = f'/portfolio/{self.project.pk}/white-paper/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Project.objects.filter(pk=self.project.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(MEDIA_JOB_MAX_ATTEMPTS=2, MEDIA_JOB_RETRY_SECONDS=30)
+class MediaJobTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(MEDIA_ROOT=root, MEDIA_JOBS_INLINE=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.project = Project.objects.create(title='Paper', description='x')
+
+    def attach_white_paper(self, content=b'%PDF-1.4 paper'):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.white_paper.save('paper.pdf', ContentFile(content))
+
+    def test_saving_queues_one_job_that_the_worker_runs(self):
+        self.attach_white_paper()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.save()  # Still stale: no second job
+        job = MediaJob.objects.get()
+        self.assertEqual((job.task, job.field_name, job.status), ('file_info', 'white_paper', 'queued'))
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.white_paper_info['size'], len(b'%PDF-1.4 paper'))
+        self.assertEqual(self.project.white_paper_info['source'], self.project.white_paper.name)
+        self.assertEqual(MediaJob.objects.get().status, 'done')
+
+    def test_failures_back_off_then_fail(self):
+        self.attach_white_paper()
+        with mock.patch.dict('main.media_jobs.TASKS', {'file_info': mock.Mock(side_effect=OSError('disk'))}):
+            with self.assertLogs('main.media_jobs', 'ERROR'):
+                run_pending_jobs()
+            job = MediaJob.objects.get()
+            self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, 'disk'))
+            self.assertGreater(job.available_at, timezone.now() + timedelta(seconds=25))
+            self.assertIsNone(claim_job())
+
+            MediaJob.objects.update(available_at=timezone.now())
+            with self.assertLogs('main.media_jobs', 'ERROR'):
+                run_pending_jobs()
+        self.assertEqual(MediaJob.objects.get().status, 'failed')
+
+    @override_settings(MEDIA_JOB_TIMEOUT_SECONDS=60)
+    def test_claimed_jobs_are_claimed_once_until_stalled(self):
+        self.attach_white_paper()
+        job = claim_job()
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_job())
+        self.assertEqual(requeue_stalled_jobs(), 0)
+        MediaJob.objects.update(started_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(requeue_stalled_jobs(), 1)
+        self.assertEqual(claim_job().pk, job.pk)
+
+
+class TechnologyTests(TestCase):
+    def test_get_or_create_many_dedupes_case_insensitively(self):
+        solidity = Technology.objects.create(name='Solidity')
+        techs = Technology.get_or_create_many(['solidity', ' Rust ', 'RUST', '', 'SOLIDITY'])
+        self.assertEqual([tech.name for tech in techs], ['Solidity', 'Rust'])
+        self.assertEqual(techs[0].pk, solidity.pk)
+        self.assertEqual(Technology.objects.count(), 2)
+        self.assertEqual(Technology.objects.get(key='rust').name, 'Rust')
+
+    def test_save_keeps_the_key_normalized(self):
+        tech = Technology.objects.create(name='  Python ')
+        self.assertEqual(tech.key, 'python')
+        tech.name = 'PyThOn'
+        tech.save()
+        self.assertEqual(Technology.objects.get(pk=tech.pk).key, 'python')
+
+    @override_settings(CONTENT_CACHE_SECONDS=0)
+    def test_portfolio_filters_by_tech_case_insensitively(self):
+        tagged = Project.objects.create(title='Vault', description='d')
+        tagged.technologies.set(Technology.get_or_create_many(['Solidity']))
+        Project.objects.create(title='Site', description='d')
+        response = self.client.get('/portfolio/?tech=SOLIDITY')
+        self.assertEqual([project.pk for project in response.context['projects']], [tagged.pk])
+        self.assertEqual(len(self.client.get('/portfolio/').context['projects']), 2)
+
+
+class TechnologyMigrationTests(TransactionTestCase):
+    migrate_from = ('main', '0007_payment_lifecycle_indexes')
+    migrate_to = ('main', '0008_technology')
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def test_comma_separated_technologies_become_tags(self):
+        Project = self.migrate(self.migrate_from).get_model('main', 'Project')
+        first = Project.objects.create(title='A', description='d', technologies='Solidity, React,,')
+        second = Project.objects.create(title='B', description='d', technologies='react, Rust')
+        Project.objects.create(title='C', description='d', technologies='')
+
+        apps = self.migrate(self.migrate_to)
+        Project = apps.get_model('main', 'Project')
+        Technology = apps.get_model('main', 'Technology')
+        self.assertEqual(sorted(Technology.objects.values_list('key', 'name')), [
+            ('react', 'React'), ('rust', 'Rust'), ('solidity', 'Solidity'),
+        ])
+        tags = lambda pk: sorted(Project.objects.get(pk=pk).technologies.values_list('key', flat=True))
+        self.assertEqual(tags(first.pk), ['react', 'solidity'])
+        self.assertEqual(tags(second.pk), ['react', 'rust'])
+
+    def test_split_ignores_blank_entries(self):
+        migration = importlib.import_module('main.migrations.0008_technology')
+        self.assertEqual(migration.split_technologies(' a, ,b ,'), ['a', 'b'])
+        self.assertEqual(migration.split_technologies(None), [])
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTENT_CACHE_SECONDS=0,
+)
+class PortfolioLoadingTests(TestCase):
+    def create_projects(self, count):
+        tech = Technology.get_or_create_many(['Rust'])
+        for i in range(count):
+            Project.objects.create(title=f'Project {i}', description='d' * 1000).technologies.set(tech)
+
+    def queries(self, url):
+        cache.clear()  # Recompute the content version every time
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.create_projects(2)
+        few = self.queries('/portfolio/')
+        self.create_projects(20)
+        self.assertEqual(self.queries('/portfolio/'), few)
+
+    def test_tabs_load_only_titles(self):
+        self.create_projects(2)
+        context = self.client.get('/portfolio/').context
+        self.assertIn('description', context['projects'][1].get_deferred_fields())
+        self.assertEqual(context['selected_project'].pk, context['projects'][0].pk)
+
+    def test_unlisted_project_is_not_selected(self):
+        hidden = Project.objects.create(title='Hidden', description='d', is_active=False)
+        self.create_projects(1)
+        self.assertIsNone(self.client.get(f'/portfolio/?project={hidden.pk}').context['selected_project'])
+        self.assertIsNone(self.client.get('/portfolio/?project=abc').context['selected_project'])
+
+    def test_fragment_renders_one_document(self):
+        project = Project.objects.create(title='Vault', description='Holds deposits')
+        data = self.client.get(f'/api/projects/{project.pk}/fragment/').json()
+        self.assertEqual((data['id'], data['title']), (project.pk, 'Vault'))
+        self.assertIn('Holds deposits', data['html'])
+        project.is_active = False
+        project.save()
+        self.assertEqual(self.client.get(f'/api/projects/{project.pk}/fragment/').status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.vault = Project.objects.create(title='Escrow vault', description='Holds deposits on chain')
+        self.vault.technologies.set(Technology.get_or_create_many(['Solidity']))
+        self.site = Project.objects.create(title='Agency site', description='Marketing pages for an escrow service')
+
+    def ids(self, query):
+        return [project.pk for project in SearchResults(query)[:10]]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.ids('escrow'), [self.vault.pk, self.site.pk])
+        self.assertEqual(SearchResults('escrow').count(), 2)
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.ids('solid'), [self.vault.pk])
+        self.assertEqual(self.ids('escrow market'), [self.site.pk])
+
+    def test_index_follows_retagging_and_deactivation(self):
+        self.site.technologies.set(Technology.get_or_create_many(['Solidity']))
+        self.assertEqual(sorted(self.ids('solidity')), sorted([self.vault.pk, self.site.pk]))
+        self.vault.is_active = False
+        self.vault.save()
+        self.assertEqual(self.ids('solidity'), [self.site.pk])
+
+    def test_operators_in_user_input_are_quoted(self):
+        self.assertEqual(sqlite_match_expression('vault OR "x" -y'), '"vault" "OR" "x" "y"*')
+        self.assertIsNone(sqlite_match_expression('  ---  '))
+        self.assertEqual(self.ids('NEAR('), [])
+
+    def test_search_api_paginates_ranked_results(self):
+        data = self.client.get('/api/projects/search/?q=escrow&page_size=1').json()
+        self.assertEqual((data['total'], data['num_pages']), (2, 2))
+        self.assertEqual([result['id'] for result in data['results']], [self.vault.pk])
+        self.assertEqual(data['results'][0]['technologies'], ['Solidity'])
+        self.assertEqual(self.client.get('/api/projects/search/?q=escrow&page=3').status_code, 404)
+
+
+class KeysetCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor([3, 42])
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor, 2), [3, 42])
+
+    def test_invalid_cursors(self):
+        for cursor in ('not base64!', encode_cursor([1]), encode_cursor(['a', 'b']), encode_cursor({'id': 1}), 'bm90IGpzb24'):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, 2)
+
+    def test_after_key(self):
+        condition = after_key(['order', 'id'], [3, 42])
+        self.assertEqual(
+            str(condition),
+            str(Q(order__gt=3) | Q(order=3, id__gt=42)),
+        )
+
+    def test_parse_fields(self):
+        available = {'id': None, 'title': None}
+        self.assertEqual(parse_fields('', available), ['id', 'title'])
+        self.assertEqual(parse_fields(' title ,id', available), ['title', 'id'])
+        with self.assertRaisesMessage(ValueError, 'Unknown fields: nope'):
+            parse_fields('id,nope', available)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class KeysetPaginationTests(TestCase):
+    def test_pages_follow_the_cursor(self):
+        for i in range(5):
+            Partner.objects.create(name=f'Agent {i}', description='x', order=i % 2)
+        Partner.objects.create(name='Hidden', description='x', is_active=False)
+        seen = []
+        url = '/api/agents/?fields=id&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(b''.join(response.streaming_content))
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        expected = Partner.objects.filter(is_active=True).order_by('order', 'id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get('/api/agents/?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_urls_are_not_api_prefixed(self):
+        agent = Partner.objects.create(name='Agent', description='x')
+        project = Project.objects.create(title='Project', description='x')
+        for url, expected in (
+            ('/api/agents/?fields=url', f'/about/{agent.pk}/'),
+            ('/api/projects/?fields=url', f'/portfolio/{project.pk}/'),
+        ):
+            data = json.loads(b''.join(self.client.get(url).streaming_content))
+            self.assertEqual(data['results'][0]['url'], expected)
+        page = self.client.get('/portfolio/').content.decode()
+        self.assertIn('"/api/projects/0/fragment/"', page)
+        self.assertNotIn('/api/api/', page)
+
+
+@mock.patch('main.routers.replica_configured', return_value=True)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        token = begin_request()
+        self.addCleanup(end_request, token)
+
+    def test_content_reads_go_to_the_replica(self, configured):
+        self.assertEqual(router.db_for_read(Project), 'replica')
+        self.assertEqual(router.db_for_read(Payment), 'default')
+
+    def test_without_a_replica_everything_reads_the_primary(self, configured):
+        configured.return_value = False
+        self.assertEqual(router.db_for_read(Project), 'default')
+
+    def test_writing_content_pins_the_request(self, configured):
+        self.assertEqual(router.db_for_write(Project), 'default')
+        self.assertTrue(wrote_replica_models())
+        self.assertEqual(router.db_for_read(Project), 'default')
+
+    def test_primary_reads_pins_only_its_block(self, configured):
+        with primary_reads():
+            self.assertEqual(router.db_for_read(Project), 'default')
+            router.db_for_write(Partner)
+        self.assertTrue(wrote_replica_models())
+
+    def test_primary_reads_leaves_an_unpinned_request_unpinned(self, configured):
+        with primary_reads():
+            pass
+        self.assertEqual(router.db_for_read(Project), 'replica')
+        self.assertFalse(wrote_replica_models())
+
+
+@mock.patch('main.middleware.replica_configured', return_value=True)
+@mock.patch('main.routers.replica_configured', return_value=True)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def run_request(self, cookies=None, write=False):
+        seen = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Project)
+            seen.append(router.db_for_read(Project))
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaPinningMiddleware(view)(request)
+        return response, seen[0]
+
+    def test_reads_use_the_replica(self, *configured):
+        response, alias = self.run_request()
+        self.assertEqual(alias, 'replica')
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+    def test_writer_gets_the_pin_cookie(self, *configured):
+        response, alias = self.run_request(write=True)
+        self.assertEqual(alias, 'default')
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE]['max-age'], 10)
+
+    def test_pin_cookie_reads_the_primary(self, *configured):
+        _, alias = self.run_request(cookies={PRIMARY_PIN_COOKIE: '1'})
+        self.assertEqual(alias, 'default')
+        # The scope ends with the request
+        self.assertEqual(self.run_request()[1], 'replica')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ContentPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        # Writes made outside a request by earlier tests must not pin these reads
+        token = begin_request()
+        self.addCleanup(end_request, token)
+
+    def test_key_ignores_unknown_and_reordered_params(self):
+        key = lambda url: page_cache_key(self.factory.get(url), 'v1')
+        self.assertEqual(key('/portfolio/?x=1'), key('/portfolio/?x=2'))
+        self.assertEqual(key('/portfolio/?tech=a&project=1'), key('/portfolio/?project=1&tech=a&utm=z'))
+        self.assertNotEqual(key('/portfolio/?tech=a'), key('/portfolio/?tech=b'))
+        self.assertNotEqual(key('/portfolio/'), key('/about/'))
+        self.assertNotEqual(page_cache_key(self.factory.get('/'), 'v1'), page_cache_key(self.factory.get('/'), 'v2'))
+
+    def test_hits_skip_the_view(self):
+        calls = []
+
+        @cache_content_page
+        def view(request):
+            calls.append(request)
+            return HttpResponse('page')
+
+        self.assertEqual(view(self.factory.get('/portfolio/')).content, b'page')
+        self.assertEqual(view(self.factory.get('/portfolio/?x=1')).content, b'page')
+        self.assertEqual(len(calls), 1)
+
+    @mock.patch('main.routers.replica_configured', return_value=True)
+    def test_misses_render_on_the_replica_once_it_caught_up(self, configured):
+        seen = []
+
+        @cache_content_page
+        def view(request):
+            seen.append(router.db_for_read(Project))
+            return HttpResponse('page')
+
+        with mock.patch('main.content_cache.replica_caught_up', return_value=False):
+            view(self.factory.get('/a/'))
+        with mock.patch('main.content_cache.replica_caught_up', return_value=True):
+            view(self.factory.get('/b/'))
+        self.assertEqual(seen, ['default', 'replica'])
+
+    @mock.patch('main.routers.replica_configured', return_value=True)
+    def test_replica_is_compared_by_data_digest(self, configured):
+        with mock.patch('main.content_cache.compute_content_state', return_value=('other', None, 'data')) as compute:
+            self.assertTrue(replica_caught_up(('version', None, 'data')))
+            self.assertFalse(replica_caught_up(('version', None, 'newer')))
+        compute.assert_called_with('replica')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ConditionalContentPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = Project.objects.create(title='Vault', description='d')
+
+    def test_unchanged_content_is_not_modified(self):
+        response = self.client.get('/portfolio/')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            revalidated = self.client.get('/portfolio/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        since = self.client.get('/portfolio/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_edit_changes_the_etag(self):
+        etag = self.client.get('/portfolio/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.title = 'Vault 2'
+            self.project.save()
+        response = self.client.get('/portfolio/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Vault 2')
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[8, 16], IMAGE_VARIANT_FORMATS=['webp', 'jpeg'])
+class ImageVariantTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(location=self.root)
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), (255, 0, 0)).save(buffer, 'PNG')
+        self.storage.save('photo.png', ContentFile(buffer.getvalue()))
+        self.fieldfile = SimpleNamespace(storage=self.storage, name='photo.png')
+
+    def test_manifest_lists_existing_renditions(self):
+        manifest = generate_variants(self.fieldfile)
+        self.assertEqual((manifest['source'], manifest['width'], manifest['height']), ('photo.png', 20, 10))
+        self.assertEqual([width for width, _ in manifest['variants']['jpeg']], [8, 16])
+        for name in variant_names(manifest):
+            self.assertTrue(self.storage.exists(name))
+        with Image.open(self.storage.open(manifest['variants']['webp'][0][1])) as image:
+            self.assertEqual(image.size, (8, 4))
+
+    def test_name_taken_after_the_check_is_not_recorded(self):
+        digest = generate_variants(self.fieldfile)['digest']
+        exists = self.storage.exists
+        checked = set()
+
+        def exists_once_missing(name):
+            # Another job writes each rendition between exists() and save()
+            if name.endswith(('w.webp', 'w.jpg')) and name not in checked:
+                checked.add(name)
+                return False
+            return exists(name)
+
+        with mock.patch.object(self.storage, 'exists', side_effect=exists_once_missing):
+            manifest = generate_variants(self.fieldfile)
+        target = variant_name('photo.png', digest, 8, 'webp')
+        recorded = manifest['variants']['webp'][0][1]
+        self.assertNotEqual(recorded, target)
+        self.assertTrue(self.storage.exists(recorded))
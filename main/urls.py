@@ -1,25 +1,42 @@
 """
 URL configuration for main app
 """
+from django.conf import settings
 from django.urls import path
 from . import views
 from . import api_views
+from . import content_api_views
+from . import file_views
+
+if settings.ASYNC_PAYMENT_VIEWS:
+    from . import async_api_views as payment_views
+else:
+    payment_views = api_views
 
 app_name = 'main'
 
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     path('portfolio/', views.PortfolioView.as_view(), name='portfolio'),
+    path('portfolio/search/', views.ProjectSearchView.as_view(), name='project_search'),
     path('portfolio/<int:pk>/', views.ProjectDetailView.as_view(), name='project_detail'),
+    path('portfolio/<int:pk>/white-paper/', file_views.white_paper, name='white_paper'),
     path('about/', views.AboutView.as_view(), name='about'),
     path('about/<int:pk>/', views.AgentDetailView.as_view(), name='agent_detail'),
     path('contact/', views.ContactView.as_view(), name='contact'),
     path('payment/', views.PaymentView.as_view(), name='payment'),
     
+    # API endpoints for portfolio content
+    path('api/projects/', content_api_views.project_list, name='project_list'),
+    path('api/agents/', content_api_views.agent_list, name='agent_list'),
+    path('api/projects/search/', content_api_views.search_projects, name='search_projects'),
+    path('api/projects/<int:pk>/fragment/', content_api_views.project_fragment, name='project_fragment'),
+    
     # API endpoints for Web3 payments
-    path('api/payment/info/', api_views.get_payment_info, name='payment_info'),
-    path('api/payment/verify/', api_views.verify_payment, name='verify_payment'),
+    path('api/payment/info/', payment_views.get_payment_info, name='payment_info'),
+    path('api/payment/verify/', payment_views.verify_payment, name='verify_payment'),
+    path('api/payment/status/<str:tx_hash>/stream/', payment_views.payment_status_stream, name='payment_status_stream'),
     path('api/payment/fiat/', api_views.process_fiat_payment, name='fiat_payment'),
-    path('api/download/<str:token>/', api_views.download_business_card, name='download_card'),
+    path('api/download/<str:token>/', payment_views.download_business_card, name='download_card'),
 ]
 
@@ -1,8 +1,11 @@
 """
 Views for main app
 """
+from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView, ListView, DetailView
-from .models import Project, Partner
+from .content_cache import cache_content_page, conditional_content_page
+from .models import Project, Partner, Technology
+from .search import SearchResults
 
 
 class HomeView(TemplateView):
@@ -10,6 +13,7 @@ class HomeView(TemplateView):
     template_name = 'main/home.html'
 
 
+@method_decorator([conditional_content_page, cache_content_page], name='dispatch')
 class PortfolioView(ListView):
     """Portfolio page - FBI dossier view with tabs"""
     model = Project
@@ -17,37 +21,74 @@ class PortfolioView(ListView):
     context_object_name = 'projects'
     
     def get_queryset(self):
-        return Project.objects.filter(is_active=True).order_by('id')
+        # Tabs only need id and title; the selected project's body is loaded separately
+        queryset = Project.objects.filter(is_active=True).only('id', 'title').order_by('id')
+        
+        # Filter by technology (?tech=Solidity) through the indexed tag lookup
+        tech = self.request.GET.get('tech', '').strip()
+        if tech:
+            queryset = queryset.filter(technologies__key=Technology.normalize(tech))
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        projects = context.get('projects', self.get_queryset())
+        projects = list(context['projects'])
+        context['selected_tech'] = self.request.GET.get('tech', '').strip()
         
-        # Get selected project ID from URL parameter
+        # Get selected project ID from URL parameter, limited to the listed tabs
+        tab_ids = [project.id for project in projects]
         selected_id = self.request.GET.get('project', None)
         
         if selected_id:
             try:
                 selected_id = int(selected_id)
-                selected_project = projects.filter(pk=selected_id).first()
             except (ValueError, TypeError):
-                selected_project = None
+                selected_id = None
+            if selected_id not in tab_ids:
+                selected_id = None
         else:
             # Default to first project if none selected
-            selected_project = projects.first() if projects else None
+            selected_id = tab_ids[0] if tab_ids else None
         
-        context['selected_project'] = selected_project
+        context['selected_project'] = get_project_document(selected_id) if selected_id else None
         context['projects'] = projects
         return context
 
 
+def get_project_document(pk):
+    """Load one active project with everything its dossier document renders, or None"""
+    return (
+        Project.objects.filter(is_active=True, pk=pk)
+        .prefetch_related('technologies', 'images')
+        .first()
+    )
+
+
+class ProjectSearchView(ListView):
+    """Portfolio search - ranked full-text matches, paginated"""
+    template_name = 'main/search.html'
+    context_object_name = 'results'
+    paginate_by = 10
+    
+    def get_queryset(self):
+        return SearchResults(self.request.GET.get('q', ''))
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '').strip()
+        return context
+
+
+@method_decorator([conditional_content_page, cache_content_page], name='dispatch')
 class ProjectDetailView(DetailView):
     """Project detail view"""
     model = Project
     template_name = 'main/project_detail.html'
     context_object_name = 'project'
+    queryset = Project.objects.prefetch_related('technologies', 'images')
 
 
+@method_decorator([conditional_content_page, cache_content_page], name='dispatch')
 class AboutView(ListView):
     """About page - agent dossier view with 3 profiles"""
     model = Partner
@@ -59,13 +100,14 @@ class AboutView(ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Get up to 3 active agents
-        agents = Partner.objects.filter(is_active=True).order_by('order', 'name')[:3]
-        context['agents'] = list(agents)
-        context['agents_count'] = agents.count()
+        # Up to 3 active agents, from the one get_queryset() query
+        agents = list(context['agents'])
+        context['agents'] = agents
+        context['agents_count'] = len(agents)
         return context
 
 
+@method_decorator([conditional_content_page, cache_content_page], name='dispatch')
 class AgentDetailView(DetailView):
     """Agent detail view"""
     model = Partner
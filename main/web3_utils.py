@@ -2,24 +2,457 @@
 Web3 utilities for blockchain transaction verification
 """
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from decimal import Decimal
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 from web3 import Web3
-from web3.exceptions import TransactionNotFound, BlockNotFound
 
 logger = logging.getLogger(__name__)
 
-def get_web3_connection():
-    """Get Web3 connection to blockchain"""
-    try:
-        w3 = Web3(Web3.HTTPProvider(settings.RPC_URL))
-        if not w3.is_connected():
-            logger.error(f"Failed to connect to RPC: {settings.RPC_URL}")
+
+class LRUCache:
+    """Small thread-safe least-recently-used cache"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Process-wide registry of pooled clients, keyed by RPC URL
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Receipts and transactions past the finality depth never change:
+# tx hash -> (receipt, transaction) as raw JSON-RPC objects
+_finalized_transactions = LRUCache(settings.TX_CACHE_SIZE)
+
+# Endpoint routing across RPC_URLS (see RPCPool)
+_rpc_pool = None
+_rpc_pool_lock = threading.Lock()
+LATENCY_WINDOW = 200  # Latency samples kept per endpoint
+MIN_LATENCY_SAMPLES = 20  # Samples needed before an endpoint's percentiles are trusted
+ERROR_RATE_WEIGHT = 0.1  # Weight of the latest request in an endpoint's error rate
+MAX_ENDPOINT_COOLDOWN = 300  # Upper bound on how long a failing endpoint is skipped
+# Threads sending the first attempt of hedged requests. One per concurrent
+# caller, so first attempts never queue; threads only start as needed.
+MAX_HEDGED_REQUESTS = 128
+
+# Chain head shared by all threads: (block_number, expires_at)
+BLOCK_NUMBER_CACHE_KEY = 'web3:block_number'
+_block_number = (None, 0.0)
+_block_number_lock = threading.Lock()
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider that sends every request through one shared keep-alive session"""
+
+    def __init__(self, endpoint_uri, session, request_kwargs=None):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.session = session
+        self.last_success = 0.0
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        response = self.session.post(self.endpoint_uri, data=request_data, **self.get_request_kwargs())
+        response.raise_for_status()
+        self.last_success = time.monotonic()
+        return self.decode_rpc_response(response.content)
+
+
+class Web3Client:
+    """Web3 instance bound to one RPC endpoint, shared by all threads in the process"""
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.RPC_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.provider = PooledHTTPProvider(
+            rpc_url, self.session, request_kwargs={'timeout': settings.RPC_TIMEOUT}
+        )
+        self.w3 = Web3(self.provider)
+
+    def is_healthy(self):
+        """Check connectivity, skipping the round trip if a request succeeded recently"""
+        if time.monotonic() - self.provider.last_success < settings.RPC_HEALTH_CHECK_INTERVAL:
+            return True
+        return self.w3.is_connected()
+
+    def batch_request(self, calls):
+        """
+        Send several JSON-RPC calls in one HTTP request
+        
+        Args:
+            calls: list of (method, params) tuples
+            
+        Returns:
+            list of raw JSON-RPC response dicts, in the same order as calls
+        """
+        payload = batch_payload(calls)
+        response = self.session.post(
+            self.rpc_url, json=payload, timeout=settings.RPC_TIMEOUT
+        )
+        response.raise_for_status()
+        body = response.json()
+        if not isinstance(body, list):
+            # Some providers reject batches outright; fall back to one call per request
+            logger.warning(f"RPC endpoint {self.rpc_url} does not accept batch requests")
+            body = [
+                self.session.post(self.rpc_url, json=item, timeout=settings.RPC_TIMEOUT).json()
+                for item in payload
+            ]
+        self.provider.last_success = time.monotonic()
+        return order_batch_responses(body, len(calls))
+
+    def close(self):
+        self.session.close()
+
+
+def get_web3_client(rpc_url=None):
+    """Get (or lazily create) the pooled client for an RPC endpoint"""
+    rpc_url = rpc_url or settings.RPC_URL
+    client = _clients.get(rpc_url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(rpc_url)
+            if client is None:
+                client = Web3Client(rpc_url)
+                _clients[rpc_url] = client
+    return client
+
+
+def reset_web3_connection(rpc_url=None):
+    """Drop the pooled client so the next call reconnects with a fresh session"""
+    rpc_url = rpc_url or settings.RPC_URL
+    with _clients_lock:
+        client = _clients.pop(rpc_url, None)
+    if client:
+        client.close()
+
+
+class EndpointStats:
+    """Latency samples and error score for one RPC endpoint, used to rank it"""
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.error_rate = 0.0  # Exponentially weighted share of failed requests
+        self.failures = 0  # Consecutive failures
+        self.skip_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+            self.error_rate *= 1 - ERROR_RATE_WEIGHT
+            self.failures = 0
+            self.skip_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self.error_rate = self.error_rate * (1 - ERROR_RATE_WEIGHT) + ERROR_RATE_WEIGHT
+            self.failures += 1
+            cooldown = min(settings.RPC_ENDPOINT_COOLDOWN * self.failures, MAX_ENDPOINT_COOLDOWN)
+            self.skip_until = time.monotonic() + cooldown
+
+    def percentile(self, q):
+        """Latency percentile in seconds, or None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
             return None
-        return w3
-    except Exception as e:
-        logger.error(f"Error connecting to Web3: {str(e)}")
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def is_available(self):
+        return time.monotonic() >= self.skip_until
+
+    def score(self):
+        """Expected cost of a request here: median latency inflated by the error rate (lower is better)"""
+        median = self.percentile(0.5) or 0.0
+        return median * (1 + 10 * self.error_rate) + self.error_rate
+
+
+class RPCPool:
+    """
+    Routes JSON-RPC batches across the endpoints in RPC_URLS
+    
+    Endpoints are tried best score first. One that errors is skipped for a
+    cooldown and the request fails over to the next. With RPC_HEDGE_REQUESTS,
+    a request still unanswered after the endpoint's p95 latency is also sent
+    to the next endpoint, and whichever answers first wins.
+    """
+
+    def __init__(self, rpc_urls):
+        self.endpoints = [EndpointStats(rpc_url) for rpc_url in rpc_urls]
+        self._executors = {}
+        self._executor_lock = threading.Lock()
+
+    def ranked(self):
+        """Endpoints in the order to try them; ones cooling down come last, as a last resort"""
+        available, cooling = [], []
+        for endpoint in self.endpoints:
+            (available if endpoint.is_available() else cooling).append(endpoint)
+        return sorted(available, key=EndpointStats.score) + sorted(cooling, key=lambda endpoint: endpoint.skip_until)
+
+    def send(self, endpoint, calls):
+        """Send a batch to one endpoint, recording its latency or failure"""
+        started = time.monotonic()
+        try:
+            responses = get_web3_client(endpoint.rpc_url).batch_request(calls)
+        except Exception as e:
+            endpoint.record_failure()
+            if isinstance(e, requests.exceptions.RequestException):
+                reset_web3_connection(endpoint.rpc_url)
+            raise
+        endpoint.record_success(time.monotonic() - started)
+        return responses
+
+    def batch_request(self, calls):
+        """Send a batch to the best endpoint, failing over (or hedging) as needed"""
+        endpoints = self.ranked()
+        if settings.RPC_HEDGE_REQUESTS and len(endpoints) > 1:
+            return self._hedged_request(endpoints, calls)
+        
+        error = None
+        for endpoint in endpoints:
+            try:
+                return self.send(endpoint, calls)
+            except Exception as e:
+                logger.warning(f"RPC endpoint {endpoint.rpc_url} failed: {str(e)}")
+                error = e
+        raise error
+
+    def _hedged_request(self, endpoints, calls):
+        # First attempts and hedges use separate pools: a hedge must not wait
+        # behind other callers' first attempts, or its p95 timer fires before
+        # anything was sent and the hedge queues up as well
+        first_attempts = self._get_executor('rpc-first', MAX_HEDGED_REQUESTS)
+        hedges = self._get_executor('rpc-hedge', settings.RPC_POOL_SIZE)
+        remaining = list(endpoints)
+        in_flight = {}
+        error = None
+
+        def launch(executor):
+            endpoint = remaining.pop(0)
+            in_flight[executor.submit(self.send, endpoint, calls)] = endpoint
+            # No hedging until the endpoint has enough samples for a p95
+            return endpoint.percentile(0.95)
+
+        hedge_after = launch(first_attempts)
+        while in_flight:
+            done, _ = wait(in_flight, timeout=hedge_after if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than usual: race the next endpoint against it. The
+                # loser still finishes in the background and is scored.
+                hedge_after = launch(hedges)
+                continue
+            for future in done:
+                endpoint = in_flight.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    logger.warning(f"RPC endpoint {endpoint.rpc_url} failed: {str(e)}")
+                    error = e
+            if remaining:
+                hedge_after = launch(hedges)
+        raise error
+
+    def _get_executor(self, name, max_workers):
+        executor = self._executors.get(name)
+        if executor is None:
+            with self._executor_lock:
+                executor = self._executors.get(name)
+                if executor is None:
+                    executor = self._executors[name] = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix=name
+                    )
+        return executor
+
+
+def get_rpc_pool():
+    """Get the process-wide router for RPC_URLS"""
+    global _rpc_pool
+    if _rpc_pool is None:
+        with _rpc_pool_lock:
+            if _rpc_pool is None:
+                _rpc_pool = RPCPool(settings.RPC_URLS)
+    return _rpc_pool
+
+
+def reset_web3_state():
+    """Drop pooled clients, endpoint stats and in-process caches, e.g. after RPC settings change"""
+    global _rpc_pool, _block_number
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+    with _rpc_pool_lock:
+        _rpc_pool = None
+    _block_number = (None, 0.0)
+    _finalized_transactions.clear()
+
+
+def batch_payload(calls):
+    """Build a JSON-RPC batch from (method, params) tuples, using list positions as ids"""
+    return [
+        {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+        for i, (method, params) in enumerate(calls)
+    ]
+
+
+def order_batch_responses(body, count):
+    """Put batch responses (which may arrive in any order) back into call order"""
+    by_id = {item.get('id'): item for item in body}
+    return [by_id.get(i, {'error': {'message': 'Missing response'}}) for i in range(count)]
+
+
+def rpc_batch(calls, rpc_url=None):
+    """Send (method, params) calls as one batched JSON-RPC request, routed by RPCPool unless rpc_url is given"""
+    if rpc_url:
+        return get_web3_client(rpc_url).batch_request(calls)
+    return get_rpc_pool().batch_request(calls)
+
+
+def rpc_result(response):
+    """Unwrap a raw JSON-RPC response, raising ValueError on an RPC error"""
+    if 'error' in response:
+        raise ValueError(response['error'].get('message', 'RPC error'))
+    return response.get('result')
+
+
+def get_web3_connection():
+    """Get pooled Web3 connection to the best healthy RPC endpoint"""
+    for endpoint in get_rpc_pool().ranked():
+        try:
+            client = get_web3_client(endpoint.rpc_url)
+            if client.is_healthy():
+                return client.w3
+            logger.error(f"Failed to connect to RPC: {endpoint.rpc_url}")
+        except Exception as e:
+            logger.error(f"Error connecting to Web3: {str(e)}")
+        endpoint.record_failure()
+        reset_web3_connection(endpoint.rpc_url)
+    return None
+
+
+def get_cached_block_number():
+    """
+    Get the chain head from the in-process or shared cache, without an RPC
+    
+    Returns None when nothing has been fetched within BLOCK_TIME_SECONDS.
+    """
+    global _block_number
+    block_number, expires_at = _block_number
+    now = time.time()
+    if expires_at > now:
+        return block_number
+    
+    cached = cache.get(BLOCK_NUMBER_CACHE_KEY)
+    if cached is None:
+        return None
+    block_number, fetched_at = cached
+    expires_at = fetched_at + settings.BLOCK_TIME_SECONDS
+    if expires_at <= now:
         return None
+    _block_number = (block_number, expires_at)
+    return block_number
+
+
+def set_cached_block_number(block_number):
+    """Publish a freshly fetched chain head to this process and the shared cache"""
+    global _block_number
+    fetched_at = time.time()
+    _block_number = (block_number, fetched_at + settings.BLOCK_TIME_SECONDS)
+    cache.set(BLOCK_NUMBER_CACHE_KEY, (block_number, fetched_at), timeout=settings.BLOCK_TIME_SECONDS)
+
+
+def get_block_number():
+    """Get the current block number, fetched over RPC at most once per block interval"""
+    block_number = get_cached_block_number()
+    if block_number is not None:
+        return block_number
+    
+    with _block_number_lock:
+        # Another thread may have refreshed it while we waited for the lock
+        block_number = get_cached_block_number()
+        if block_number is None:
+            block_number = _hex_to_int(rpc_result(rpc_batch([('eth_blockNumber', [])])[0]))
+            set_cached_block_number(block_number)
+    return block_number
+
+
+def get_finalized_transactions(transaction_hashes):
+    """
+    Look up finalized transactions in memory, then (if TX_CACHE_PERSIST) in the database
+    
+    Returns:
+        dict mapping each cached transaction hash to (receipt, transaction)
+    """
+    found = {}
+    missing = []
+    for tx_hash in transaction_hashes:
+        entry = _finalized_transactions.get(tx_hash.lower())
+        if entry is not None:
+            found[tx_hash] = entry
+        else:
+            missing.append(tx_hash)
+    
+    if missing and settings.TX_CACHE_PERSIST:
+        from .models import FinalizedTransaction
+        
+        by_hash = {tx_hash.lower(): tx_hash for tx_hash in missing}
+        for row in FinalizedTransaction.objects.filter(transaction_hash__in=list(by_hash)):
+            entry = (row.receipt, row.transaction)
+            _finalized_transactions.set(row.transaction_hash, entry)
+            found[by_hash[row.transaction_hash]] = entry
+    
+    return found
+
+
+def store_finalized_transactions(entries):
+    """Remember (receipt, transaction) pairs, keyed by tx hash, that are past the finality depth"""
+    for tx_hash, entry in entries.items():
+        _finalized_transactions.set(tx_hash.lower(), entry)
+    
+    if entries and settings.TX_CACHE_PERSIST:
+        from .models import FinalizedTransaction
+        
+        FinalizedTransaction.objects.bulk_create([
+            FinalizedTransaction(
+                transaction_hash=tx_hash.lower(),
+                block_number=_hex_to_int(receipt['blockNumber']),
+                receipt=receipt,
+                transaction=tx,
+            )
+            for tx_hash, (receipt, tx) in entries.items()
+        ], ignore_conflicts=True)
 
 
 def wei_to_eth(wei_amount):
@@ -32,97 +465,209 @@ def eth_to_wei(eth_amount):
     return Web3.to_wei(eth_amount, 'ether')
 
 
-def verify_transaction(transaction_hash, expected_to_address, expected_amount_eth):
+def _hex_to_int(value):
+    """Decode a JSON-RPC quantity (hex string) to int"""
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def failed_result(error, final=False, rpc_error=False):
+    """Build an invalid verify_transaction() result"""
+    result = {
+        'valid': False,
+        'confirmations': 0,
+        'error': error
+    }
+    if final:
+        # The transaction is mined but can never satisfy this payment
+        result['failed'] = True
+    if rpc_error:
+        # Nothing was learned about the transaction; callers may retry later
+        result['rpc_error'] = True
+    return result
+
+
+def evaluate_transaction(receipt, tx, current_block, expected_to_address, expected_amount_eth):
     """
-    Verify a blockchain transaction
-    
-    Args:
-        transaction_hash: The transaction hash to verify
-        expected_to_address: The expected recipient address
-        expected_amount_eth: The expected amount in ETH
-        
+    Check raw JSON-RPC receipt/transaction objects against the expected payment
+
     Returns:
-        dict with 'valid', 'confirmations', 'error' keys
+        dict with 'valid', 'confirmations', 'error' keys, plus 'failed' when
+        the transaction can never become valid
     """
-    w3 = get_web3_connection()
-    if not w3:
-        return {
-            'valid': False,
-            'confirmations': 0,
-            'error': 'Failed to connect to blockchain'
-        }
+    if receipt is None or tx is None:
+        return failed_result('Transaction not found')
     
-    try:
-        # Get transaction receipt
-        try:
-            tx_receipt = w3.eth.get_transaction_receipt(transaction_hash)
-        except TransactionNotFound:
-            return {
-                'valid': False,
-                'confirmations': 0,
-                'error': 'Transaction not found'
-            }
-        
-        # Check if transaction succeeded
-        if tx_receipt.status != 1:
-            return {
-                'valid': False,
-                'confirmations': 0,
-                'error': 'Transaction failed'
-            }
-        
-        # Get transaction details
-        tx = w3.eth.get_transaction(transaction_hash)
-        
-        # Verify recipient address (case-insensitive)
-        tx_to = tx.to
-        if tx_to and tx_to.lower() != expected_to_address.lower():
-            return {
-                'valid': False,
-                'confirmations': 0,
-                'error': f'Recipient address mismatch. Expected {expected_to_address}, got {tx_to}'
-            }
-        
-        # Verify amount (allow small tolerance for gas)
-        tx_value_eth = float(wei_to_eth(tx.value))
-        expected_amount_float = float(expected_amount_eth)
-        tolerance = 0.0001  # Allow 0.0001 ETH tolerance
+    # Check if transaction succeeded
+    if _hex_to_int(receipt['status']) != 1:
+        return failed_result('Transaction failed', final=True)
+    
+    # Verify recipient address (case-insensitive)
+    tx_to = Web3.to_checksum_address(tx['to']) if tx.get('to') else None
+    if tx_to and tx_to.lower() != expected_to_address.lower():
+        return failed_result(f'Recipient address mismatch. Expected {expected_to_address}, got {tx_to}', final=True)
+    
+    # Verify amount (allow small tolerance for gas)
+    tx_value = _hex_to_int(tx['value'])
+    tx_value_eth = float(wei_to_eth(tx_value))
+    expected_amount_float = float(expected_amount_eth)
+    tolerance = 0.0001  # Allow 0.0001 ETH tolerance
+    
+    if abs(tx_value_eth - expected_amount_float) > tolerance:
+        return failed_result(f'Amount mismatch. Expected {expected_amount_eth} ETH, got {tx_value_eth} ETH', final=True)
+    
+    # Calculate confirmations
+    block_number = _hex_to_int(receipt['blockNumber'])
+    confirmations = max(0, current_block - block_number)
+    
+    # Check if we have enough confirmations
+    required_confirmations = 3
+    has_enough_confirmations = confirmations >= required_confirmations
+    
+    return {
+        'valid': has_enough_confirmations,
+        'confirmations': confirmations,
+        'block_number': block_number,
+        'from_address': Web3.to_checksum_address(tx['from']),
+        'to_address': str(tx_to),
+        'amount_wei': tx_value,
+        'amount_eth': tx_value_eth,
+        'error': None if has_enough_confirmations else f'Waiting for confirmations ({confirmations}/{required_confirmations})'
+    }
+
+
+class ChunkVerification:
+    """
+    Lookups and checks for one batch of transaction hashes, independent of transport
+    
+    Building one works out which JSON-RPC calls are still needed (finalized
+    transactions and a fresh cached head need none); complete() then turns
+    the batch responses into verify_transaction() results.
+    """
+
+    def __init__(self, transaction_hashes, expected_to_address, expected_amount_eth):
+        self.transaction_hashes = transaction_hashes
+        self.expected_to_address = expected_to_address
+        self.expected_amount_eth = expected_amount_eth
         
-        if abs(tx_value_eth - expected_amount_float) > tolerance:
-            return {
-                'valid': False,
-                'confirmations': 0,
-                'error': f'Amount mismatch. Expected {expected_amount_eth} ETH, got {tx_value_eth} ETH'
-            }
+        # Finalized transactions only need the chain head; the rest are fetched
+        self.fetched = get_finalized_transactions(transaction_hashes)
+        self.to_fetch = [tx_hash for tx_hash in transaction_hashes if tx_hash not in self.fetched]
         
-        # Get current block number
-        current_block = w3.eth.block_number
+        # Only ask for the chain head when the block cache has gone stale
+        self.current_block = get_cached_block_number()
+        self.calls = [] if self.current_block is not None else [('eth_blockNumber', [])]
+        self.offset = len(self.calls)
+        for tx_hash in self.to_fetch:
+            self.calls.append(('eth_getTransactionReceipt', [tx_hash]))
+            self.calls.append(('eth_getTransactionByHash', [tx_hash]))
+
+    def failed(self, error):
+        """Results for every hash when the batch itself could not be sent"""
+        logger.error(f"Error verifying transactions {self.transaction_hashes}: {str(error)}")
+        return {
+            tx_hash: failed_result(f'Error verifying transaction: {str(error)}', rpc_error=True)
+            for tx_hash in self.transaction_hashes
+        }
+
+    def complete(self, responses):
+        """Evaluate every hash against the batch responses"""
+        results = {}
+        current_block = self.current_block
+        if current_block is None:
+            try:
+                current_block = _hex_to_int(rpc_result(responses[0]))
+            except Exception as e:
+                return self.failed(e)
+            set_cached_block_number(current_block)
         
-        # Calculate confirmations
-        confirmations = current_block - tx_receipt.blockNumber
+        fetched = dict(self.fetched)
+        finalized = {}
+        for j, tx_hash in enumerate(self.to_fetch):
+            try:
+                receipt = rpc_result(responses[self.offset + 2 * j])
+                tx = rpc_result(responses[self.offset + 2 * j + 1])
+            except Exception as e:
+                # A JSON-RPC error for this lookup (rate limit, node error): nothing learned
+                logger.error(f"Error verifying transaction {tx_hash}: {str(e)}")
+                results[tx_hash] = failed_result(f'Error verifying transaction: {str(e)}', rpc_error=True)
+                continue
+            fetched[tx_hash] = (receipt, tx)
+            if receipt and tx and current_block - _hex_to_int(receipt['blockNumber']) >= settings.TX_FINALITY_DEPTH:
+                finalized[tx_hash] = (receipt, tx)
         
-        # Check if we have enough confirmations
-        required_confirmations = 3
-        has_enough_confirmations = confirmations >= required_confirmations
+        for tx_hash, (receipt, tx) in fetched.items():
+            try:
+                results[tx_hash] = evaluate_transaction(
+                    receipt, tx, current_block, self.expected_to_address, self.expected_amount_eth
+                )
+            except Exception as e:
+                logger.error(f"Error verifying transaction {tx_hash}: {str(e)}")
+                results[tx_hash] = failed_result(f'Error verifying transaction: {str(e)}')
         
+        try:
+            store_finalized_transactions(finalized)
+        except Exception as e:
+            logger.error(f"Error caching finalized transactions: {str(e)}")
+        return results
+
+
+def verification_chunks(transaction_hashes):
+    """Split unique transaction hashes into groups that fit in one RPC batch"""
+    transaction_hashes = list(dict.fromkeys(transaction_hashes))
+    chunk_size = max(1, (settings.RPC_BATCH_SIZE - 1) // 2)
+    return [transaction_hashes[i:i + chunk_size] for i in range(0, len(transaction_hashes), chunk_size)]
+
+
+def verify_transactions(transaction_hashes, expected_to_address, expected_amount_eth):
+    """
+    Verify many blockchain transactions with batched JSON-RPC requests
+    
+    Each HTTP request carries the receipt and transaction lookups for up to
+    RPC_BATCH_SIZE calls, plus a single eth_blockNumber when the block
+    cache is stale. Transactions past TX_FINALITY_DEPTH are served from the
+    finalized-transaction cache without any lookups.
+    
+    Returns:
+        dict mapping each transaction hash to a verify_transaction() result
+    """
+    results = {}
+    chunks = verification_chunks(transaction_hashes)
+    if not chunks:
+        return results
+    
+    w3 = get_web3_connection()
+    if not w3:
         return {
-            'valid': has_enough_confirmations,
-            'confirmations': confirmations,
-            'block_number': tx_receipt.blockNumber,
-            'from_address': tx['from'],
-            'to_address': str(tx_to),
-            'amount_wei': tx.value,
-            'amount_eth': tx_value_eth,
-            'error': None if has_enough_confirmations else f'Waiting for confirmations ({confirmations}/{required_confirmations})'
+            tx_hash: failed_result('Failed to connect to blockchain', rpc_error=True)
+            for chunk in chunks for tx_hash in chunk
         }
+    
+    for chunk in chunks:
+        batch = ChunkVerification(chunk, expected_to_address, expected_amount_eth)
+        try:
+            responses = rpc_batch(batch.calls) if batch.calls else []
+        except Exception as e:
+            # Every endpoint failed; RPCPool has already reset their clients
+            results.update(batch.failed(e))
+            continue
+        results.update(batch.complete(responses))
+    
+    return results
+
+
+def verify_transaction(transaction_hash, expected_to_address, expected_amount_eth):
+    """
+    Verify a blockchain transaction in a single batched round trip
+    
+    Args:
+        transaction_hash: The transaction hash to verify
+        expected_to_address: The expected recipient address
+        expected_amount_eth: The expected amount in ETH
         
-    except Exception as e:
-        logger.error(f"Error verifying transaction {transaction_hash}: {str(e)}")
-        return {
-            'valid': False,
-            'confirmations': 0,
-            'error': f'Error verifying transaction: {str(e)}'
-        }
+    Returns:
+        dict with 'valid', 'confirmations', 'error' keys
+    """
+    return verify_transactions([transaction_hash], expected_to_address, expected_amount_eth)[transaction_hash]
 
 
 def get_transaction_confirmations(transaction_hash):
@@ -132,10 +677,16 @@ def get_transaction_confirmations(transaction_hash):
         return 0
     
     try:
-        tx_receipt = w3.eth.get_transaction_receipt(transaction_hash)
-        current_block = w3.eth.block_number
-        return current_block - tx_receipt.blockNumber
+        current_block = get_cached_block_number()
+        calls = [('eth_getTransactionReceipt', [transaction_hash])]
+        if current_block is None:
+            calls.append(('eth_blockNumber', []))
+        responses = rpc_batch(calls)
+        tx_receipt = rpc_result(responses[0])
+        if current_block is None:
+            current_block = _hex_to_int(rpc_result(responses[1]))
+            set_cached_block_number(current_block)
+        return max(0, current_block - _hex_to_int(tx_receipt['blockNumber']))
     except Exception as e:
         logger.error(f"Error getting confirmations for {transaction_hash}: {str(e)}")
         return 0
-
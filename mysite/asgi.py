@@ -3,6 +3,9 @@ ASGI config for mysite project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Set ASYNC_PAYMENT_VIEWS=True to serve the payment APIs with native async
+views, e.g. ``uvicorn mysite.asgi:application``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
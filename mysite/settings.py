@@ -54,6 +54,8 @@ def get_env(key, default=None, cast=None):
         else:
             return config(key, default=default)
     value = os.getenv(key, default)
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
     if cast and value:
         return cast(value)
     return value
@@ -68,6 +70,29 @@ CHAIN_ID = int(get_env('CHAIN_ID', 1))  # 1 for Ethereum mainnet, 5 for Goerli t
 PAYMENT_AMOUNT_ETH = float(get_env('PAYMENT_AMOUNT_ETH', 0.02))  # Default 0.02 ETH
 PAYMENT_EXPIRY_HOURS = int(get_env('PAYMENT_EXPIRY_HOURS', 24))  # Download link valid for 24 hours
 
+# RPC client pool
+RPC_TIMEOUT = int(get_env('RPC_TIMEOUT', 10))  # Seconds before an RPC request is abandoned
+RPC_POOL_SIZE = int(get_env('RPC_POOL_SIZE', 10))  # Keep-alive connections per RPC endpoint
+RPC_HEALTH_CHECK_INTERVAL = int(get_env('RPC_HEALTH_CHECK_INTERVAL', 60))  # Seconds between lazy is_connected() checks
+RPC_BATCH_SIZE = int(get_env('RPC_BATCH_SIZE', 100))  # Max JSON-RPC calls per batched HTTP request
+RPC_URLS = [url.strip() for url in get_env('RPC_URLS', RPC_URL).split(',') if url.strip()]  # Comma-separated endpoints to route between (defaults to RPC_URL)
+RPC_ENDPOINT_COOLDOWN = int(get_env('RPC_ENDPOINT_COOLDOWN', 30))  # Seconds a failing endpoint is skipped (grows with repeated failures)
+RPC_HEDGE_REQUESTS = get_env('RPC_HEDGE_REQUESTS', False, cast=bool)  # Also ask the next endpoint when the first is slower than its p95
+BLOCK_TIME_SECONDS = int(get_env('BLOCK_TIME_SECONDS', 12))  # Chain head is re-fetched at most this often
+TX_FINALITY_DEPTH = int(get_env('TX_FINALITY_DEPTH', 12))  # Confirmations after which a receipt is treated as immutable
+TX_CACHE_SIZE = int(get_env('TX_CACHE_SIZE', 1024))  # Finalized transactions kept in memory per process
+TX_CACHE_PERSIST = get_env('TX_CACHE_PERSIST', False, cast=bool)  # Also store finalized transactions in the database
+
+# Background payment tracker (python manage.py track_payments)
+PAYMENT_TRACKER_POLL_SECONDS = int(get_env('PAYMENT_TRACKER_POLL_SECONDS', 4))  # How often to check for a new block
+PAYMENT_PENDING_TIMEOUT_HOURS = int(get_env('PAYMENT_PENDING_TIMEOUT_HOURS', 2))  # Unmined payments expire after this long
+PAYMENT_UNVERIFIED_EXPIRY_HOURS = int(get_env('PAYMENT_UNVERIFIED_EXPIRY_HOURS', 24))  # Stale payments expire unchecked after this long if the RPC stays down
+PAYMENT_STREAM_TIMEOUT_SECONDS = int(get_env('PAYMENT_STREAM_TIMEOUT_SECONDS', 300))  # Max lifetime of a status event stream
+PAYMENT_LONG_POLL_SECONDS = int(get_env('PAYMENT_LONG_POLL_SECONDS', 25))  # How long a long-poll request waits for a change
+
+# Serve payment APIs with native async views (requires an ASGI server, see mysite/asgi.py)
+ASYNC_PAYMENT_VIEWS = get_env('ASYNC_PAYMENT_VIEWS', False, cast=bool)
+
 
 # Application definition
 
@@ -89,6 +114,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
@@ -114,14 +140,110 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
+# DATABASE_ENGINE picks the profile:
+#   sqlite   - single-box installs; with DATABASE_SQLITE_WAL, page reads don't wait behind payment writes
+#   postgres - production; concurrent writers, persistent or pooled connections
+#              (needs psycopg: pip install "psycopg[binary,pool]")
+
+DATABASE_ENGINE = get_env('DATABASE_ENGINE', 'sqlite')
+DATABASE_CONN_MAX_AGE = int(get_env('DATABASE_CONN_MAX_AGE', 60))  # Seconds to keep a connection open between requests
+
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': get_env('DATABASE_NAME', 'jcorp'),
+            'USER': get_env('DATABASE_USER', 'jcorp'),
+            'PASSWORD': get_env('DATABASE_PASSWORD', ''),
+            'HOST': get_env('DATABASE_HOST', 'localhost'),
+            'PORT': get_env('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if get_env('DATABASE_POOL', False, cast=bool):
+        # psycopg's connection pool replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(get_env('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(get_env('DATABASE_POOL_MAX_SIZE', 20)),
+                'timeout': int(get_env('DATABASE_POOL_TIMEOUT', 10)),  # Seconds to wait for a free connection
+            },
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': get_env('DATABASE_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': int(get_env('DATABASE_BUSY_TIMEOUT', 5)),  # Seconds a writer waits for the lock (busy_timeout)
+                'transaction_mode': 'IMMEDIATE',  # Take the write lock up front instead of failing on upgrade
+            },
+        }
+    }
+    # WAL is stored in the database file's header, so turning it on rewrites
+    # the file on first connection. Off by default so the checked-in
+    # db.sqlite3 stays untouched; turn it on for a deployed database.
+    if get_env('DATABASE_SQLITE_WAL', False, cast=bool):
+        DATABASES['default']['OPTIONS']['init_command'] = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+
+# Optional read replica for public page content (Project, ProjectImage, Partner).
+# Same engine and credentials as the primary; set the replica's NAME (SQLite
+# file or database) and/or HOST. Payments always stay on the primary.
+DATABASE_REPLICA_NAME = get_env('DATABASE_REPLICA_NAME', '')
+DATABASE_REPLICA_HOST = get_env('DATABASE_REPLICA_HOST', '')
+DATABASE_REPLICA_STICKY_SECONDS = int(get_env('DATABASE_REPLICA_STICKY_SECONDS', 10))  # Read from the primary this long after writing content
+if DATABASE_REPLICA_NAME or DATABASE_REPLICA_HOST:
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=DATABASE_REPLICA_NAME or DATABASES['default']['NAME'],
+        HOST=DATABASE_REPLICA_HOST or DATABASES['default'].get('HOST', ''),
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+
+
+# Cache
+# Shared between web workers and background commands, so the default is
+# file-based rather than per-process memory. FileBasedCache has no atomic
+# add() across processes, which is why verification leases live in the
+# database (main.singleflight). With several web workers, prefer Redis or
+# Memcached (CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': get_env('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': get_env('CACHE_LOCATION', str(BASE_DIR / '.cache')),
     }
 }
 
+CONTENT_CACHE_SECONDS = int(get_env('CONTENT_CACHE_SECONDS', 3600))  # Lifetime of cached portfolio/about pages (0 disables)
+
+
+# Responsive image variants (see main/images.py)
+IMAGE_VARIANT_WIDTHS = [int(width) for width in get_env('IMAGE_VARIANT_WIDTHS', '320,640,1024,1600').split(',')]  # Rendition widths in pixels
+IMAGE_VARIANT_FORMATS = [name.strip() for name in get_env('IMAGE_VARIANT_FORMATS', 'avif,webp,jpeg').split(',')]  # Best first; formats Pillow can't encode are skipped
+IMAGE_VARIANT_QUALITY = int(get_env('IMAGE_VARIANT_QUALITY', 80))  # Encoder quality for all formats
+
+# Background media jobs (python manage.py run_media_jobs)
+MEDIA_JOBS_INLINE = get_env('MEDIA_JOBS_INLINE', False, cast=bool)  # Run jobs right after the saving request commits instead (no worker needed)
+MEDIA_JOB_POLL_SECONDS = int(get_env('MEDIA_JOB_POLL_SECONDS', 2))  # How often an idle worker checks for new jobs
+MEDIA_JOB_MAX_ATTEMPTS = int(get_env('MEDIA_JOB_MAX_ATTEMPTS', 3))  # Tries before a job is marked failed
+MEDIA_JOB_RETRY_SECONDS = int(get_env('MEDIA_JOB_RETRY_SECONDS', 30))  # First retry delay, doubling after each failure
+MEDIA_JOB_TIMEOUT_SECONDS = int(get_env('MEDIA_JOB_TIMEOUT_SECONDS', 600))  # Running jobs older than this are assumed dead and requeued
+
+# Paid business card downloads (see main/business_card.py)
+BUSINESS_CARD_NAME = get_env('BUSINESS_CARD_NAME', 'JCORP')
+BUSINESS_CARD_TAGLINE = get_env('BUSINESS_CARD_TAGLINE', 'Security Development and Design')
+BUSINESS_CARD_CONTACT = get_env('BUSINESS_CARD_CONTACT', '')
+BUSINESS_CARD_DPI = int(get_env('BUSINESS_CARD_DPI', 600))  # Print resolution; the PNG is 3.5 x 2 inches at this DPI
+BUSINESS_CARD_WORKERS = int(get_env('BUSINESS_CARD_WORKERS', 2))  # Render processes (0 renders in the request's own process)
+BUSINESS_CARD_ROOT = get_env('BUSINESS_CARD_ROOT', str(BASE_DIR / 'card_cache'))  # Private render cache, outside MEDIA_ROOT
+BUSINESS_CARD_SENDFILE_PREFIX = get_env('BUSINESS_CARD_SENDFILE_PREFIX', '/protected-cards/')  # X-Accel-Redirect location aliased to BUSINESS_CARD_ROOT ('' streams from Django)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,6 +281,17 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Content-hashed names plus .gz/.br variants at collectstatic time (see main/storage.py)
+STATIC_MANIFEST = get_env('STATIC_MANIFEST', not DEBUG, cast=bool)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'main.storage.PrecompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
     BASE_DIR / 'frontend' / 'build' / 'static',  # React build static files
@@ -168,6 +301,15 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Let the front proxy send file bodies: '' (Django streams them), 'x-sendfile'
+# (Apache mod_xsendfile, lighttpd) or 'x-accel-redirect' (nginx, with internal
+# locations at FILE_SENDFILE_PREFIX aliased to MEDIA_ROOT and
+# FILE_SENDFILE_STATIC_PREFIX aliased to STATIC_ROOT; an empty prefix turns
+# offload off for that storage)
+FILE_SENDFILE_BACKEND = get_env('FILE_SENDFILE_BACKEND', '').lower()
+FILE_SENDFILE_PREFIX = get_env('FILE_SENDFILE_PREFIX', '/protected-media/')
+FILE_SENDFILE_STATIC_PREFIX = get_env('FILE_SENDFILE_STATIC_PREFIX', '/protected-static/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
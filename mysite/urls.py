@@ -4,22 +4,25 @@ URL configuration for mysite project.
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import TemplateView
-from django.views.static import serve
 import os
+import re
+from main.file_views import media_file, static_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('main.urls')),  # API routes
+    # Uploaded media with Range/ETag support, offloaded to the proxy when FILE_SENDFILE_BACKEND is set
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media_file),
+    # API routes; their own instance namespace so reverse('main:...') gives the unprefixed URLs
+    path('api/', include('main.urls', namespace='api')),
     path('', include('main.urls')),  # Django templates
 ]
 
 # Serve React app in production (when built)
 if not settings.DEBUG:
-    # Serve React build files
+    # Serve collected static files (hashed, precompressed) and the React build
     urlpatterns += [
-        re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
+        re_path(r'^static/(?P<path>.*)$', static_file),
     ]
     # Serve React index.html for all non-API routes
     react_build_path = os.path.join(settings.BASE_DIR, 'frontend', 'build')
@@ -28,5 +31,3 @@ if not settings.DEBUG:
             re_path(r'^(?!api|admin|media|static).*$', TemplateView.as_view(template_name='index.html')),
         ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -240,6 +240,84 @@ class Web3Payment {
         }
     }
 
+    /**
+     * Follow a payment until it settles, calling onUpdate with each status.
+     * Uses the server-push status stream, falling back to long-polling the
+     * same URL when EventSource is unavailable or the stream is refused
+     * (WSGI deployments answer 406). Returns a stop function.
+     */
+    watchPaymentStatus(transactionHash, onUpdate) {
+        const finalStatuses = ['confirmed', 'failed', 'expired'];
+        const streamUrl = `/api/payment/status/${transactionHash}/stream/`;
+        let source = null;
+        let timer = null;
+        let controller = null;
+        let latest = null;
+        let stopped = false;
+
+        const stop = () => {
+            stopped = true;
+            if (source) source.close();
+            if (timer) clearTimeout(timer);
+            if (controller) controller.abort();
+        };
+
+        const handle = (data) => {
+            if (stopped) return;
+            latest = data;
+            onUpdate(data);
+            if (data.success || finalStatuses.includes(data.status)) {
+                stop();
+            }
+        };
+
+        // The server holds each request until the status or confirmations
+        // differ from the last ones seen, so this is one request per change
+        const longPoll = async () => {
+            if (stopped) return;
+            const params = new URLSearchParams({
+                status: latest.status,
+                confirmations: latest.confirmations
+            });
+            controller = new AbortController();
+            try {
+                const response = await fetch(`${streamUrl}?${params}`, { signal: controller.signal });
+                const data = await response.json();
+                if (!response.ok) {
+                    throw new Error(data.error || `HTTP ${response.status}`);
+                }
+                handle(data);
+                longPoll();
+            } catch (error) {
+                if (stopped) return;
+                console.error('Error long-polling payment status:', error);
+                timer = setTimeout(longPoll, 5000);
+            }
+        };
+
+        // Register the payment (and get its current state) before subscribing
+        this.checkPaymentStatus(transactionHash).then((data) => {
+            handle(data);
+            if (stopped) return;
+
+            if (!window.EventSource) {
+                longPoll();
+                return;
+            }
+
+            source = new EventSource(streamUrl);
+            source.addEventListener('status', (event) => handle(JSON.parse(event.data)));
+            source.onerror = () => {
+                // The browser reconnects on its own unless the stream was refused
+                if (source.readyState === EventSource.CLOSED && !stopped) {
+                    longPoll();
+                }
+            };
+        });
+
+        return stop;
+    }
+
     getCSRFToken() {
         const cookies = document.cookie.split(';');
         for (let cookie of cookies) {